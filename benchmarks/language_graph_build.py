@@ -0,0 +1,119 @@
+"""Measure the time to build the language graph of a large language
+
+Run the script from the root of the repository, with the repository on
+the module search path or maltoolbox installed with `pip install -e .`:
+
+    PYTHONPATH=. python benchmarks/language_graph_build.py [number of assets]
+
+A synthetic language specification is generated with a chain of asset
+types, each associated with the next one, extending an abstract base
+asset every tenth asset, and reaching the next asset through a variable.
+The script reports the time to generate the language graph and the time
+the lookups of attack steps and variables take when they scan the
+language specification and when they use a `LangSpecIndex`.
+"""
+
+import sys
+import time
+
+from maltoolbox.language.language_graph_builder import generate_graph
+from maltoolbox.language.language_graph_lookup import (
+    LangSpecIndex,
+    get_attacks_for_asset_type,
+    get_var_expr_for_asset,
+)
+
+
+def build_lang_spec(num_assets: int) -> dict:
+    """Create a language specification of `num_assets` asset types"""
+    assets = []
+    associations = []
+    for i in range(num_assets):
+        is_base = i % 10 == 0
+        attack_steps = [
+            {
+                'name': 'access',
+                'meta': {},
+                'detectors': {},
+                'type': 'or',
+                'causal_mode': None,
+                'tags': [],
+                'risk': None,
+                'ttc': None,
+                'requires': None,
+                'reaches': None if i == num_assets - 1 else {
+                    'overrides': False,
+                    'stepExpressions': [{
+                        'type': 'collect',
+                        'lhs': {'type': 'variable', 'name': 'nextAsset'},
+                        'rhs': {'type': 'attackStep', 'name': 'access'},
+                    }],
+                },
+            },
+        ]
+        variables = [] if i == num_assets - 1 else [{
+            'name': 'nextAsset',
+            'stepExpression': {'type': 'field', 'name': f'next{i}'},
+        }]
+        assets.append({
+            'name': f'Asset{i}',
+            'meta': {},
+            'category': 'Benchmark',
+            'isAbstract': False,
+            'superAsset': None if is_base else f'Asset{i - i % 10}',
+            'variables': variables,
+            'attackSteps': attack_steps,
+        })
+        if i < num_assets - 1:
+            associations.append({
+                'name': f'Link{i}',
+                'meta': {},
+                'leftAsset': f'Asset{i}',
+                'leftField': f'previous{i + 1}',
+                'leftMultiplicity': {'min': 0, 'max': None},
+                'rightAsset': f'Asset{i + 1}',
+                'rightField': f'next{i}',
+                'rightMultiplicity': {'min': 0, 'max': None},
+            })
+
+    return {
+        'formatVersion': '1.0.0',
+        'defines': {'id': 'org.mal-lang.benchmark', 'version': '0.0.1'},
+        'categories': [{'name': 'Benchmark', 'meta': {}}],
+        'assets': assets,
+        'associations': associations,
+    }
+
+
+def time_lookups(lang_spec, asset_types: list[str]) -> float:
+    start = time.perf_counter()
+    for asset_type in asset_types:
+        get_attacks_for_asset_type(asset_type, lang_spec)
+        if asset_type != asset_types[-1]:
+            get_var_expr_for_asset(asset_type, 'nextAsset', lang_spec)
+    return time.perf_counter() - start
+
+
+def main(num_assets: int) -> None:
+    lang_spec = build_lang_spec(num_assets)
+    asset_types = [asset['name'] for asset in lang_spec['assets']]
+
+    start = time.perf_counter()
+    assets = generate_graph(lang_spec)
+    build_time = time.perf_counter() - start
+
+    scan_time = time_lookups(lang_spec, asset_types)
+    start = time.perf_counter()
+    lang_spec_index = LangSpecIndex(lang_spec)
+    index_time = time.perf_counter() - start
+    indexed_lookup_time = time_lookups(lang_spec_index, asset_types)
+
+    print(f'Asset types:              {len(assets)}')
+    print(f'Language graph build:     {build_time:.3f} s')
+    print(f'Lookups scanning spec:    {scan_time:.3f} s')
+    print(f'Building LangSpecIndex:   {index_time:.3f} s')
+    print(f'Lookups using index:      {indexed_lookup_time:.3f} s')
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5000)
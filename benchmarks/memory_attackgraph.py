@@ -0,0 +1,82 @@
+"""Measure the memory used per attack graph node and per model asset
+
+Run the script from the root of the repository, with the repository on
+the module search path or maltoolbox installed with `pip install -e .`:
+
+    PYTHONPATH=. python benchmarks/memory_attackgraph.py [number of applications]
+
+A synthetic coreLang model is built from chains of applications that each
+host some data and a software vulnerability. The memory allocated while
+creating the model assets and while generating the attack graph is
+measured with tracemalloc and reported in bytes per asset and per node.
+"""
+
+import gc
+import sys
+import tracemalloc
+
+from maltoolbox.attackgraph import AttackGraph
+from maltoolbox.language import LanguageGraph
+from maltoolbox.model import Model
+
+LANG_FILE = 'tests/testdata/org.mal-lang.coreLang-1.0.0.mar'
+
+
+def build_model(lang_graph: LanguageGraph, num_apps: int) -> Model:
+    """Create a model of `num_apps` applications, each executing the next
+    one and holding some data and a vulnerability"""
+    model = Model('Memory benchmark model', lang_graph)
+    previous_app = None
+    for i in range(num_apps):
+        app = model.add_asset('Application', f'App {i}')
+        data = model.add_asset('Data', f'Data {i}')
+        vuln = model.add_asset('SoftwareVulnerability', f'Vuln {i}')
+        app.add_associated_assets('containedData', {data})
+        app.add_associated_assets('vulnerabilities', {vuln})
+        if previous_app is not None:
+            previous_app.add_associated_assets('appExecutedApps', {app})
+        previous_app = app
+    return model
+
+
+def traced_bytes() -> int:
+    """Return the bytes currently allocated since tracing started"""
+    gc.collect()
+    return tracemalloc.get_traced_memory()[0]
+
+
+def main(num_apps: int) -> None:
+    lang_graph = LanguageGraph.load_from_file(LANG_FILE)
+
+    # Everything is traced in one session so that memory released by a
+    # step is accounted for as well
+    tracemalloc.start()
+    start_bytes = traced_bytes()
+    model = build_model(lang_graph, num_apps)
+    model_bytes = traced_bytes()
+    attack_graph = AttackGraph(lang_graph, model)
+    graph_bytes = traced_bytes()
+    attack_graph.compact()
+    compact_bytes = traced_bytes()
+    tracemalloc.stop()
+
+    num_assets = len(model.assets)
+    num_nodes = len(attack_graph.nodes)
+    num_edges = len(attack_graph.csr.child_indices)
+    print(f'Assets: {num_assets}, nodes: {num_nodes}, edges: {num_edges}')
+    print(
+        'Model:        '
+        f'{(model_bytes - start_bytes) / num_assets:10.1f} bytes per asset'
+    )
+    print(
+        'Attack graph: '
+        f'{(graph_bytes - model_bytes) / num_nodes:10.1f} bytes per node'
+    )
+    print(
+        'Compacted:    '
+        f'{(compact_bytes - model_bytes) / num_nodes:10.1f} bytes per node'
+    )
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000)
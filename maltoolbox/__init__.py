@@ -48,6 +48,7 @@ config: dict[str, Any] = {
         "langgraph_file": "logs/langgraph.yml",
     },
     "neo4j": {"uri": None, "username": None, "password": None, "dbname": None},
+    "cache": {"langgraph_dir": os.getenv("MALTOOLBOX_LANGGRAPH_CACHE")},
 }
 
 config_file = os.getenv("MALTOOLBOX_CONFIG", "maltoolbox.yml")
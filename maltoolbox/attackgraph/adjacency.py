@@ -0,0 +1,246 @@
+"""Compact array-backed adjacency for attack graphs
+
+By default every attack graph node keeps its children and parents in
+Python sets of node objects, which costs a hash table entry per edge in
+both directions. `CSRAdjacency` stores the same edges as contiguous
+integer arrays in compressed sparse row layout: the edges of the node at
+dense index `i` are `indices[offsets[i]:offsets[i + 1]]`. Per node
+attributes that traversals commonly filter on are kept in parallel arrays.
+
+After `AttackGraph.compact()` the `children` and `parents` of every node
+are `AdjacencyView`s that read from the arrays. A view turns into a plain
+set the first time it is modified, so existing code that edits the graph
+keeps working.
+
+The CSR arrays are built from a graph that has been generated with sets,
+so compacting reduces the memory a graph keeps, not the peak memory of
+generation.
+"""
+
+from __future__ import annotations
+
+import copy
+import logging
+from array import array
+from bisect import bisect_left
+from collections.abc import MutableSet
+from typing import TYPE_CHECKING, Iterable, Iterator
+
+if TYPE_CHECKING:
+    from ..language import LanguageGraphAttackStep
+    from .node import AttackGraphNode
+
+logger = logging.getLogger(__name__)
+
+# Codes of the node types in `CSRAdjacency.types`
+NODE_TYPES = ('or', 'and', 'defense', 'exist', 'notExist')
+NODE_TYPE_CODES = {node_type: code for code, node_type in enumerate(NODE_TYPES)}
+
+
+class CSRAdjacency:
+    """Forward and reverse edges of an attack graph in CSR layout
+
+    Nodes are addressed by their dense index, the position of the node in
+    `nodes`, which follows ascending node ids. `modified` is set once an
+    `AdjacencyView` of the arrays is modified, the arrays no longer hold
+    all edges of the graph from then on.
+    """
+
+    modified = False
+
+    def __init__(self, nodes: Iterable[AttackGraphNode]):
+        self.nodes: list[AttackGraphNode] = sorted(nodes, key=lambda n: n.id)
+        index_of = {id(node): i for i, node in enumerate(self.nodes)}
+
+        self.node_ids = array('q', (node.id for node in self.nodes))
+        self.types = array('b', (NODE_TYPE_CODES[n.type] for n in self.nodes))
+        self.asset_ids = array('q', (
+            node.model_asset.id if node.model_asset else -1
+            for node in self.nodes
+        ))
+
+        # Language graph attack steps are numbered in order of appearance
+        self.lg_attack_steps: list[LanguageGraphAttackStep] = []
+        step_index: dict[int, int] = {}
+        self.step_ids = array('q')
+        for node in self.nodes:
+            step_id = step_index.get(id(node.lg_attack_step))
+            if step_id is None:
+                step_id = step_index[id(node.lg_attack_step)] = (
+                    len(self.lg_attack_steps)
+                )
+                self.lg_attack_steps.append(node.lg_attack_step)
+            self.step_ids.append(step_id)
+
+        self.child_offsets, self.child_indices = self._build(
+            (node.children for node in self.nodes), index_of
+        )
+        self.parent_offsets, self.parent_indices = self._build(
+            (node.parents for node in self.nodes), index_of
+        )
+        logger.debug(
+            'Built CSR adjacency of %d nodes and %d edges.',
+            len(self.nodes), len(self.child_indices)
+        )
+
+    @staticmethod
+    def _build(
+        neighbours: Iterable[Iterable[AttackGraphNode]],
+        index_of: dict[int, int]
+    ) -> tuple[array, array]:
+        offsets = array('q', (0,))
+        indices = array('q')
+        for node_neighbours in neighbours:
+            indices.extend(sorted(index_of[id(n)] for n in node_neighbours))
+            offsets.append(len(indices))
+        return offsets, indices
+
+    def __len__(self) -> int:
+        return len(self.nodes)
+
+    def __repr__(self) -> str:
+        return (
+            f'CSRAdjacency(nodes: {len(self.nodes)}, '
+            f'edges: {len(self.child_indices)})'
+        )
+
+    def index_of(self, node: object) -> int | None:
+        """Return the dense index of a node, None if it is not part of
+        the adjacency"""
+        node_id = getattr(node, 'id', None)
+        if not isinstance(node_id, int):
+            return None
+        index = bisect_left(self.node_ids, node_id)
+        if index < len(self.nodes) and self.nodes[index] is node:
+            return index
+        return None
+
+    def child_slice(self, index: int) -> memoryview:
+        """Return the dense indices of the children of a node"""
+        return memoryview(self.child_indices)[
+            self.child_offsets[index]:self.child_offsets[index + 1]
+        ]
+
+    def parent_slice(self, index: int) -> memoryview:
+        """Return the dense indices of the parents of a node"""
+        return memoryview(self.parent_indices)[
+            self.parent_offsets[index]:self.parent_offsets[index + 1]
+        ]
+
+    def reachable(
+        self, start_indices: Iterable[int], reverse: bool = False
+    ) -> bytearray:
+        """Mark every node reachable from the start nodes by following
+        edges, or following them backwards if `reverse` is set.
+
+        Arguments:
+        ---------
+        start_indices   - dense indices of the nodes to start from
+        reverse         - follow parents instead of children
+
+        Return:
+        ------
+        A bytearray with one byte per node, set to 1 for reachable nodes,
+        including the start nodes.
+        """
+        offsets, indices = (
+            (self.parent_offsets, self.parent_indices) if reverse
+            else (self.child_offsets, self.child_indices)
+        )
+        visited = bytearray(len(self.nodes))
+        stack = list(start_indices)
+        for index in stack:
+            visited[index] = 1
+        while stack:
+            index = stack.pop()
+            for neighbour in indices[offsets[index]:offsets[index + 1]]:
+                if not visited[neighbour]:
+                    visited[neighbour] = 1
+                    stack.append(neighbour)
+        return visited
+
+    def attach_views(self) -> None:
+        """Replace the children and parents sets of all nodes with views
+        on the arrays, releasing the sets"""
+        for index, node in enumerate(self.nodes):
+            node.children = AdjacencyView(self, index, False)
+            node.parents = AdjacencyView(self, index, True)
+
+
+class AdjacencyView(MutableSet):
+    """Set-like view of the children or parents of one node in a
+    `CSRAdjacency`.
+
+    The view is read from the arrays until it is first modified, from then
+    on it holds its own set of nodes.
+    """
+
+    __slots__ = ('_adjacency', '_index', '_reverse', '_set')
+
+    def __init__(
+        self, adjacency: CSRAdjacency, index: int, reverse: bool
+    ):
+        self._adjacency = adjacency
+        self._index = index
+        self._reverse = reverse
+        self._set: set[AttackGraphNode] | None = None
+
+    @classmethod
+    def _from_iterable(cls, it: Iterable) -> set:
+        # Results of set operations are plain sets
+        return set(it)
+
+    def _indices(self) -> memoryview:
+        if self._reverse:
+            return self._adjacency.parent_slice(self._index)
+        return self._adjacency.child_slice(self._index)
+
+    def _materialize(self) -> set[AttackGraphNode]:
+        if self._set is None:
+            self._adjacency.modified = True
+            nodes = self._adjacency.nodes
+            self._set = {nodes[i] for i in self._indices()}
+        return self._set
+
+    def __contains__(self, node: object) -> bool:
+        if self._set is not None:
+            return node in self._set
+        index = self._adjacency.index_of(node)
+        if index is None:
+            return False
+        indices = self._indices()
+        position = bisect_left(indices, index)
+        return position < len(indices) and indices[position] == index
+
+    def __iter__(self) -> Iterator[AttackGraphNode]:
+        if self._set is not None:
+            return iter(self._set)
+        nodes = self._adjacency.nodes
+        return (nodes[i] for i in self._indices())
+
+    def __len__(self) -> int:
+        if self._set is not None:
+            return len(self._set)
+        return len(self._indices())
+
+    def add(self, node: AttackGraphNode) -> None:
+        self._materialize().add(node)
+
+    def discard(self, node: AttackGraphNode) -> None:
+        self._materialize().discard(node)
+
+    def remove(self, node: AttackGraphNode) -> None:
+        self._materialize().remove(node)
+
+    def clear(self) -> None:
+        self._adjacency.modified = True
+        self._set = set()
+
+    def copy(self) -> set[AttackGraphNode]:
+        return set(self)
+
+    def __deepcopy__(self, memo) -> set[AttackGraphNode]:
+        return {copy.deepcopy(node, memo) for node in self}
+
+    def __repr__(self) -> str:
+        return f'AdjacencyView({set(self)!r})'
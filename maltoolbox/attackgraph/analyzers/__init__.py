@@ -0,0 +1,13 @@
+"""Analyzers that compute properties of attack graphs"""
+
+from .reachability import (
+    ReachabilityAnalyzer,
+    get_compromisable_nodes,
+    is_enabled_defense,
+)
+
+__all__ = [
+    "ReachabilityAnalyzer",
+    "get_compromisable_nodes",
+    "is_enabled_defense",
+]
@@ -0,0 +1,222 @@
+"""Reachability of attack graph nodes from entry points
+
+An attack step is compromisable if an attacker starting at the entry
+points can reach it:
+
+- an entry point is compromisable, entry points must be `or` or `and`
+  steps
+- an `or` step is compromisable if any of its attack step parents is
+- an `and` step is compromisable if all of its attack step parents are
+  and all of its defense and existence parents allow it
+
+Defense, exist and notExist nodes are conditions rather than steps an
+attacker takes. A defense allows its children while it is disabled, an
+exist node while its `existence_status` is True and a notExist node while
+it is False. Conditions are only checked by `and` steps, and never become
+compromisable themselves.
+
+`ReachabilityAnalyzer` propagates compromise over the `CSRAdjacency` of
+the attack graph. Nodes are handled by their dense index, with a byte per
+node marking compromised nodes and an integer counter per `and` step of
+the parents it is still waiting for. Counters and conditions are only
+looked at for the nodes the propagation reaches.
+
+Every edge out of a compromised node is followed once in Python, so the
+time grows with the number of those edges. On a random graph of a million
+nodes and 2.85 million edges, of which 0.68 million nodes are reached,
+`compromisable` takes about 2.1 seconds, not counting building the
+`CSRAdjacency`. That is twice the one second budget aimed at for
+graphs of that size, which a pure Python loop over the edges cannot meet.
+"""
+
+from __future__ import annotations
+
+import logging
+from array import array
+from itertools import compress
+from typing import TYPE_CHECKING, Iterable, Optional
+
+from ..adjacency import NODE_TYPE_CODES, CSRAdjacency
+
+if TYPE_CHECKING:
+    from ..attackgraph import AttackGraph
+    from ..node import AttackGraphNode
+
+logger = logging.getLogger(__name__)
+
+_OR = NODE_TYPE_CODES['or']
+_AND = NODE_TYPE_CODES['and']
+_DEFENSE = NODE_TYPE_CODES['defense']
+_EXIST = NODE_TYPE_CODES['exist']
+
+# Counter values of `and` steps that have not been reached yet, or that
+# have a condition parent that does not allow them
+_UNSEEN = -1
+_BLOCKED = -2
+
+
+def is_enabled_defense(node: AttackGraphNode) -> bool:
+    """Return True if the ttc distribution of a defense node enables it,
+    which is what the defense values of a model are turned into"""
+    ttc = node.ttc
+    if not ttc or ttc.get('type') != 'function':
+        return False
+    if ttc['name'] == 'Enabled':
+        return True
+    return ttc['name'] == 'Bernoulli' and float(ttc['arguments'][0]) == 1.0
+
+
+class ReachabilityAnalyzer:
+    """Computes the nodes of an attack graph that are compromisable from
+    a set of entry points.
+
+    The analyzer uses the CSR adjacency of the graph, see
+    `AttackGraph.compact`, or builds one if the graph has none or its
+    edges were changed since. A lazy graph is materialized first. The
+    graph must not change while the analyzer is in use.
+    """
+
+    def __init__(self, attack_graph: AttackGraph):
+        self.attack_graph = attack_graph
+        csr = attack_graph.csr
+        if csr is None or csr.modified:
+            attack_graph.materialize()
+            csr = CSRAdjacency(attack_graph.nodes.values())
+        self.csr = csr
+
+    def __repr__(self) -> str:
+        return f'ReachabilityAnalyzer(nodes: {len(self.csr)})'
+
+    def compromisable(
+        self,
+        entry_points: Iterable[AttackGraphNode],
+        enabled_defenses: Optional[Iterable[AttackGraphNode]] = None,
+        existence_status: Optional[dict[AttackGraphNode, bool]] = None
+    ) -> bytearray:
+        """Mark the nodes that are compromisable from the entry points.
+
+        Arguments:
+        ---------
+        entry_points        - the nodes the attacker starts from
+        enabled_defenses    - the defense nodes that are enabled, all others
+                              are disabled. By default defenses are enabled
+                              if their ttc says so, see `is_enabled_defense`
+        existence_status    - existence status of exist and notExist nodes
+                              that replaces the one of the node
+
+        Return:
+        ------
+        A bytearray with one byte per node of `self.csr.nodes`, set to 1
+        for compromisable nodes.
+        """
+        csr = self.csr
+        nodes = csr.nodes
+        types = csr.types
+        child_offsets = csr.child_offsets
+        child_indices = csr.child_indices
+        parent_offsets = csr.parent_offsets
+        parent_indices = csr.parent_indices
+
+        enabled = (
+            set(enabled_defenses) if enabled_defenses is not None else None
+        )
+        existence_status = existence_status or {}
+        # 1 for conditions that allow their children, 0 for those that do
+        # not and 2 for those not checked yet
+        allowed = bytearray(b'\x02') * len(nodes)
+
+        def allows(index: int) -> int:
+            node = nodes[index]
+            if types[index] == _DEFENSE:
+                if enabled is not None:
+                    return node not in enabled
+                return not is_enabled_defense(node)
+            status = existence_status.get(node, node.existence_status)
+            if types[index] == _EXIST:
+                return bool(status)
+            return status is False
+
+        compromised = bytearray(len(nodes))
+        waiting = array('q', (_UNSEEN,)) * len(nodes)
+        frontier = []
+        for node in entry_points:
+            index = csr.index_of(node)
+            if index is None:
+                raise ValueError(
+                    f'Entry point {node!r} is not part of the attack graph'
+                )
+            if types[index] not in (_OR, _AND):
+                raise ValueError(
+                    f'Entry point {node!r} is a {node.type} node, not an '
+                    'attack step'
+                )
+            if not compromised[index]:
+                compromised[index] = 1
+                frontier.append(index)
+
+        append = frontier.append
+        for index in frontier:
+            for child in child_indices[
+                child_offsets[index]:child_offsets[index + 1]
+            ]:
+                if compromised[child]:
+                    continue
+                child_type = types[child]
+                if child_type == _OR:
+                    compromised[child] = 1
+                    append(child)
+                    continue
+                if child_type != _AND:
+                    continue
+
+                count = waiting[child]
+                if count == _UNSEEN:
+                    # The parents the step waits for, this one included
+                    count = 0
+                    for parent in parent_indices[
+                        parent_offsets[child]:parent_offsets[child + 1]
+                    ]:
+                        if types[parent] in (_OR, _AND):
+                            count += 1
+                            continue
+                        if allowed[parent] == 2:
+                            allowed[parent] = allows(parent)
+                        if not allowed[parent]:
+                            count = _BLOCKED
+                            break
+                if count == _BLOCKED:
+                    waiting[child] = _BLOCKED
+                    continue
+                count -= 1
+                waiting[child] = count
+                if count == 0:
+                    compromised[child] = 1
+                    append(child)
+
+        logger.debug('Found %d compromisable nodes', len(frontier))
+        return compromised
+
+    def compromisable_nodes(
+        self,
+        entry_points: Iterable[AttackGraphNode],
+        enabled_defenses: Optional[Iterable[AttackGraphNode]] = None,
+        existence_status: Optional[dict[AttackGraphNode, bool]] = None
+    ) -> set[AttackGraphNode]:
+        """Return the nodes that are compromisable from the entry points,
+        see `compromisable`"""
+        return set(compress(self.csr.nodes, self.compromisable(
+            entry_points, enabled_defenses, existence_status
+        )))
+
+
+def get_compromisable_nodes(
+    attack_graph: AttackGraph,
+    entry_points: Iterable[AttackGraphNode],
+    enabled_defenses: Optional[Iterable[AttackGraphNode]] = None,
+    existence_status: Optional[dict[AttackGraphNode, bool]] = None
+) -> set[AttackGraphNode]:
+    """Return the nodes of an attack graph that are compromisable from the
+    entry points, see `ReachabilityAnalyzer.compromisable`"""
+    return ReachabilityAnalyzer(attack_graph).compromisable_nodes(
+        entry_points, enabled_defenses, existence_status
+    )
@@ -4,11 +4,25 @@ from __future__ import annotations
 
 import copy
 import logging
-from typing import TYPE_CHECKING, Optional
+from typing import TYPE_CHECKING, Iterable, Optional
 
+from maltoolbox.attackgraph.adjacency import CSRAdjacency
 from maltoolbox.attackgraph.detector import Detector
-from maltoolbox.attackgraph.generate import generate_graph
+from maltoolbox.attackgraph.generate import (
+    ExprChainCache,
+    NodeIndex,
+    _create_node_detectors,
+    generate_graph,
+    get_existance_status,
+    link_node_children,
+)
+from maltoolbox.attackgraph.incremental import (
+    get_affected_assets,
+    index_expr_chains_by_fieldname,
+)
+from maltoolbox.attackgraph.lazy import LazyNodeDict, LazyNodeResolver
 from maltoolbox.attackgraph.node_getters import get_node_by_full_name
+from maltoolbox.attackgraph.ttcs import get_ttc_override
 from maltoolbox.language.languagegraph import disaggregate_attack_step_full_name
 
 from ..file_utils import load_dict_from_json_file, load_dict_from_yaml_file, save_dict_to_file
@@ -128,20 +142,136 @@ def attack_graph_from_file(
 class AttackGraph:
     """Graph representation of attack and defense steps"""
 
-    def __init__(self, lang_graph: LanguageGraph, model: Model | None = None):
+    def __init__(
+        self,
+        lang_graph: LanguageGraph,
+        model: Model | None = None,
+        workers: int | None = None,
+        incremental: bool = False,
+        lazy: bool = False,
+        entry_points: Iterable[str] | None = None,
+        targets: Iterable[str] | None = None,
+        matrix: bool = False
+    ):
+        """Create an attack graph, generating it if a model is given.
+
+        Arguments:
+        ---------
+        lang_graph      - the language graph of the model
+        model           - the model to generate the attack graph from
+        workers         - number of worker processes used to link the
+                          nodes during generation. Generation is serial if
+                          not given or 1.
+        incremental     - keep the attack graph up to date with changes
+                          made to the model after generation. Only the
+                          nodes and edges affected by each change are
+                          updated.
+        lazy            - create nodes the first time they are looked up,
+                          by id or full name, and resolve their children
+                          and parents the first time they are traversed.
+                          Iterating over `nodes` only covers the nodes
+                          created so far, see `materialize` to create
+                          them all. Saving or copying the graph creates
+                          all of its nodes first. The model should not be
+                          changed while a lazy attack graph is in use.
+        entry_points    - full names (asset:step) of attack steps. If given
+                          only the nodes reachable from them are generated,
+                          with the ids they have in the full graph.
+        targets         - full names (asset:step) of attack steps. If given
+                          only the targets and the nodes they can be
+                          reached from are generated. Can not be combined
+                          with `entry_points`.
+        matrix          - link the nodes by evaluating the expressions
+                          chains of each attack step as boolean matrices
+                          over all assets of its asset type. Can not be
+                          combined with `workers`.
+
+        """
         self.nodes: dict[int, AttackGraphNode] = {}
         self.attack_steps: list[AttackGraphNode] = []
         self.defense_steps: list[AttackGraphNode] = []
         self.detectors: list[Detector] = []
         self.model = model
         self.lang_graph = lang_graph
+        self.workers = workers
+        self.matrix = matrix
+        self.entry_points = (
+            list(entry_points) if entry_points is not None else None
+        )
+        self.targets = list(targets) if targets is not None else None
         self.next_node_id = 0
         self.full_name_to_node: dict[str, AttackGraphNode] = {}
+        # Array-backed adjacency, only set by `compact()`
+        self.csr: CSRAdjacency | None = None
+        # Hit/miss counters of the expression chain cache used by the
+        # latest generation
+        self.expr_chain_cache = ExprChainCache()
+
+        # Creates the nodes of lazy attack graphs on demand
+        self._resolver: LazyNodeResolver | None = None
+
+        if incremental and lazy:
+            raise ValueError('Lazy attack graphs can not be incremental')
+        sliced = self.entry_points is not None or self.targets is not None
+        if sliced and (incremental or lazy):
+            raise ValueError(
+                'Sliced attack graphs can not be incremental or lazy'
+            )
 
-        if self.model is not None:
+        if self.model is not None and lazy:
+            self._init_lazy()
+        elif self.model is not None:
             self.nodes, self.attack_steps, self.defense_steps, self.full_name_to_node, self.detectors = (
-                generate_graph(self.model)
+                generate_graph(
+                    self.model, self.expr_chain_cache, self.workers,
+                    self.entry_points, self.targets, self.matrix
+                )
+            )
+            self.expr_chain_cache.clear()
+            if self.nodes:
+                self.next_node_id = max(self.nodes) + 1
+
+        self.incremental = incremental
+        # Assets whose links will be resolved again once a pending
+        # association removal is done
+        self._pending_relink: set[ModelAsset] = set()
+        if incremental:
+            if self.model is None:
+                raise ValueError('Incremental attack graphs need a model')
+            self._chains_by_fieldname = (
+                index_expr_chains_by_fieldname(self.lang_graph)
             )
+            self._node_index = NodeIndex(self.nodes.values())
+            self.model.subscribe(self._on_model_change)
+
+    def _init_lazy(self) -> None:
+        self._resolver = LazyNodeResolver(self)
+        self.nodes = LazyNodeDict(
+            self._resolver.get_node_by_id, self._resolver.has_node_id
+        )
+        self.full_name_to_node = LazyNodeDict(
+            self._resolver.get_node_by_full_name,
+            self._resolver.has_full_name
+        )
+        self.attack_steps = []
+        self.defense_steps = []
+        self.detectors = []
+        self.next_node_id = self._resolver.num_nodes
+
+    @property
+    def lazy(self) -> bool:
+        """Whether nodes are created on demand"""
+        return self._resolver is not None
+
+    def __setstate__(self, state: dict) -> None:
+        state.setdefault('_resolver', None)
+        state.setdefault('entry_points', None)
+        state.setdefault('targets', None)
+        state.setdefault('matrix', False)
+        self.__dict__.update(state)
+        if getattr(self, 'incremental', False) and self.model is not None:
+            # Model listeners are not pickled
+            self.model.subscribe(self._on_model_change)
 
     def __repr__(self) -> str:
         return (
@@ -149,8 +279,17 @@ class AttackGraph:
             f'model: {self.model}, language: {self.lang_graph}'
         )
 
+    def materialize(self) -> None:
+        """Create all nodes of a lazy attack graph and resolve all of their
+        edges, so that the graph holds the same nodes and edges as an
+        eagerly generated one. Does nothing for other attack graphs."""
+        if self._resolver is not None:
+            self._resolver.materialize()
+
     def _to_dict(self) -> dict:
         """Convert AttackGraph to dict"""
+        # Reading the edges of a lazy graph creates nodes
+        self.materialize()
         serialized_attack_steps = {}
         for ag_node in self.nodes.values():
             serialized_attack_steps[ag_node.full_name] = ag_node.to_dict()
@@ -164,6 +303,8 @@ class AttackGraph:
         if id(self) in memo:
             return memo[id(self)]
 
+        # Reading the edges of a lazy graph creates nodes
+        self.materialize()
         copied_attackgraph = AttackGraph(self.lang_graph)
         copied_attackgraph.model = self.model
         copied_attackgraph.nodes = {}
@@ -223,9 +364,49 @@ class AttackGraph:
         the MAL language specification provided at initialization.
         """
         assert self.model, "Model required to generate graph"
+        if self.lazy:
+            self._init_lazy()
+            self.csr = None
+            return
+
+        # The model may have changed since the last generation
+        self.expr_chain_cache = ExprChainCache()
         self.nodes, self.attack_steps, self.defense_steps, self.full_name_to_node, self.detectors = (
-            generate_graph(self.model)
+            generate_graph(
+                self.model, self.expr_chain_cache, self.workers,
+                self.entry_points, self.targets, self.matrix
+            )
         )
+        self.expr_chain_cache.clear()
+        self.next_node_id = max(self.nodes, default=-1) + 1
+        self.csr = None
+
+    def compact(self) -> CSRAdjacency:
+        """Store the edges of the attack graph as integer arrays in CSR
+        layout and replace the children and parents sets of every node
+        with lazy views on those arrays.
+
+        The views behave like sets and can still be modified, a modified
+        view keeps its own set from then on and marks the arrays as
+        `modified`. `self.csr` is dropped when nodes are added or removed,
+        or when an incremental graph follows a change of its model, since
+        the arrays no longer cover the graph.
+
+        The arrays are built from the sets of the generated graph, so this
+        lowers the memory the graph holds on to afterwards but not the
+        peak memory of generating it. A lazy graph is materialized first,
+        see `materialize`.
+
+        Return:
+        ------
+        The CSR adjacency of the graph, also available as `self.csr`.
+
+        """
+        # The arrays index the nodes that exist when they are built
+        self.materialize()
+        self.csr = CSRAdjacency(self.nodes.values())
+        self.csr.attach_views()
+        return self.csr
 
     def add_node(
         self,
@@ -267,6 +448,7 @@ class AttackGraph:
         if node_id in self.nodes:
             raise ValueError(f'Node index {node_id} already in use.')
         self.next_node_id = node_id + 1
+        self.csr = None
 
         logger.debug(
             'Create and add to attackgraph node of type "%s" with id:%d.\n',
@@ -308,4 +490,142 @@ class AttackGraph:
             parent.children.remove(node)
         del self.nodes[node.id]
         del self.full_name_to_node[node.full_name]
+        if self._resolver is not None:
+            # Do not create the node again when it is looked up
+            self._resolver.removed_ids.add(node.id)
+        self.csr = None
+
+
+    def _on_model_change(
+        self,
+        event: str,
+        asset: ModelAsset,
+        fieldname: str | None,
+        assets: set[ModelAsset] | None
+    ) -> None:
+        """Update the attack graph after a change to the model, see
+        `Model.subscribe` for the events
+        """
+        match event:
+            case 'asset_added':
+                self._add_asset_nodes(asset)
+
+            case 'asset_removed':
+                self._remove_asset_nodes(asset)
+
+            case 'associated_assets_added':
+                assert fieldname and assets is not None
+                self._relink_assets(get_affected_assets(
+                    self._chains_by_fieldname, asset, fieldname, assets
+                ))
+
+            case 'associated_assets_removing':
+                # The association is still in place, so the reverse walk
+                # finds every asset that currently goes through it
+                assert fieldname and assets is not None
+                self._pending_relink |= get_affected_assets(
+                    self._chains_by_fieldname, asset, fieldname, assets
+                )
+
+            case 'associated_assets_removed':
+                pending, self._pending_relink = self._pending_relink, set()
+                self._relink_assets(pending)
 
+    def _asset_nodes(self, asset: ModelAsset) -> list[AttackGraphNode]:
+        return [
+            self.full_name_to_node[f'{asset.name}:{step_name}']
+            for step_name in asset.lg_asset.attack_steps
+        ]
+
+    def _add_asset_nodes(self, asset: ModelAsset) -> None:
+        """Create, link and add detectors to the nodes of a new asset"""
+        assert self.model, "Model required to add asset nodes"
+        logger.debug(
+            'Add attack graph nodes for "%s"(%d).', asset.name, asset.id
+        )
+        asset.attack_step_nodes = []
+        for lg_attack_step in asset.lg_asset.attack_steps.values():
+            node = self.add_node(
+                lg_attack_step=lg_attack_step,
+                model_asset=asset,
+                ttc_dist=get_ttc_override(asset, lg_attack_step),
+                existence_status=get_existance_status(
+                    self.model, asset, lg_attack_step
+                ),
+            )
+            asset.attack_step_nodes.append(node)
+            self._node_index.add(node)
+
+        # A new asset has no associations, so only its own nodes can
+        # link to its own nodes
+        cache = ExprChainCache()
+        for node in asset.attack_step_nodes:
+            link_node_children(
+                self.model, node, self.full_name_to_node, cache,
+                self._node_index
+            )
+            if node.lg_attack_step.detectors:
+                node.detectors = _create_node_detectors(
+                    node, self.full_name_to_node, self.model, cache
+                )
+                self.detectors.extend(node.detectors.values())
+
+    def _remove_asset_nodes(self, asset: ModelAsset) -> None:
+        """Remove the nodes of an asset that was removed from the model"""
+        logger.debug(
+            'Remove attack graph nodes for "%s"(%d).', asset.name, asset.id
+        )
+        removed_nodes = set(self._asset_nodes(asset))
+        for node in removed_nodes:
+            self.remove_node(node)
+            self._node_index.remove(node)
+        self.attack_steps = [
+            n for n in self.attack_steps if n not in removed_nodes
+        ]
+        self.defense_steps = [
+            n for n in self.defense_steps if n not in removed_nodes
+        ]
+        self.detectors = [
+            d for d in self.detectors if d.node not in removed_nodes
+        ]
+        asset.attack_step_nodes = []
+
+    def _relink_assets(self, assets: set[ModelAsset]) -> None:
+        """Resolve the children, existence status and detectors of all of
+        the nodes of the given assets again"""
+        assert self.model, "Model required to relink asset nodes"
+        # The edges of the nodes change
+        self.csr = None
+        cache = ExprChainCache()
+        redetected_nodes: set[AttackGraphNode] = set()
+        new_detectors: list[Detector] = []
+        for asset in assets:
+            if self.model.assets.get(asset.id) is not asset:
+                # Asset is being removed from the model
+                continue
+            logger.debug(
+                'Relink attack graph nodes of "%s"(%d).', asset.name, asset.id
+            )
+            for node in self._asset_nodes(asset):
+                for child in node.children:
+                    child.parents.discard(node)
+                node.children.clear()
+                link_node_children(
+                    self.model, node, self.full_name_to_node, cache,
+                    self._node_index
+                )
+                if node.type in ('exist', 'notExist'):
+                    node.existence_status = get_existance_status(
+                        self.model, asset, node.lg_attack_step, cache
+                    )
+                if node.lg_attack_step.detectors:
+                    node.detectors = _create_node_detectors(
+                        node, self.full_name_to_node, self.model, cache
+                    )
+                    redetected_nodes.add(node)
+                    new_detectors.extend(node.detectors.values())
+
+        if redetected_nodes:
+            self.detectors = [
+                d for d in self.detectors if d.node not in redetected_nodes
+            ] + new_detectors
@@ -1,8 +1,7 @@
 from __future__ import annotations
 import logging
-import zipfile
 from maltoolbox.exceptions import AttackGraphStepExpressionError
-from maltoolbox.language.languagegraph import LanguageGraph
+from maltoolbox.language.languagegraph import LanguageGraph, load_language_graph_from_file
 from maltoolbox.model import Model
 
 from maltoolbox.attackgraph.attackgraph import AttackGraph
@@ -27,11 +26,8 @@ def create_attack_graph(
     if isinstance(lang, LanguageGraph):
         lang_graph = lang
     elif isinstance(lang, str):
-        # Load from path
-        try:
-            lang_graph = LanguageGraph.from_mar_archive(lang)
-        except zipfile.BadZipFile:
-            lang_graph = LanguageGraph.from_mal_spec(lang)
+        # Load from path, through the language graph cache if configured
+        lang_graph = load_language_graph_from_file(lang)
     else:
         raise TypeError("`lang` must be either string or LanguageGraph")
 
@@ -4,11 +4,18 @@ from __future__ import annotations
 
 import json
 import logging
-from typing import TYPE_CHECKING, Optional
+from concurrent.futures import ProcessPoolExecutor
+from typing import TYPE_CHECKING, Iterable, Iterator, Optional
 
 from maltoolbox.attackgraph.detector import Detector
+from maltoolbox.attackgraph.matrix import AssetIndex, iter_bits, iter_matrix_edges
 from maltoolbox.attackgraph.node_getters import get_node_by_full_name
-from maltoolbox.attackgraph.ttcs import get_ttc_dist
+from maltoolbox.attackgraph.transitive_closure import (
+    follow_transitive_closure,
+)
+from maltoolbox.attackgraph.traversal_plan import get_traversal_plan
+from maltoolbox.attackgraph.ttcs import get_ttc_override
+from maltoolbox.language.expr_chain_optimizer import is_distributive
 from maltoolbox.language.language_graph_detector import LanguageGraphDetector
 
 from ..exceptions import (
@@ -22,32 +29,287 @@ from .node import AttackGraphNode
 
 if TYPE_CHECKING:
     from typing import Any
+    from ..language import LanguageGraphAsset
     from ..model import ModelAsset
 
 logger = logging.getLogger(__name__)
 
+
+class ExprChainCache:
+    """Memoized expression chain resolutions for one graph generation.
+
+    Results are keyed by the source asset and the identity of the
+    expressions chain. Attack steps that share chain objects, for example
+    through inheritance, therefore only walk the model once per source
+    asset. The chains must outlive the cache, which holds for chains
+    owned by the language graph.
+
+    Misses are resolved with the compiled traversal plan of the chain,
+    or with `follow_expr_chain_bits` if `bitsets` is True. Bitsets pay
+    off on densely connected models, where the intermediate sets are
+    large.
+    """
+
+    def __init__(self, bitsets: bool = False) -> None:
+        self._results: dict[tuple[int, int], frozenset[ModelAsset]] = {}
+        self.hits = 0
+        self.misses = 0
+        self.bitsets = bitsets
+        # Dense index of the assets of the model the bitsets refer to
+        self._asset_index: Optional[tuple[Model, AssetIndex]] = None
+
+    def __repr__(self) -> str:
+        return (
+            f'ExprChainCache(entries: {len(self._results)}, '
+            f'hits: {self.hits}, misses: {self.misses})'
+        )
+
+    def __len__(self) -> int:
+        return len(self._results)
+
+    def __getstate__(self) -> dict:
+        state = self.__dict__.copy()
+        # Chain ids are not preserved when pickling
+        state['_results'] = {}
+        state['_asset_index'] = None
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        state.setdefault('bitsets', False)
+        state.setdefault('_asset_index', None)
+        self.__dict__.update(state)
+
+    def get_asset_index(self, model: Model) -> AssetIndex:
+        """Return the asset index of a model, built on first use"""
+        if self._asset_index is None or self._asset_index[0] is not model:
+            self._asset_index = (model, AssetIndex(model.assets.values()))
+        return self._asset_index[1]
+
+    def get(
+        self, asset: ModelAsset, expr_chain: Optional[ExpressionsChain]
+    ) -> Optional[frozenset[ModelAsset]]:
+        """Return the cached result of `resolve`, None if there is none"""
+        result = self._results.get((asset.id, id(expr_chain)))
+        if result is not None:
+            self.hits += 1
+        return result
+
+    def resolve(
+        self,
+        model: Model,
+        asset: ModelAsset,
+        expr_chain: Optional[ExpressionsChain]
+    ) -> frozenset[ModelAsset]:
+        """Return the assets reached from `asset` through `expr_chain`"""
+        key = (asset.id, id(expr_chain))
+        result = self._results.get(key)
+        if result is not None:
+            self.hits += 1
+            return result
+        self.misses += 1
+        if self.bitsets:
+            asset_index = self.get_asset_index(model)
+            result = frozenset(asset_index.to_assets(follow_expr_chain_bits(
+                asset_index, 1 << asset_index.positions[asset], expr_chain
+            )))
+        else:
+            plan = get_traversal_plan(model.lang_graph, expr_chain)
+            result = frozenset(plan((asset,)))
+        self._results[key] = result
+        return result
+
+    def clear(self) -> None:
+        """Drop all cached results and the asset index, the counters are
+        kept"""
+        self._results.clear()
+        self._asset_index = None
+
+
+class NodeIndex:
+    """Attack graph nodes by asset id and attack step name.
+
+    The nodes of each asset are kept in an array ordered like the attack
+    steps of the asset type, so a lookup is two dict lookups on existing
+    keys and a list index, without building a full name string.
+    """
+
+    def __init__(self, nodes: Iterable[AttackGraphNode] = ()):
+        # Step positions and node array of each asset, by asset id
+        self._asset_nodes: dict[
+            int, tuple[dict[str, int], list[Optional[AttackGraphNode]]]
+        ] = {}
+        self._step_positions: dict[LanguageGraphAsset, dict[str, int]] = {}
+        for node in nodes:
+            self.add(node)
+
+    def __len__(self) -> int:
+        return sum(
+            len(asset_nodes) - asset_nodes.count(None)
+            for _, asset_nodes in self._asset_nodes.values()
+        )
+
+    def get_step_positions(
+        self, lg_asset: LanguageGraphAsset
+    ) -> dict[str, int]:
+        """Return the position of each attack step of an asset type"""
+        positions = self._step_positions.get(lg_asset)
+        if positions is None:
+            positions = self._step_positions[lg_asset] = {
+                name: position
+                for position, name in enumerate(lg_asset.attack_steps)
+            }
+        return positions
+
+    def add(self, node: AttackGraphNode) -> None:
+        """Add a node, nodes without a model asset are not indexed"""
+        asset = node.model_asset
+        if asset is None:
+            return
+        entry = self._asset_nodes.get(asset.id)
+        if entry is None:
+            positions = self.get_step_positions(asset.lg_asset)
+            entry = self._asset_nodes[asset.id] = (
+                positions, [None] * len(positions)
+            )
+        positions, asset_nodes = entry
+        asset_nodes[positions[node.name]] = node
+
+    def remove(self, node: AttackGraphNode) -> None:
+        """Remove a node if it is indexed"""
+        asset = node.model_asset
+        if asset is None or asset.id not in self._asset_nodes:
+            return
+        positions, asset_nodes = self._asset_nodes[asset.id]
+        position = positions[node.name]
+        if asset_nodes[position] is node:
+            asset_nodes[position] = None
+
+    def get(self, asset_id: int, step_name: str) -> AttackGraphNode | None:
+        """Return the node of an attack step of an asset, None if there
+        is none"""
+        entry = self._asset_nodes.get(asset_id)
+        if entry is None:
+            return None
+        positions, asset_nodes = entry
+        position = positions.get(step_name)
+        if position is None:
+            return None
+        return asset_nodes[position]
+
+
+def resolve_expr_chain(
+    model: Model,
+    asset: ModelAsset,
+    expr_chain: Optional[ExpressionsChain],
+    cache: Optional[ExprChainCache] = None
+) -> set[ModelAsset] | frozenset[ModelAsset]:
+    """Follow an expressions chain from a single asset, through the
+    cache if one is given.
+    """
+    if cache is None:
+        return get_traversal_plan(model.lang_graph, expr_chain)((asset,))
+    return cache.resolve(model, asset, expr_chain)
+
+
 def link_node_children(
     model: Model,
     ag_node: AttackGraphNode,
-    full_name_to_node: dict[str, AttackGraphNode]
+    full_name_to_node: dict[str, AttackGraphNode],
+    cache: Optional[ExprChainCache] = None,
+    node_index: Optional[NodeIndex] = None
 ) -> None:
-    """Link one node to its children."""
+    """Link one node to its children. The children are looked up in
+    `node_index` if given, otherwise by full name."""
     if not ag_node.model_asset:
         raise AttackGraphException('Attack graph node is missing asset link')
 
     lg_asset = model.lang_graph.assets[ag_node.model_asset.type]
-    lg_attack_step: LanguageGraphAttackStep | None = (
-        lg_asset.attack_steps[ag_node.name]
+    lg_attack_step = lg_asset.attack_steps[ag_node.name]
+    for child_type, expr_chain in iter_child_expr_chains(lg_attack_step):
+        link_from_expr_chain(
+            model, ag_node, child_type, expr_chain,
+            full_name_to_node, cache, node_index
+        )
+
+
+def iter_child_expr_chains(
+    lg_attack_step: LanguageGraphAttackStep
+) -> Iterator[tuple[LanguageGraphAttackStep, Optional[ExpressionsChain]]]:
+    """Yield the child attack step types of a language graph attack step
+    together with the expressions chains that lead to them, including the
+    ones inherited from the steps it extends.
+
+    The chains are read from the child table the language graph flattens
+    for every attack step, see `LanguageGraphAttackStep.child_table`.
+    """
+    yield from lg_attack_step.child_table
+
+
+def iter_parent_expr_chains(
+    lg_asset: LanguageGraphAsset, step_name: str
+) -> Iterator[tuple[LanguageGraphAttackStep, Optional[ExpressionsChain]]]:
+    """Yield the parent attack step types of the attack step `step_name`
+    of an asset type together with the reverse expressions chains that
+    lead to them.
+
+    Parents can reach the step through any of the asset types the asset
+    type extends, so the same named steps of all of them are included.
+    """
+    for super_asset in lg_asset.super_assets:
+        lg_attack_step = super_asset.attack_steps.get(step_name)
+        if lg_attack_step is None:
+            continue
+        for parent_type, reverse_chains in lg_attack_step.own_parents.items():
+            for reverse_chain in reverse_chains:
+                yield parent_type, reverse_chain
+
+
+def links_to(
+    model: Model,
+    parent_asset: ModelAsset,
+    parent_step: LanguageGraphAttackStep,
+    child_asset: ModelAsset,
+    child_step_name: str,
+    cache: Optional[ExprChainCache] = None
+) -> bool:
+    """Check if an attack step of an asset has the attack step
+    `child_step_name` of another asset as a child"""
+    return any(
+        child_type.name == child_step_name
+        and child_asset in resolve_expr_chain(
+            model, parent_asset, expr_chain, cache
+        )
+        for child_type, expr_chain in iter_child_expr_chains(parent_step)
     )
-    while lg_attack_step:
-        for child_type, expr_chains in lg_attack_step.children.items():
-            for expr_chain in expr_chains:
-                link_from_expr_chain(
-                    model, ag_node, child_type, expr_chain, full_name_to_node
-                )
-        if lg_attack_step.overrides:
-            break
-        lg_attack_step = lg_attack_step.inherits
+
+
+def iter_parent_steps(
+    model: Model,
+    asset: ModelAsset,
+    step_name: str,
+    cache: Optional[ExprChainCache] = None
+) -> Iterator[tuple[ModelAsset, str]]:
+    """Yield the asset and attack step name of every parent of the attack
+    step `step_name` of an asset.
+
+    The reverse chains are followed without the restrictions that can not
+    be reversed exactly, so every candidate parent is verified by following
+    its child expressions chains forward. A parent can be yielded more
+    than once.
+    """
+    for parent_type, reverse_chain in iter_parent_expr_chains(
+        asset.lg_asset, step_name
+    ):
+        for parent_asset in follow_relaxed_expr_chain(
+            (asset,), reverse_chain
+        ):
+            parent_step = parent_asset.lg_asset.attack_steps.get(
+                parent_type.name
+            )
+            if parent_step is not None and links_to(
+                model, parent_asset, parent_step, asset, step_name, cache
+            ):
+                yield parent_asset, parent_type.name
 
 
 def link_from_expr_chain(
@@ -55,7 +317,9 @@ def link_from_expr_chain(
     ag_node: AttackGraphNode,
     child_type: LanguageGraphAttackStep,
     expr_chain: ExpressionsChain | None,
-    full_name_to_node: dict[str, AttackGraphNode]
+    full_name_to_node: dict[str, AttackGraphNode],
+    cache: Optional[ExprChainCache] = None,
+    node_index: Optional[NodeIndex] = None
 ) -> None:
     """Link a node to targets from a specific expression chain."""
     if not ag_node.model_asset:
@@ -63,13 +327,18 @@ def link_from_expr_chain(
             "Need model asset connection to generate graph"
         )
 
-    target_assets = follow_expr_chain(model, {ag_node.model_asset}, expr_chain)
+    target_assets = resolve_expr_chain(
+        model, ag_node.model_asset, expr_chain, cache
+    )
     for target_asset in target_assets:
         if not target_asset:
             continue
-        target_node = get_node_by_full_name(
-            full_name_to_node, f"{target_asset.name}:{child_type.name}"
-        )
+        if node_index is not None:
+            target_node = node_index.get(target_asset.id, child_type.name)
+        else:
+            target_node = full_name_to_node.get(
+                f"{target_asset.name}:{child_type.name}"
+            )
         if not target_node:
             raise AttackGraphStepExpressionError(
                 f'Failed to find target node "{target_asset.name}:{child_type.name}" '
@@ -113,6 +382,16 @@ def follow_transitive_expr_chain(
             '"transitive" step expression chain is missing sub link.'
         )
 
+    if is_distributive(expr_chain.sub_link):
+        sub_link = expr_chain.sub_link
+        return follow_transitive_closure(
+            expr_chain,
+            target_assets,
+            lambda asset: follow_expr_chain(model, {asset}, sub_link)
+        )
+
+    # The closure is collected in a new set, callers may still use theirs
+    target_assets = set(target_assets)
     new_assets = target_assets
     while new_assets := follow_expr_chain(
         model, new_assets, expr_chain.sub_link
@@ -214,6 +493,11 @@ def follow_collect_expr_chain(
         target_assets,
         expr_chain.left_link
     )
+    if is_distributive(expr_chain.right_link):
+        # Following the right link from all left hand targets at once
+        # reaches the same assets as following it from each of them
+        return follow_expr_chain(model, lh_targets, expr_chain.right_link)
+
     rh_targets = set()
     for lh_target in lh_targets:
         rh_targets |= follow_expr_chain(
@@ -227,8 +511,17 @@ def follow_collect_expr_chain(
 def follow_expr_chain(
     model: Model,
     target_assets: set[ModelAsset],
-    expr_chain: Optional[ExpressionsChain]
+    expr_chain: Optional[ExpressionsChain],
+    asset_index: Optional[AssetIndex] = None
 ):
+    """Return the assets reached from the target assets through an
+    expressions chain. With an `asset_index` of the model the sets are
+    followed as bitsets, see `follow_expr_chain_bits`."""
+    if asset_index is not None:
+        return set(asset_index.to_assets(follow_expr_chain_bits(
+            asset_index, asset_index.to_bits(target_assets), expr_chain
+        )))
+
     if expr_chain is None:
         # There is no expressions chain link left to follow return the
         # current target assets
@@ -270,14 +563,508 @@ def follow_expr_chain(
             )
 
 
+def iter_expr_chain(
+    model: Model,
+    target_assets: Iterable[ModelAsset],
+    expr_chain: Optional[ExpressionsChain]
+) -> Iterator[ModelAsset]:
+    """Lazily yield the assets `follow_expr_chain` would return, possibly
+    more than once. Only as much of the model is visited as the consumer
+    asks for, except for intersections and differences whose operands are
+    both non-empty, which are resolved in full.
+    """
+    if expr_chain is None:
+        yield from target_assets
+        return
+
+    match (expr_chain.type):
+        case 'field':
+            fieldname = expr_chain.fieldname
+            if not fieldname:
+                raise LanguageGraphException(
+                    '"field" step expression chain is missing fieldname.'
+                )
+            for asset in target_assets:
+                yield from asset.associated_assets.get(fieldname, ())
+
+        case 'union':
+            target_assets = set(target_assets)
+            yield from iter_expr_chain(
+                model, target_assets, expr_chain.left_link
+            )
+            yield from iter_expr_chain(
+                model, target_assets, expr_chain.right_link
+            )
+
+        case 'intersection' | 'difference':
+            target_assets = set(target_assets)
+            if not exists_expr_chain(
+                model, target_assets, expr_chain.left_link
+            ):
+                return
+            if not exists_expr_chain(
+                model, target_assets, expr_chain.right_link
+            ):
+                if expr_chain.type == 'difference':
+                    # Nothing to take away from the left hand targets
+                    yield from iter_expr_chain(
+                        model, target_assets, expr_chain.left_link
+                    )
+                return
+            yield from follow_union_intersection_difference_expr_chain(
+                model, target_assets, expr_chain
+            )
+
+        case 'transitive':
+            if not expr_chain.sub_link:
+                raise LanguageGraphException(
+                    '"transitive" step expression chain is missing sub link.'
+                )
+            if not is_distributive(expr_chain.sub_link):
+                yield from follow_transitive_expr_chain(
+                    model, set(target_assets), expr_chain
+                )
+                return
+            # The closure starts with the target assets themselves
+            visited = set()
+            pending = list(target_assets)
+            while pending:
+                asset = pending.pop()
+                if asset in visited:
+                    continue
+                visited.add(asset)
+                yield asset
+                pending.extend(iter_expr_chain(
+                    model, (asset,), expr_chain.sub_link
+                ))
+
+        case 'subType':
+            if not expr_chain.sub_link:
+                raise LanguageGraphException(
+                    '"subType" step expression chain is missing sub link.'
+                )
+            if not expr_chain.subtype:
+                raise LookupError(
+                    f'Failed to find asset "{expr_chain.subtype}" in '
+                    'the language graph.'
+                )
+            allowed_types = expr_chain.subtype.sub_assets
+            for asset in iter_expr_chain(
+                model, target_assets, expr_chain.sub_link
+            ):
+                if asset.lg_asset in allowed_types:
+                    yield asset
+
+        case 'collect':
+            if not expr_chain.left_link:
+                raise LanguageGraphException(
+                    '"collect" step expression chain missing the left link.'
+                )
+            if not expr_chain.right_link:
+                raise LanguageGraphException(
+                    '"collect" step expression chain missing the right link.'
+                )
+            # Following the right link from each left hand target gives
+            # the same assets whether or not the right link distributes
+            lh_targets = set()
+            for lh_target in iter_expr_chain(
+                model, target_assets, expr_chain.left_link
+            ):
+                if lh_target in lh_targets:
+                    continue
+                lh_targets.add(lh_target)
+                yield from iter_expr_chain(
+                    model, (lh_target,), expr_chain.right_link
+                )
+
+        case _:
+            msg = 'Unknown attack expressions chain type: %s'
+            logger.error(msg, expr_chain.type)
+            raise AttackGraphStepExpressionError(msg % expr_chain.type)
+
+
+def exists_expr_chain(
+    model: Model,
+    target_assets: Iterable[ModelAsset],
+    expr_chain: Optional[ExpressionsChain]
+) -> bool:
+    """Return True if following the expressions chain from the target
+    assets reaches any asset, stopping at the first one found"""
+    for _ in iter_expr_chain(model, target_assets, expr_chain):
+        return True
+    return False
+
+
+def follow_field_expr_chain_bits(
+    asset_index: AssetIndex, target_bits: int, expr_chain: ExpressionsChain
+) -> int:
+    if not expr_chain.fieldname:
+        raise LanguageGraphException(
+            '"field" step expression chain is missing fieldname.'
+        )
+    field_rows = asset_index.get_field_rows(expr_chain.fieldname)
+    new_target_bits = 0
+    for position in iter_bits(target_bits):
+        new_target_bits |= field_rows.get(position, 0)
+    return new_target_bits
+
+
+def follow_transitive_expr_chain_bits(
+    asset_index: AssetIndex, target_bits: int, expr_chain: ExpressionsChain
+) -> int:
+    if not expr_chain.sub_link:
+        raise LanguageGraphException(
+            '"transitive" step expression chain is missing sub link.'
+        )
+    new_bits = target_bits
+    while new_bits := follow_expr_chain_bits(
+        asset_index, new_bits, expr_chain.sub_link
+    ) & ~target_bits:
+        target_bits |= new_bits
+    return target_bits
+
+
+def follow_subtype_expr_chain_bits(
+    asset_index: AssetIndex, target_bits: int, expr_chain: ExpressionsChain
+) -> int:
+    if not expr_chain.sub_link:
+        raise LanguageGraphException(
+            '"subType" step expression chain is missing sub link.'
+        )
+    if not expr_chain.subtype:
+        raise LookupError(
+            f'Failed to find asset "{expr_chain.subtype}" in '
+            'the language graph.'
+        )
+    return (
+        follow_expr_chain_bits(asset_index, target_bits, expr_chain.sub_link)
+        & asset_index.get_type_mask(expr_chain.subtype)
+    )
+
+
+def follow_union_intersection_difference_expr_chain_bits(
+    asset_index: AssetIndex, target_bits: int, expr_chain: ExpressionsChain
+) -> int:
+    if not expr_chain.left_link:
+        raise LanguageGraphException(
+            f'"{expr_chain.type}" step expression chain is missing the '
+            'left link.'
+        )
+    if not expr_chain.right_link:
+        raise LanguageGraphException(
+            f'"{expr_chain.type}" step expression chain is missing the '
+            'right link.'
+        )
+    lh_bits = follow_expr_chain_bits(
+        asset_index, target_bits, expr_chain.left_link
+    )
+    rh_bits = follow_expr_chain_bits(
+        asset_index, target_bits, expr_chain.right_link
+    )
+
+    if expr_chain.type == 'union':
+        return lh_bits | rh_bits
+
+    if expr_chain.type == 'intersection':
+        return lh_bits & rh_bits
+
+    if expr_chain.type == 'difference':
+        return lh_bits & ~rh_bits
+
+    raise ValueError("Expr chain must be of type union, intersectin or difference")
+
+
+def follow_collect_expr_chain_bits(
+    asset_index: AssetIndex, target_bits: int, expr_chain: ExpressionsChain
+) -> int:
+    if not expr_chain.left_link:
+        raise LanguageGraphException(
+            '"collect" step expression chain missing the left link.'
+        )
+    if not expr_chain.right_link:
+        raise LanguageGraphException(
+            '"collect" step expression chain missing the right link.'
+        )
+    lh_bits = follow_expr_chain_bits(
+        asset_index, target_bits, expr_chain.left_link
+    )
+    if is_distributive(expr_chain.right_link):
+        return follow_expr_chain_bits(
+            asset_index, lh_bits, expr_chain.right_link
+        )
+
+    rh_bits = 0
+    for position in iter_bits(lh_bits):
+        rh_bits |= follow_expr_chain_bits(
+            asset_index, 1 << position, expr_chain.right_link
+        )
+    return rh_bits
+
+
+def follow_expr_chain_bits(
+    asset_index: AssetIndex,
+    target_bits: int,
+    expr_chain: Optional[ExpressionsChain]
+) -> int:
+    """Follow an expressions chain like `follow_expr_chain`, with the
+    asset sets represented as bitsets over the positions of the assets in
+    `asset_index`. Set operations are then integer operations.
+    """
+    if expr_chain is None:
+        return target_bits
+
+    match (expr_chain.type):
+        case 'union' | 'intersection' | 'difference':
+            return follow_union_intersection_difference_expr_chain_bits(
+                asset_index, target_bits, expr_chain
+            )
+
+        case 'field':
+            return follow_field_expr_chain_bits(
+                asset_index, target_bits, expr_chain
+            )
+
+        case 'transitive':
+            return follow_transitive_expr_chain_bits(
+                asset_index, target_bits, expr_chain
+            )
+
+        case 'subType':
+            return follow_subtype_expr_chain_bits(
+                asset_index, target_bits, expr_chain
+            )
+
+        case 'collect':
+            return follow_collect_expr_chain_bits(
+                asset_index, target_bits, expr_chain
+            )
+
+        case _:
+            msg = 'Unknown attack expressions chain type: %s'
+            logger.error(msg, expr_chain.type)
+            raise AttackGraphStepExpressionError(msg % expr_chain.type)
+
+
+def follow_relaxed_expr_chain(
+    target_assets: Iterable[ModelAsset],
+    expr_chain: Optional[ExpressionsChain]
+) -> set[ModelAsset]:
+    """Follow an expressions chain like `follow_expr_chain`, but without
+    the restrictions of differences and subtype filters. The result is a
+    superset of the exact result.
+    """
+    if expr_chain is None:
+        return set(target_assets)
+
+    match (expr_chain.type):
+        case 'field':
+            new_target_assets: set[ModelAsset] = set()
+            for asset in target_assets:
+                new_target_assets.update(
+                    asset.associated_assets.get(expr_chain.fieldname, ())
+                )
+            return new_target_assets
+
+        case 'union':
+            target_assets = set(target_assets)
+            return (
+                follow_relaxed_expr_chain(target_assets, expr_chain.left_link)
+                | follow_relaxed_expr_chain(
+                    target_assets, expr_chain.right_link
+                )
+            )
+
+        case 'intersection':
+            target_assets = set(target_assets)
+            return (
+                follow_relaxed_expr_chain(target_assets, expr_chain.left_link)
+                & follow_relaxed_expr_chain(
+                    target_assets, expr_chain.right_link
+                )
+            )
+
+        case 'difference':
+            return follow_relaxed_expr_chain(
+                target_assets, expr_chain.left_link
+            )
+
+        case 'collect':
+            return follow_relaxed_expr_chain(
+                follow_relaxed_expr_chain(
+                    target_assets, expr_chain.left_link
+                ),
+                expr_chain.right_link
+            )
+
+        case 'subType':
+            return follow_relaxed_expr_chain(
+                target_assets, expr_chain.sub_link
+            )
+
+        case 'transitive':
+            result = set(target_assets)
+            new_assets = result
+            while new_assets := follow_relaxed_expr_chain(
+                new_assets, expr_chain.sub_link
+            ):
+                new_assets -= result
+                if not new_assets:
+                    break
+                result |= new_assets
+            return result
+
+        case _:
+            raise AttackGraphStepExpressionError(
+                f'Unknown attack expressions chain type: {expr_chain.type}'
+            )
+
+
 def link_nodes_by_language(
-    model: Model, full_name_to_node: dict[str, AttackGraphNode]
+    model: Model,
+    full_name_to_node: dict[str, AttackGraphNode],
+    cache: Optional[ExprChainCache] = None,
+    node_index: Optional[NodeIndex] = None
 ):
+    if node_index is None:
+        node_index = NodeIndex(full_name_to_node.values())
     for ag_node in full_name_to_node.values():
-        link_node_children(model, ag_node, full_name_to_node)
+        link_node_children(
+            model, ag_node, full_name_to_node, cache, node_index
+        )
+
+
+def link_nodes_by_matrix(
+    model: Model,
+    full_name_to_node: dict[str, AttackGraphNode],
+    node_index: Optional[NodeIndex] = None
+) -> None:
+    """Link all nodes to their children, evaluating the child chains of
+    each attack step for all assets of its asset type at once as boolean
+    matrices, see `maltoolbox.attackgraph.matrix`. The result is identical
+    to `link_nodes_by_language`.
+
+    Arguments:
+    ---------
+    model               - the model the nodes were created from
+    full_name_to_node   - all nodes of the attack graph by full name
+    node_index          - index of the same nodes, built if not given
+
+    """
+    if node_index is None:
+        node_index = NodeIndex(full_name_to_node.values())
+    for asset, step_name, target_asset, child_name in iter_matrix_edges(
+        model
+    ):
+        ag_node = node_index.get(asset.id, step_name)
+        if not ag_node:
+            raise AttackGraphException(
+                f'Failed to find node "{asset.name}:{step_name}"'
+            )
+        target_node = node_index.get(target_asset.id, child_name)
+        if not target_node:
+            raise AttackGraphStepExpressionError(
+                'Failed to find target node '
+                f'"{target_asset.name}:{child_name}" '
+                f'for "{ag_node.full_name}"({ag_node.id})'
+            )
+        ag_node.children.add(target_node)
+        target_node.parents.add(ag_node)
+
+
+# Model of a parallel generation worker process, set by _init_link_worker
+_worker_model: Optional[Model] = None
+
+
+def _init_link_worker(model: Model) -> None:
+    global _worker_model
+    _worker_model = model
+
+
+def _resolve_asset_edges(
+    asset_ids: list[int]
+) -> list[tuple[int, str, int, str]]:
+    """Resolve the children of all attack steps of the given assets in a
+    worker process.
+
+    Return:
+    ------
+    A list of (asset id, attack step name, child asset id, child attack
+    step name) tuples, one per edge.
+
+    """
+    model = _worker_model
+    assert model, "Link worker was not initialized with a model"
+    cache = ExprChainCache()
+    edges = []
+    for asset_id in asset_ids:
+        asset = model.assets[asset_id]
+        for lg_attack_step in asset.lg_asset.attack_steps.values():
+            for child_type, expr_chain in iter_child_expr_chains(
+                lg_attack_step
+            ):
+                for target_asset in cache.resolve(model, asset, expr_chain):
+                    edges.append((
+                        asset_id, lg_attack_step.name,
+                        target_asset.id, child_type.name
+                    ))
+    return edges
+
+
+def link_nodes_by_language_parallel(
+    model: Model,
+    full_name_to_node: dict[str, AttackGraphNode],
+    workers: int,
+    node_index: Optional[NodeIndex] = None
+) -> None:
+    """Link all nodes to their children using a pool of worker processes.
+
+    The assets of the model are split in chunks and every worker resolves
+    the child links of the nodes of its own assets. The edges are then
+    added to the nodes in this process, so the result is identical to
+    `link_nodes_by_language`.
+
+    Arguments:
+    ---------
+    model               - the model the nodes were created from
+    full_name_to_node   - all nodes of the attack graph by full name
+    workers             - the number of worker processes to use
+    node_index          - index of the same nodes, built if not given
+
+    """
+    if node_index is None:
+        node_index = NodeIndex(full_name_to_node.values())
+    asset_ids = list(model.assets)
+    # A few chunks per worker evens out differences in asset cost
+    num_chunks = min(len(asset_ids), workers * 4) or 1
+    chunks = [asset_ids[i::num_chunks] for i in range(num_chunks)]
+
+    logger.debug(
+        'Linking %d assets with %d worker processes.',
+        len(asset_ids), workers
+    )
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_link_worker,
+        initargs=(model,)
+    ) as executor:
+        for edges in executor.map(_resolve_asset_edges, chunks):
+            for asset_id, step_name, target_id, child_name in edges:
+                ag_node = node_index.get(asset_id, step_name)
+                assert ag_node, "Link worker returned an unknown node"
+                target_node = node_index.get(target_id, child_name)
+                if not target_node:
+                    raise AttackGraphStepExpressionError(
+                        'Failed to find target node '
+                        f'"{model.assets[target_id].name}:{child_name}" '
+                        f'for "{ag_node.full_name}"({ag_node.id})'
+                    )
+                ag_node.children.add(target_node)
+                target_node.parents.add(ag_node)
 
 
-def create_nodes_from_model(model: Model):
+def create_nodes_from_model(
+    model: Model, cache: Optional[ExprChainCache] = None
+):
     id_to_node = {}
     full_name_to_node = {}
     attack_steps = []
@@ -291,9 +1078,11 @@ def create_nodes_from_model(model: Model):
                 node_id=node_id,
                 lg_attack_step=lg_attack_step,
                 model_asset=asset,
-                ttc_dist=get_ttc_dist(asset, lg_attack_step),
+                ttc_dist=get_ttc_override(asset, lg_attack_step),
                 existence_status=(
-                    get_existance_status(model, asset, lg_attack_step)
+                    get_existance_status(
+                        model, asset, lg_attack_step, cache
+                    )
                 ),
             )
             asset.attack_step_nodes.append(node) # TODO: deprecate this
@@ -309,21 +1098,213 @@ def create_nodes_from_model(model: Model):
 
     return id_to_node, attack_steps, defense_steps, full_name_to_node
 
+def get_first_node_ids(model: Model) -> dict[int, int]:
+    """Return the id the first node of each asset gets when the nodes are
+    created by `create_nodes_from_model`, by asset id. The nodes of an
+    asset follow in the order of the attack steps of its asset type.
+    """
+    first_node_ids = {}
+    node_id = 0
+    for asset in model.assets.values():
+        first_node_ids[asset.id] = node_id
+        node_id += len(asset.lg_asset.attack_steps)
+    return first_node_ids
+
+
+class SlicedNodes:
+    """The nodes of a sliced attack graph, created on request with the
+    ids they would get in the full attack graph of the model"""
+
+    def __init__(self, model: Model, cache: ExprChainCache):
+        self.model = model
+        self.cache = cache
+        self.nodes: list[AttackGraphNode] = []
+        self.node_index = NodeIndex()
+        self._first_node_ids = get_first_node_ids(model)
+
+    def get_node(
+        self, asset: ModelAsset, step_name: str
+    ) -> tuple[AttackGraphNode, bool]:
+        """Return the node of an attack step of an asset and whether it
+        was created by this call"""
+        node = self.node_index.get(asset.id, step_name)
+        if node is not None:
+            return node, False
+
+        positions = self.node_index.get_step_positions(asset.lg_asset)
+        lg_attack_step = asset.lg_asset.attack_steps[step_name]
+        node = AttackGraphNode(
+            node_id=self._first_node_ids[asset.id] + positions[step_name],
+            lg_attack_step=lg_attack_step,
+            model_asset=asset,
+            ttc_dist=get_ttc_override(asset, lg_attack_step),
+            existence_status=get_existance_status(
+                self.model, asset, lg_attack_step, self.cache
+            ),
+        )
+        self.nodes.append(node)
+        self.node_index.add(node)
+        return node, True
+
+    def get_node_by_full_name(self, full_name: str) -> AttackGraphNode:
+        """Return the node with the given full name, creating it if needed.
+
+        Raises LookupError if the model has no such attack step.
+        """
+        # Asset names may contain colons, attack step names can not
+        asset_name, _, step_name = full_name.rpartition(':')
+        asset = self.model.get_asset_by_name(asset_name)
+        if asset is None or step_name not in asset.lg_asset.attack_steps:
+            raise LookupError(
+                f'Could not find attack step "{full_name}" in model '
+                f'"{self.model.name}".'
+            )
+        return self.get_node(asset, step_name)[0]
+
+    def to_graph(self):
+        """Return the node lookups and step lists of the sliced nodes in
+        the format of `create_nodes_from_model`"""
+        id_to_node = {}
+        full_name_to_node = {}
+        attack_steps = []
+        defense_steps = []
+        for asset in self.model.assets.values():
+            asset.attack_step_nodes = [] # TODO: deprecate this
+        for node in sorted(self.nodes, key=lambda n: n.id):
+            assert node.model_asset, "Attack graph node is missing asset link"
+            node.model_asset.attack_step_nodes.append(node)
+            id_to_node[node.id] = node
+            full_name_to_node[node.full_name] = node
+            if node.type in ('or', 'and'):
+                attack_steps.append(node)
+            elif node.type == 'defense':
+                defense_steps.append(node)
+        return id_to_node, attack_steps, defense_steps, full_name_to_node
+
+
+def create_forward_slice(
+    model: Model,
+    entry_points: Iterable[str],
+    cache: Optional[ExprChainCache] = None
+):
+    """Create and link only the nodes reachable from the entry points.
+
+    Arguments:
+    ---------
+    model           - the model to generate the attack graph from
+    entry_points    - full names (asset:step) of the nodes to start from
+    cache           - expression chain cache to resolve the chains through
+
+    Return:
+    ------
+    The node lookups and step lists in the format of
+    `create_nodes_from_model`.
+
+    """
+    if cache is None:
+        cache = ExprChainCache()
+    entry_points = list(entry_points)
+    sliced_nodes = SlicedNodes(model, cache)
+    queue = [
+        sliced_nodes.get_node_by_full_name(full_name)
+        for full_name in entry_points
+    ]
+    while queue:
+        ag_node = queue.pop()
+        assert ag_node.model_asset, "Attack graph node is missing asset link"
+        for child_type, expr_chain in iter_child_expr_chains(
+            ag_node.lg_attack_step
+        ):
+            for target_asset in cache.resolve(
+                model, ag_node.model_asset, expr_chain
+            ):
+                target_node, created = sliced_nodes.get_node(
+                    target_asset, child_type.name
+                )
+                if created:
+                    queue.append(target_node)
+                ag_node.children.add(target_node)
+                target_node.parents.add(ag_node)
+
+    logger.debug(
+        'Forward slice from %d entry points has %d nodes.',
+        len(entry_points), len(sliced_nodes.nodes)
+    )
+    return sliced_nodes.to_graph()
+
+
+def create_backward_slice(
+    model: Model,
+    targets: Iterable[str],
+    cache: Optional[ExprChainCache] = None
+):
+    """Create and link only the target nodes and the nodes they can be
+    reached from, by following the reverse expressions chains of the
+    language graph.
+
+    Arguments:
+    ---------
+    model           - the model to generate the attack graph from
+    targets         - full names (asset:step) of the nodes to end at
+    cache           - expression chain cache to resolve the chains through
+
+    Return:
+    ------
+    The node lookups and step lists in the format of
+    `create_nodes_from_model`.
+
+    """
+    if cache is None:
+        cache = ExprChainCache()
+    targets = list(targets)
+    sliced_nodes = SlicedNodes(model, cache)
+    queue = [
+        sliced_nodes.get_node_by_full_name(full_name)
+        for full_name in targets
+    ]
+    while queue:
+        ag_node = queue.pop()
+        assert ag_node.model_asset, "Attack graph node is missing asset link"
+        for parent_asset, parent_step_name in iter_parent_steps(
+            model, ag_node.model_asset, ag_node.name, cache
+        ):
+            parent_node, created = sliced_nodes.get_node(
+                parent_asset, parent_step_name
+            )
+            if created:
+                queue.append(parent_node)
+            parent_node.children.add(ag_node)
+            ag_node.parents.add(parent_node)
+
+    logger.debug(
+        'Backward slice to %d targets has %d nodes.',
+        len(targets), len(sliced_nodes.nodes)
+    )
+    return sliced_nodes.to_graph()
+
+
 def _get_potential_context(
     model: Model,
     asset: ModelAsset,
     nodes: dict[str, AttackGraphNode],
     lg_detector: LanguageGraphDetector,
+    cache: Optional[ExprChainCache] = None,
+    skip_missing: bool = False
 ) -> dict[str, set[AttackGraphNode]]:
 
     context: dict[str, set[AttackGraphNode]] = {}
     for context_label, context_item in lg_detector.context.items():
-        target_assets = follow_expr_chain(model, {asset}, context_item.expr)
+        target_assets = resolve_expr_chain(
+            model, asset, context_item.expr, cache
+        )
         for target_asset in target_assets:
-            target_node = get_node_by_full_name(
-                nodes,
+            target_full_name = (
                 f"{target_asset.name}:{context_item.attack_step_name}"
             )
+            if skip_missing and target_full_name not in nodes:
+                # Context node is not part of a sliced graph
+                continue
+            target_node = get_node_by_full_name(nodes, target_full_name)
             if not target_node:
                 raise AttackGraphException(
                     f'Failed to find target node for context item "{context_label}" '
@@ -332,39 +1313,131 @@ def _get_potential_context(
             context.setdefault(context_label, set()).add(target_node)
     return context
 
+def _create_node_detectors(
+        node: AttackGraphNode,
+        nodes: dict[str, AttackGraphNode],
+        model: Model,
+        cache: Optional[ExprChainCache] = None,
+        skip_missing: bool = False
+    ) -> dict[str, Detector]:
+    """Create the detectors of one node, `nodes` are all of the nodes of
+    the attack graph by full name. With `skip_missing` context nodes that
+    are not in `nodes` are left out instead of raising an error."""
+    node_detectors = {}
+    for det_label, lg_detector in node.lg_attack_step.detectors.items():
+        assert node.model_asset, "Attack graph node is missing asset link"
+        node_detectors[det_label] = Detector(
+            name=det_label,
+            node=node,
+            potential_context=_get_potential_context(
+                model, node.model_asset, nodes, lg_detector, cache,
+                skip_missing
+            ),
+            tprate=lg_detector.tprate,
+            fprate=lg_detector.fprate,
+        )
+    return node_detectors
+
+
 def _create_detectors(
-        nodes: dict[str, AttackGraphNode], model: Model
+        nodes: dict[str, AttackGraphNode],
+        model: Model,
+        cache: Optional[ExprChainCache] = None,
+        skip_missing: bool = False
     ) -> list[Detector]:
     detectors: list[Detector] = []
     for node in nodes.values():
-        node_detectors = {}
-        for det_label, lg_detector in node.lg_attack_step.detectors.items():
-            assert node.model_asset, "Attack graph node is missing asset link"
-            node_detectors[det_label] = Detector(
-                name=det_label,
-                node=node,
-                potential_context=_get_potential_context(
-                    model, node.model_asset, nodes, lg_detector
-                ),
-                tprate=lg_detector.tprate,
-                fprate=lg_detector.fprate,
-            )
+        if not node.lg_attack_step.detectors:
+            # Leave the detectors of the node unallocated
+            continue
+        node_detectors = _create_node_detectors(
+            node, nodes, model, cache, skip_missing
+        )
         node.detectors = node_detectors
         detectors.extend(node_detectors.values())
     return detectors
 
 
-def generate_graph(model: Model):
-    id_to_node, attack_steps, defense_steps, full_name_to_node = create_nodes_from_model(model)
-    link_nodes_by_language(model, full_name_to_node)
-    detectors = _create_detectors(full_name_to_node, model)
+def generate_graph(
+    model: Model,
+    cache: Optional[ExprChainCache] = None,
+    workers: Optional[int] = None,
+    entry_points: Optional[Iterable[str]] = None,
+    targets: Optional[Iterable[str]] = None,
+    matrix: bool = False
+):
+    """Generate the attack graph nodes, edges and detectors for a model.
+
+    Arguments:
+    ---------
+    model           - the model to generate the attack graph from
+    cache           - expression chain cache shared by all of the chain
+                      lookups of this generation. A new one is created if
+                      not given.
+    workers         - number of worker processes used to link the nodes.
+                      The nodes are linked in this process if not given
+                      or 1.
+    entry_points    - full names (asset:step) of attack steps. If given
+                      only the nodes reachable from them are generated,
+                      with the same ids they have in the full graph.
+                      Detector contexts only include generated nodes.
+    targets         - full names (asset:step) of attack steps. If given
+                      only the targets and the nodes they can be reached
+                      from are generated, like for `entry_points`. Can not
+                      be combined with `entry_points`.
+    matrix          - link the nodes by evaluating the child chains as
+                      boolean matrices over all assets of each asset type,
+                      with `link_nodes_by_matrix`. Can not be combined with
+                      `workers`, sliced graphs are always linked per node.
+
+    """
+    if cache is None:
+        cache = ExprChainCache()
+    if entry_points is not None and targets is not None:
+        raise ValueError('Give either entry points or targets, not both')
+    if matrix and workers is not None and workers > 1:
+        raise ValueError('Matrix linking can not use worker processes')
+
+    if entry_points is not None or targets is not None:
+        if entry_points is not None:
+            sliced_graph = create_forward_slice(model, entry_points, cache)
+        else:
+            assert targets is not None
+            sliced_graph = create_backward_slice(model, targets, cache)
+        id_to_node, attack_steps, defense_steps, full_name_to_node = (
+            sliced_graph
+        )
+        detectors = _create_detectors(
+            full_name_to_node, model, cache, skip_missing=True
+        )
+        logger.debug('Generated sliced attack graph with %s', cache)
+        return (
+            id_to_node, attack_steps, defense_steps, full_name_to_node,
+            detectors
+        )
+
+    id_to_node, attack_steps, defense_steps, full_name_to_node = (
+        create_nodes_from_model(model, cache)
+    )
+    node_index = NodeIndex(id_to_node.values())
+    if matrix:
+        link_nodes_by_matrix(model, full_name_to_node, node_index)
+    elif workers is not None and workers > 1:
+        link_nodes_by_language_parallel(
+            model, full_name_to_node, workers, node_index
+        )
+    else:
+        link_nodes_by_language(model, full_name_to_node, cache, node_index)
+    detectors = _create_detectors(full_name_to_node, model, cache)
+    logger.debug('Generated attack graph with %s', cache)
     return id_to_node, attack_steps, defense_steps, full_name_to_node, detectors
 
 
 def get_existance_status(
         model: Model,
         asset: ModelAsset,
-        lg_attack_step: LanguageGraphAttackStep
+        lg_attack_step: LanguageGraphAttackStep,
+        cache: Optional[ExprChainCache] = None
     ):
 
     if lg_attack_step.type not in ('exist', 'notExist'):
@@ -373,13 +1446,19 @@ def get_existance_status(
 
     existence_status = False
     for requirement in lg_attack_step.requires:
-        target_assets = follow_expr_chain(
-            model, set([asset]), requirement
+        target_assets = (
+            cache.get(asset, requirement) if cache is not None else None
         )
+        if target_assets is None:
+            # Only the first required asset is looked up, the chain
+            # does not need to be resolved in full
+            requirement_met = exists_expr_chain(model, (asset,), requirement)
+        else:
+            requirement_met = bool(target_assets)
         # If the step expression resolution yielded
         # the target assets then the required assets
         # exist in the model.
-        if target_assets:
+        if requirement_met:
             existence_status = True
             break
     return existence_status
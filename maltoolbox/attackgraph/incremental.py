@@ -0,0 +1,245 @@
+"""Incremental attack graph maintenance
+
+When an association between model assets changes, only the expression
+chains that follow that association can resolve differently, and only
+from the source assets whose chain evaluation passes through one of the
+assets involved. These functions find those source assets by walking the
+chains in reverse, from the changed assets back towards the sources, so
+that an attack graph can re-link them instead of regenerating everything.
+
+The reverse walk over-approximates: intersections and differences are
+widened and subtype filters are ignored. The resulting set of assets can
+therefore be larger than necessary, but never misses an affected one.
+"""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Iterable, Iterator, Optional
+
+from ..exceptions import AttackGraphStepExpressionError
+
+if TYPE_CHECKING:
+    from ..language import ExpressionsChain, LanguageGraph
+    from ..model import ModelAsset
+
+
+def expr_chain_fieldnames(
+    expr_chain: Optional[ExpressionsChain]
+) -> frozenset[str]:
+    """Return the field names of all field steps in an expressions chain"""
+    if expr_chain is None:
+        return frozenset()
+    if expr_chain.type == 'field':
+        assert expr_chain.fieldname, '"field" chain is missing fieldname'
+        return frozenset((expr_chain.fieldname,))
+    return (
+        expr_chain_fieldnames(expr_chain.left_link)
+        | expr_chain_fieldnames(expr_chain.right_link)
+        | expr_chain_fieldnames(expr_chain.sub_link)
+    )
+
+
+def iter_language_expr_chains(
+    lang_graph: LanguageGraph
+) -> Iterator[ExpressionsChain]:
+    """Yield every expressions chain that attack graph generation follows:
+    attack step children, existence requirements and detector contexts.
+    """
+    for lg_asset in lang_graph.assets.values():
+        for lg_attack_step in lg_asset.attack_steps.values():
+            for expr_chains in lg_attack_step.own_children.values():
+                yield from (c for c in expr_chains if c is not None)
+            yield from lg_attack_step.own_requires
+            for lg_detector in lg_attack_step.detectors.values():
+                for context_item in lg_detector.context.values():
+                    if context_item.expr is not None:
+                        yield context_item.expr
+
+
+def index_expr_chains_by_fieldname(
+    lang_graph: LanguageGraph
+) -> dict[str, list[ExpressionsChain]]:
+    """Map every field name to the distinct expressions chains that follow
+    it at least once.
+    """
+    seen: set[int] = set()
+    index: dict[str, list[ExpressionsChain]] = {}
+    for expr_chain in iter_language_expr_chains(lang_graph):
+        if id(expr_chain) in seen:
+            continue
+        seen.add(id(expr_chain))
+        for fieldname in expr_chain_fieldnames(expr_chain):
+            index.setdefault(fieldname, []).append(expr_chain)
+    return index
+
+
+def follow_inverse_expr_chain(
+    target_assets: Iterable[ModelAsset],
+    expr_chain: Optional[ExpressionsChain]
+) -> set[ModelAsset]:
+    """Return a superset of the assets from which following `expr_chain`
+    reaches at least one of `target_assets`.
+    """
+    if expr_chain is None:
+        return set(target_assets)
+
+    match (expr_chain.type):
+        case 'field':
+            assert expr_chain.association and expr_chain.fieldname
+            opposite_fieldname = (
+                expr_chain.association.get_opposite_fieldname(
+                    expr_chain.fieldname
+                )
+            )
+            sources: set[ModelAsset] = set()
+            for asset in target_assets:
+                sources.update(
+                    asset.associated_assets.get(opposite_fieldname, ())
+                )
+            return sources
+
+        case 'union':
+            target_assets = set(target_assets)
+            return (
+                follow_inverse_expr_chain(target_assets, expr_chain.left_link)
+                | follow_inverse_expr_chain(
+                    target_assets, expr_chain.right_link
+                )
+            )
+
+        case 'intersection' | 'difference':
+            # Both only ever keep assets the left hand side reached
+            return follow_inverse_expr_chain(
+                target_assets, expr_chain.left_link
+            )
+
+        case 'collect':
+            return follow_inverse_expr_chain(
+                follow_inverse_expr_chain(
+                    target_assets, expr_chain.right_link
+                ),
+                expr_chain.left_link
+            )
+
+        case 'subType':
+            return follow_inverse_expr_chain(
+                target_assets, expr_chain.sub_link
+            )
+
+        case 'transitive':
+            sources = set(target_assets)
+            new_sources = sources
+            while new_sources := follow_inverse_expr_chain(
+                new_sources, expr_chain.sub_link
+            ):
+                new_sources -= sources
+                if not new_sources:
+                    break
+                sources |= new_sources
+            return sources
+
+        case _:
+            raise AttackGraphStepExpressionError(
+                f'Unknown attack expressions chain type: {expr_chain.type}'
+            )
+
+
+def get_visiting_sources(
+    expr_chain: Optional[ExpressionsChain],
+    fieldnames: frozenset[str],
+    assets: set[ModelAsset]
+) -> set[ModelAsset]:
+    """Return a superset of the source assets from which following
+    `expr_chain` applies a field step named in `fieldnames` to one of
+    `assets`.
+
+    These are the source assets whose result can change when the
+    associations of `assets` through `fieldnames` change.
+    """
+    if expr_chain is None:
+        return set()
+
+    match (expr_chain.type):
+        case 'field':
+            if expr_chain.fieldname in fieldnames:
+                return set(assets)
+            return set()
+
+        case 'union' | 'intersection' | 'difference':
+            return (
+                get_visiting_sources(expr_chain.left_link, fieldnames, assets)
+                | get_visiting_sources(
+                    expr_chain.right_link, fieldnames, assets
+                )
+            )
+
+        case 'collect':
+            sources = get_visiting_sources(
+                expr_chain.left_link, fieldnames, assets
+            )
+            rh_sources = get_visiting_sources(
+                expr_chain.right_link, fieldnames, assets
+            )
+            if rh_sources:
+                sources |= follow_inverse_expr_chain(
+                    rh_sources, expr_chain.left_link
+                )
+            return sources
+
+        case 'subType':
+            return get_visiting_sources(
+                expr_chain.sub_link, fieldnames, assets
+            )
+
+        case 'transitive':
+            sub_sources = get_visiting_sources(
+                expr_chain.sub_link, fieldnames, assets
+            )
+            if not sub_sources:
+                return sub_sources
+            return follow_inverse_expr_chain(sub_sources, expr_chain)
+
+        case _:
+            raise AttackGraphStepExpressionError(
+                f'Unknown attack expressions chain type: {expr_chain.type}'
+            )
+
+
+def get_affected_assets(
+    chains_by_fieldname: dict[str, list[ExpressionsChain]],
+    asset: ModelAsset,
+    fieldname: str,
+    associated_assets: set[ModelAsset]
+) -> set[ModelAsset]:
+    """Return the assets whose attack step children, existence status or
+    detector context can change when `associated_assets` are added to or
+    removed from the `fieldname` association field of `asset`.
+
+    For an addition call this after the change, for a removal before it,
+    so that the association is part of the reverse walk.
+
+    Arguments:
+    ---------
+    chains_by_fieldname - the result of `index_expr_chains_by_fieldname`
+                          for the language of the model
+    asset               - the asset whose association field changes
+    fieldname           - the association field name on `asset`
+    associated_assets   - the assets added to or removed from the field
+
+    """
+    lg_assoc = asset.lg_asset.associations[fieldname]
+    opposite_fieldname = lg_assoc.get_opposite_fieldname(fieldname)
+    fieldnames = frozenset((fieldname, opposite_fieldname))
+    changed_assets = {asset, *associated_assets}
+
+    seen: set[int] = set()
+    affected: set[ModelAsset] = set()
+    for name in fieldnames:
+        for expr_chain in chains_by_fieldname.get(name, ()):
+            if id(expr_chain) in seen:
+                continue
+            seen.add(id(expr_chain))
+            affected |= get_visiting_sources(
+                expr_chain, fieldnames, changed_assets
+            )
+    return affected
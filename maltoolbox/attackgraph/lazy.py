@@ -0,0 +1,364 @@
+"""Lazy, on-demand attack graph materialization
+
+A lazy attack graph creates a node the first time it is looked up, by id
+or by full name, and resolves the children or parents of a node the first
+time they are read. Regions of the model that are never visited cost
+nothing.
+
+Nodes get the same ids as they would in an eagerly generated graph of the
+same model: the nodes of each asset follow the nodes of the assets before
+it in the model, in the order of the attack steps of the asset type.
+
+Children are found by following the expressions chains of the attack step
+from the asset of the node. Parents are found by following the reverse
+chains stored in `LanguageGraphAttackStep.own_parents`. The reverse of an
+intersection, a difference or a subtype filter is not exact, so reverse
+chains are followed without those restrictions and every candidate parent
+is then checked by following its own chains forward.
+"""
+
+from __future__ import annotations
+
+import copy
+import logging
+from bisect import bisect_right
+from collections.abc import MutableSet
+from typing import TYPE_CHECKING, Callable, Iterable, Iterator
+
+from .generate import (
+    ExprChainCache,
+    _create_node_detectors,
+    get_existance_status,
+    iter_child_expr_chains,
+    iter_parent_steps,
+)
+from .node import AttackGraphNode
+from .ttcs import get_ttc_override
+
+if TYPE_CHECKING:
+    from ..language import LanguageGraphAsset, LanguageGraphAttackStep
+    from ..model import ModelAsset
+    from .attackgraph import AttackGraph
+
+logger = logging.getLogger(__name__)
+
+
+class LazyNodeResolver:
+    """Creates the nodes of a lazy attack graph and resolves their edges
+
+    The model should not be changed while the attack graph is in use, the
+    node ids are assigned from the assets the model had when the resolver
+    was created.
+    """
+
+    def __init__(self, attack_graph: AttackGraph):
+        assert attack_graph.model, "Model required for lazy attack graphs"
+        self.attack_graph = attack_graph
+        self.model = attack_graph.model
+        self.cache = ExprChainCache()
+        # Ids of nodes removed from the graph, they are never created again
+        self.removed_ids: set[int] = set()
+
+        self._assets: list[ModelAsset] = []
+        self._offsets: list[int] = []
+        self._asset_offsets: dict[int, int] = {}
+        self.num_nodes = 0
+        for asset in self.model.assets.values():
+            self._assets.append(asset)
+            self._offsets.append(self.num_nodes)
+            self._asset_offsets[asset.id] = self.num_nodes
+            self.num_nodes += len(asset.lg_asset.attack_steps)
+
+        self._step_names: dict[LanguageGraphAsset, list[str]] = {}
+        self._step_positions: dict[LanguageGraphAsset, dict[str, int]] = {}
+
+    def __getstate__(self) -> dict:
+        state = self.__dict__.copy()
+        # The cached results are keyed by expressions chain identity
+        state['cache'] = ExprChainCache()
+        return state
+
+    def __repr__(self) -> str:
+        return (
+            f'LazyNodeResolver(nodes: {len(self.attack_graph.nodes)} of '
+            f'{self.num_nodes}, cache: {self.cache})'
+        )
+
+    def _get_step_names(self, lg_asset: LanguageGraphAsset) -> list[str]:
+        step_names = self._step_names.get(lg_asset)
+        if step_names is None:
+            step_names = self._step_names[lg_asset] = (
+                list(lg_asset.attack_steps)
+            )
+            self._step_positions[lg_asset] = {
+                name: position for position, name in enumerate(step_names)
+            }
+        return step_names
+
+    def node_id(self, asset: ModelAsset, step_name: str) -> int:
+        """Return the id of the node of an attack step of an asset"""
+        self._get_step_names(asset.lg_asset)
+        return (
+            self._asset_offsets[asset.id]
+            + self._step_positions[asset.lg_asset][step_name]
+        )
+
+    def get_node(
+        self, asset: ModelAsset, step_name: str
+    ) -> AttackGraphNode | None:
+        """Return the node of an attack step of an asset, creating it if
+        it was not created before. None if it was removed from the graph.
+        """
+        node_id = self.node_id(asset, step_name)
+        node = dict.get(self.attack_graph.nodes, node_id)
+        if node is None and node_id not in self.removed_ids:
+            node = self._create_node(
+                node_id, asset, asset.lg_asset.attack_steps[step_name]
+            )
+        return node
+
+    def _locate_id(self, node_id: object) -> tuple[ModelAsset, str] | None:
+        """Return the asset and attack step name of a node id, None if
+        the id is not one of a node of the model"""
+        if (
+            not isinstance(node_id, int)
+            or not 0 <= node_id < self.num_nodes
+        ):
+            return None
+        index = bisect_right(self._offsets, node_id) - 1
+        asset = self._assets[index]
+        step_names = self._get_step_names(asset.lg_asset)
+        return asset, step_names[node_id - self._offsets[index]]
+
+    def _locate_full_name(
+        self, full_name: object
+    ) -> tuple[ModelAsset, str] | None:
+        """Return the asset and attack step name of a node full name, None
+        if the name is not one of a node of the model"""
+        if not isinstance(full_name, str):
+            return None
+        # Asset names may contain colons, attack step names can not
+        asset_name, _, step_name = full_name.rpartition(':')
+        asset = self.model.get_asset_by_name(asset_name)
+        if (
+            asset is None
+            or asset.id not in self._asset_offsets
+            or step_name not in asset.lg_asset.attack_steps
+        ):
+            return None
+        return asset, step_name
+
+    def _has_node(self, location: tuple[ModelAsset, str] | None) -> bool:
+        return (
+            location is not None
+            and self.node_id(*location) not in self.removed_ids
+        )
+
+    def get_node_by_id(self, node_id: object) -> AttackGraphNode | None:
+        """Return the node with the given id, None if there is none"""
+        location = self._locate_id(node_id)
+        return self.get_node(*location) if location else None
+
+    def has_node_id(self, node_id: object) -> bool:
+        """Whether there is a node with the given id, without creating it"""
+        return self._has_node(self._locate_id(node_id))
+
+    def get_node_by_full_name(
+        self, full_name: object
+    ) -> AttackGraphNode | None:
+        """Return the node with the given full name, None if there is none"""
+        location = self._locate_full_name(full_name)
+        return self.get_node(*location) if location else None
+
+    def has_full_name(self, full_name: object) -> bool:
+        """Whether there is a node with the given full name, without
+        creating it"""
+        return self._has_node(self._locate_full_name(full_name))
+
+    def materialize(self) -> None:
+        """Create all nodes of the graph and resolve all of their edges,
+        after which reading the graph no longer creates nodes"""
+        get_node_by_id = self.get_node_by_id
+        for node_id in range(self.num_nodes):
+            if node_id not in self.removed_ids:
+                get_node_by_id(node_id)
+        # All nodes exist, resolving the edges only links them
+        for node in list(self.attack_graph.nodes.values()):
+            len(node.children)
+            len(node.parents)
+
+    def _create_node(
+        self,
+        node_id: int,
+        asset: ModelAsset,
+        lg_attack_step: LanguageGraphAttackStep
+    ) -> AttackGraphNode:
+        logger.debug(
+            'Create lazy node "%s:%s"(%d).',
+            asset.name, lg_attack_step.name, node_id
+        )
+        node = AttackGraphNode(
+            node_id=node_id,
+            lg_attack_step=lg_attack_step,
+            model_asset=asset,
+            ttc_dist=get_ttc_override(asset, lg_attack_step),
+            existence_status=get_existance_status(
+                self.model, asset, lg_attack_step, self.cache
+            ),
+        )
+        node.children = LazyEdgeSet(self, node, reverse=False)
+        node.parents = LazyEdgeSet(self, node, reverse=True)
+
+        attack_graph = self.attack_graph
+        dict.__setitem__(attack_graph.nodes, node_id, node)
+        dict.__setitem__(attack_graph.full_name_to_node, node.full_name, node)
+        if node.type in ('or', 'and'):
+            attack_graph.attack_steps.append(node)
+        elif node.type == 'defense':
+            attack_graph.defense_steps.append(node)
+
+        if lg_attack_step.detectors:
+            node.detectors = _create_node_detectors(
+                node, attack_graph.full_name_to_node, self.model, self.cache
+            )
+            attack_graph.detectors.extend(node.detectors.values())
+        return node
+
+    def resolve_children(self, node: AttackGraphNode) -> set[AttackGraphNode]:
+        """Follow the expressions chains of a node to its children"""
+        assert node.model_asset, "Attack graph node is missing asset link"
+        children = set()
+        for child_type, expr_chain in iter_child_expr_chains(
+            node.lg_attack_step
+        ):
+            for target_asset in self.cache.resolve(
+                self.model, node.model_asset, expr_chain
+            ):
+                child = self.get_node(target_asset, child_type.name)
+                if child is not None:
+                    children.add(child)
+        return children
+
+    def resolve_parents(self, node: AttackGraphNode) -> set[AttackGraphNode]:
+        """Follow the reverse expressions chains of a node to its parents"""
+        assert node.model_asset, "Attack graph node is missing asset link"
+        parents = set()
+        for parent_asset, parent_step_name in iter_parent_steps(
+            self.model, node.model_asset, node.name, self.cache
+        ):
+            parent = self.get_node(parent_asset, parent_step_name)
+            if parent is not None:
+                parents.add(parent)
+        return parents
+
+
+class LazyNodeDict(dict):
+    """Dict of attack graph nodes that creates the node for a key the
+    first time it is looked up.
+
+    Iterating over the dict only covers the nodes created so far, while
+    membership tests cover all nodes without creating them.
+    """
+
+    def __init__(
+        self,
+        resolve: Callable[[object], AttackGraphNode | None],
+        exists: Callable[[object], bool]
+    ):
+        super().__init__()
+        self._resolve = resolve
+        self._exists = exists
+
+    def __missing__(self, key):
+        node = self._resolve(key)
+        if node is None:
+            raise KeyError(key)
+        return node
+
+    def __contains__(self, key) -> bool:
+        return super().__contains__(key) or self._exists(key)
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __deepcopy__(self, memo) -> dict:
+        # Copies only hold the nodes created so far
+        return {
+            copy.deepcopy(key, memo): copy.deepcopy(node, memo)
+            for key, node in self.items()
+        }
+
+
+class LazyEdgeSet(MutableSet):
+    """Set of the children or parents of a node in a lazy attack graph
+
+    The edges are resolved the first time the set is read or modified.
+    """
+
+    __slots__ = ('_node', '_resolver', '_reverse', '_set')
+
+    def __init__(
+        self,
+        resolver: LazyNodeResolver,
+        node: AttackGraphNode,
+        reverse: bool
+    ):
+        self._resolver = resolver
+        self._node = node
+        self._reverse = reverse
+        self._set: set[AttackGraphNode] | None = None
+
+    @classmethod
+    def _from_iterable(cls, it: Iterable) -> set:
+        # Results of set operations are plain sets
+        return set(it)
+
+    @property
+    def resolved(self) -> bool:
+        """Whether the edges have been resolved"""
+        return self._set is not None
+
+    def _resolve(self) -> set[AttackGraphNode]:
+        if self._set is None:
+            if self._reverse:
+                self._set = self._resolver.resolve_parents(self._node)
+            else:
+                self._set = self._resolver.resolve_children(self._node)
+        return self._set
+
+    def __contains__(self, node: object) -> bool:
+        return node in self._resolve()
+
+    def __iter__(self) -> Iterator[AttackGraphNode]:
+        return iter(self._resolve())
+
+    def __len__(self) -> int:
+        return len(self._resolve())
+
+    def add(self, node: AttackGraphNode) -> None:
+        self._resolve().add(node)
+
+    def discard(self, node: AttackGraphNode) -> None:
+        self._resolve().discard(node)
+
+    def remove(self, node: AttackGraphNode) -> None:
+        self._resolve().remove(node)
+
+    def clear(self) -> None:
+        self._set = set()
+
+    def copy(self) -> set[AttackGraphNode]:
+        return set(self._resolve())
+
+    def __deepcopy__(self, memo) -> set[AttackGraphNode]:
+        # Only nodes that are copied along with the attack graph are kept,
+        # nodes created while resolving the edges are not part of the copy
+        return {memo[id(n)] for n in self._resolve() if id(n) in memo}
+
+    def __repr__(self) -> str:
+        if self._set is None:
+            return f'LazyEdgeSet(unresolved, node: {self._node.full_name})'
+        return f'LazyEdgeSet({self._set!r})'
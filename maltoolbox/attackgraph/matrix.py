@@ -0,0 +1,344 @@
+"""Boolean matrix evaluation of expressions chains over a whole model
+
+`link_nodes_by_language` follows the expressions chains of every attack
+step from every asset on its own, with Python sets of assets. This module
+evaluates a chain for all source assets of an asset type in one go,
+treating the chain as a sparse boolean asset-by-asset matrix: row `i` of
+the matrix of a chain holds the assets reached from asset `i`.
+
+Assets are numbered densely by `AssetIndex` and each row is a Python int
+used as a bitset, so the set operations of a chain are word-level integer
+operations on rows:
+
+- a field is the adjacency matrix of the association fieldname
+- union, intersection and difference are element-wise or, and, and not
+- subType masks the rows with the assets of the allowed types
+- collect is the boolean product of the left and right matrices
+- transitive is the reflexive transitive closure of the sub matrix
+
+Rows are only computed for the source assets a chain is evaluated from,
+and for the assets the left links of collects reach from them. Computed
+rows are kept per chain, so chains shared by several attack steps are
+evaluated once per asset.
+"""
+
+from __future__ import annotations
+
+import logging
+from itertools import compress, count
+from typing import TYPE_CHECKING, Iterable, Iterator, Optional
+
+from ..exceptions import (
+    AttackGraphStepExpressionError,
+    LanguageGraphException,
+)
+from ..language.expr_chain_optimizer import (
+    get_optimized_expr_chain,
+    is_distributive,
+)
+from .traversal_plan import get_traversal_plan
+
+if TYPE_CHECKING:
+    from ..language import ExpressionsChain, LanguageGraphAsset
+    from ..model import Model, ModelAsset
+
+    Rows = dict[int, int]
+
+logger = logging.getLogger(__name__)
+
+
+# Turns the binary digits of an int into 0 and 1 bytes
+_BIT_SELECTORS = bytes.maketrans(b'01', b'\x00\x01')
+
+
+def _bit_selectors(bits: int) -> bytes:
+    """Return one byte per bit of an int, lowest first, that is 1 for set
+    bits, for use with `itertools.compress`"""
+    return bin(bits)[:1:-1].encode().translate(_BIT_SELECTORS)
+
+
+def iter_bits(bits: int) -> Iterator[int]:
+    """Yield the positions of the set bits of an int, lowest first"""
+    if bits.bit_count() <= 16:
+        # Clearing the lowest bit copies the int, which is cheap while
+        # there are few bits to clear
+        while bits:
+            lowest_bit = bits & -bits
+            yield lowest_bit.bit_length() - 1
+            bits ^= lowest_bit
+        return
+    yield from compress(count(), _bit_selectors(bits))
+
+
+class AssetIndex:
+    """Dense numbering of the assets of a model, used as bit positions"""
+
+    def __init__(self, assets: Iterable[ModelAsset]):
+        self.assets: list[ModelAsset] = list(assets)
+        self.positions: dict[ModelAsset, int] = {
+            asset: position for position, asset in enumerate(self.assets)
+        }
+        self._type_masks: dict[LanguageGraphAsset, int] = {}
+        self._field_rows: dict[str, Rows] = {}
+
+    def __repr__(self) -> str:
+        return f'AssetIndex(assets: {len(self.assets)})'
+
+    def __len__(self) -> int:
+        return len(self.assets)
+
+    def to_bits(self, assets: Iterable[ModelAsset]) -> int:
+        """Return the bitset of a collection of assets"""
+        positions = self.positions
+        asset_positions = [positions[asset] for asset in assets]
+        if len(asset_positions) <= 16:
+            bits = 0
+            for position in asset_positions:
+                bits |= 1 << position
+            return bits
+
+        # Setting bits one at a time copies the whole int for every asset
+        buffer = bytearray((max(asset_positions) >> 3) + 1)
+        for position in asset_positions:
+            buffer[position >> 3] |= 1 << (position & 7)
+        return int.from_bytes(buffer, 'little')
+
+    def to_assets(self, bits: int) -> list[ModelAsset]:
+        """Return the assets of a bitset"""
+        if bits.bit_count() <= 16:
+            assets = self.assets
+            return [assets[position] for position in iter_bits(bits)]
+        return list(compress(self.assets, _bit_selectors(bits)))
+
+    def get_type_mask(self, lg_asset: LanguageGraphAsset) -> int:
+        """Return the bitset of the assets of an asset type or of any of
+        the types that extend it"""
+        mask = self._type_masks.get(lg_asset)
+        if mask is None:
+            allowed_types = lg_asset.sub_assets
+            mask = self._type_masks[lg_asset] = self.to_bits(
+                asset for asset in self.assets
+                if asset.lg_asset in allowed_types
+            )
+        return mask
+
+    def get_field_rows(self, fieldname: str) -> Rows:
+        """Return the adjacency matrix of an association fieldname. Assets
+        without associated assets in the field have no row."""
+        rows = self._field_rows.get(fieldname)
+        if rows is None:
+            rows = self._field_rows[fieldname] = {
+                position: self.to_bits(associated_assets)
+                for position, asset in enumerate(self.assets)
+                if (associated_assets := asset.associated_assets.get(
+                    fieldname
+                ))
+            }
+        return rows
+
+
+class MatrixEvaluator:
+    """Evaluates expressions chains as boolean matrices over the assets of
+    a model. The model must not change while an evaluator is in use."""
+
+    def __init__(self, model: Model):
+        self.model = model
+        self.asset_index = AssetIndex(model.assets.values())
+        # Computed rows of each chain by chain id, with the chain itself so
+        # that its id can not be reused
+        self._chain_rows: dict[int, tuple[ExpressionsChain, Rows]] = {}
+
+    def __repr__(self) -> str:
+        return (
+            f'MatrixEvaluator(assets: {len(self.asset_index)}, '
+            f'chains: {len(self._chain_rows)})'
+        )
+
+    def evaluate(
+        self,
+        expr_chain: Optional[ExpressionsChain],
+        sources: Iterable[int]
+    ) -> Rows:
+        """Return the rows of the matrix of a chain for the source assets,
+        given by their positions in the asset index."""
+        if expr_chain is None:
+            return {source: 1 << source for source in sources}
+
+        entry = self._chain_rows.get(id(expr_chain))
+        if entry is None or entry[0] is not expr_chain:
+            entry = self._chain_rows[id(expr_chain)] = (expr_chain, {})
+        chain_rows = entry[1]
+
+        sources = list(sources)
+        missing = [source for source in sources if source not in chain_rows]
+        if missing:
+            chain_rows.update(self._evaluate_rows(expr_chain, missing))
+        return {source: chain_rows[source] for source in sources}
+
+    def _evaluate_rows(
+        self, expr_chain: ExpressionsChain, sources: list[int]
+    ) -> Rows:
+        match (expr_chain.type):
+            case 'union' | 'intersection' | 'difference':
+                return self._evaluate_set_operation(expr_chain, sources)
+
+            case 'field':
+                if not expr_chain.fieldname:
+                    raise LanguageGraphException(
+                        '"field" step expression chain is missing fieldname.'
+                    )
+                field_rows = self.asset_index.get_field_rows(
+                    expr_chain.fieldname
+                )
+                return {source: field_rows.get(source, 0) for source in sources}
+
+            case 'transitive':
+                return self._evaluate_transitive(expr_chain, sources)
+
+            case 'subType':
+                if not expr_chain.sub_link:
+                    raise LanguageGraphException(
+                        '"subType" step expression chain is missing sub link.'
+                    )
+                if not expr_chain.subtype:
+                    raise LookupError(
+                        f'Failed to find asset "{expr_chain.subtype}" in '
+                        'the language graph.'
+                    )
+                mask = self.asset_index.get_type_mask(expr_chain.subtype)
+                sub_rows = self.evaluate(expr_chain.sub_link, sources)
+                return {
+                    source: bits & mask for source, bits in sub_rows.items()
+                }
+
+            case 'collect':
+                return self._evaluate_collect(expr_chain, sources)
+
+            case _:
+                msg = 'Unknown attack expressions chain type: %s'
+                logger.error(msg, expr_chain.type)
+                raise AttackGraphStepExpressionError(msg % expr_chain.type)
+
+    def _evaluate_set_operation(
+        self, expr_chain: ExpressionsChain, sources: list[int]
+    ) -> Rows:
+        if not expr_chain.left_link:
+            raise LanguageGraphException(
+                f'"{expr_chain.type}" step expression chain is missing the '
+                'left link.'
+            )
+        if not expr_chain.right_link:
+            raise LanguageGraphException(
+                f'"{expr_chain.type}" step expression chain is missing the '
+                'right link.'
+            )
+        lh_rows = self.evaluate(expr_chain.left_link, sources)
+        rh_rows = self.evaluate(expr_chain.right_link, sources)
+
+        if expr_chain.type == 'union':
+            return {source: lh_rows[source] | rh_rows[source]
+                    for source in sources}
+        if expr_chain.type == 'intersection':
+            return {source: lh_rows[source] & rh_rows[source]
+                    for source in sources}
+        return {source: lh_rows[source] & ~rh_rows[source]
+                for source in sources}
+
+    def _evaluate_collect(
+        self, expr_chain: ExpressionsChain, sources: list[int]
+    ) -> Rows:
+        if not expr_chain.left_link:
+            raise LanguageGraphException(
+                '"collect" step expression chain missing the left link.'
+            )
+        if not expr_chain.right_link:
+            raise LanguageGraphException(
+                '"collect" step expression chain missing the right link.'
+            )
+        lh_rows = self.evaluate(expr_chain.left_link, sources)
+        lh_targets = 0
+        for bits in lh_rows.values():
+            lh_targets |= bits
+        # Each row of the right matrix is followed from its asset alone,
+        # which is what collect does for right links that do not distribute
+        rh_rows = self.evaluate(expr_chain.right_link, iter_bits(lh_targets))
+
+        rows = {}
+        for source, bits in lh_rows.items():
+            row = 0
+            for target in iter_bits(bits):
+                row |= rh_rows[target]
+            rows[source] = row
+        return rows
+
+    def _evaluate_transitive(
+        self, expr_chain: ExpressionsChain, sources: list[int]
+    ) -> Rows:
+        if not expr_chain.sub_link:
+            raise LanguageGraphException(
+                '"transitive" step expression chain is missing sub link.'
+            )
+        if not is_distributive(expr_chain.sub_link):
+            # The sub link is applied to whole sets of new assets, which
+            # rows of single assets can not express
+            asset_index = self.asset_index
+            plan = get_traversal_plan(self.model.lang_graph, expr_chain)
+            return {
+                source: asset_index.to_bits(
+                    plan((asset_index.assets[source],))
+                )
+                for source in sources
+            }
+
+        rows = {}
+        for source in sources:
+            closure = frontier = 1 << source
+            while frontier:
+                sub_rows = self.evaluate(
+                    expr_chain.sub_link, iter_bits(frontier)
+                )
+                reached = 0
+                for bits in sub_rows.values():
+                    reached |= bits
+                frontier = reached & ~closure
+                closure |= frontier
+            rows[source] = closure
+        return rows
+
+
+def iter_matrix_edges(
+    model: Model
+) -> Iterator[tuple[ModelAsset, str, ModelAsset, str]]:
+    """Yield the edges of the attack graph of a model, evaluating every
+    child chain as a matrix over all assets of the asset type of the
+    attack step.
+
+    Return:
+    ------
+    (asset, attack step name, child asset, child attack step name) tuples,
+    one per edge, the same edges `generate.link_nodes_by_language` adds.
+
+    """
+    evaluator = MatrixEvaluator(model)
+    asset_index = evaluator.asset_index
+    lang_graph = model.lang_graph
+
+    sources_by_type: dict[LanguageGraphAsset, list[int]] = {}
+    for position, asset in enumerate(asset_index.assets):
+        sources_by_type.setdefault(asset.lg_asset, []).append(position)
+
+    for lg_asset, sources in sources_by_type.items():
+        for lg_attack_step in lg_asset.attack_steps.values():
+            for child_type, expr_chain in lg_attack_step.child_table:
+                rows = evaluator.evaluate(
+                    get_optimized_expr_chain(lang_graph, expr_chain),
+                    sources
+                )
+                for source, bits in rows.items():
+                    asset = asset_index.assets[source]
+                    for target_asset in asset_index.to_assets(bits):
+                        yield (
+                            asset, lg_attack_step.name,
+                            target_asset, child_type.name
+                        )
+    logger.debug('Evaluated child chains with %s', evaluator)
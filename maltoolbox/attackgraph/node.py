@@ -4,10 +4,11 @@
 from __future__ import annotations
 
 import copy
-from functools import cached_property
+from collections.abc import MutableSet
 from typing import TYPE_CHECKING
 
 from maltoolbox.attackgraph.detector import Detector
+from maltoolbox.language.ttc_dist import freeze_ttc_dist, thaw_ttc_dist
 
 if TYPE_CHECKING:
 
@@ -16,7 +17,27 @@ if TYPE_CHECKING:
 
 
 class AttackGraphNode:
-    """Node part of AttackGraph"""
+    """Node part of AttackGraph
+
+    The name, type, causal mode and info of a node are read from its
+    language graph attack step. The ttc and tags are too unless they are
+    overridden for the node. The extras and detectors dicts are only
+    allocated when they are first accessed.
+    """
+
+    __slots__ = (
+        '_detectors',
+        '_extras',
+        '_full_name',
+        '_tags',
+        '_ttc',
+        'children',
+        'existence_status',
+        'id',
+        'lg_attack_step',
+        'model_asset',
+        'parents',
+    )
 
     def __init__(
         self,
@@ -28,20 +49,71 @@ class AttackGraphNode:
         full_name: str | None = None
     ):
         self.lg_attack_step = lg_attack_step
-        self.name = lg_attack_step.name
-        self.type = lg_attack_step.type
-        self.causal_mode = self.lg_attack_step.causal_mode
-        self.ttc = ttc_dist if ttc_dist is not None else lg_attack_step.ttc
-        self.tags = lg_attack_step.tags
+        self._ttc = freeze_ttc_dist(ttc_dist)
+        self._tags: list[str] | None = None
 
         self._full_name = full_name
         self.id = node_id
         self.model_asset = model_asset
         self.existence_status = existence_status
-        self.children: set[AttackGraphNode] = set()
-        self.parents: set[AttackGraphNode] = set()
-        self.extras: dict = {}
-        self.detectors: dict[str, Detector] = {}
+        # Plain sets, or views on the arrays of a compacted attack graph
+        self.children: MutableSet[AttackGraphNode] = set()
+        self.parents: MutableSet[AttackGraphNode] = set()
+        self._extras: dict | None = None
+        self._detectors: dict[str, Detector] | None = None
+
+    @property
+    def name(self) -> str:
+        return self.lg_attack_step.name
+
+    @property
+    def type(self) -> str:
+        return self.lg_attack_step.type
+
+    @property
+    def causal_mode(self):
+        return self.lg_attack_step.causal_mode
+
+    @property
+    def ttc(self) -> dict | None:
+        if self._ttc is not None:
+            return self._ttc
+        return self.lg_attack_step.ttc
+
+    @ttc.setter
+    def ttc(self, ttc_dist: dict | None) -> None:
+        # Distributions are shared read-only, see maltoolbox.language.ttc_dist
+        self._ttc = freeze_ttc_dist(ttc_dist)
+
+    @property
+    def tags(self) -> list[str]:
+        if self._tags is not None:
+            return self._tags
+        return self.lg_attack_step.tags
+
+    @tags.setter
+    def tags(self, tags: list[str]) -> None:
+        self._tags = tags
+
+    @property
+    def extras(self) -> dict:
+        if self._extras is None:
+            self._extras = {}
+        return self._extras
+
+    @extras.setter
+    def extras(self, extras: dict) -> None:
+        self._extras = extras
+
+    @property
+    def detectors(self) -> dict[str, Detector]:
+        if self._detectors is None:
+            self._detectors = {}
+        return self._detectors
+
+    @detectors.setter
+    def detectors(self, detectors: dict[str, Detector]) -> None:
+        self._detectors = detectors
 
     def to_dict(self) -> dict:
         """Convert node to dictionary"""
@@ -50,7 +122,7 @@ class AttackGraphNode:
             'type': self.type,
             'lang_graph_attack_step': self.lg_attack_step.full_name,
             'name': self.name,
-            'ttc': self.ttc,
+            'ttc': thaw_ttc_dist(self.ttc),
             'children': {
                 child.id: child.full_name for child in self.children
             },
@@ -59,7 +131,7 @@ class AttackGraphNode:
             },
         }
 
-        for detector in self.detectors.values():
+        for detector in (self._detectors or {}).values():
             node_dict.setdefault('detectors', {})[detector.name] = detector.to_dict()
         if self.model_asset is not None:
             node_dict['asset'] = str(self.model_asset.name)
@@ -67,8 +139,8 @@ class AttackGraphNode:
             node_dict['existence_status'] = self.existence_status
         if self.tags:
             node_dict['tags'] = list(self.tags)
-        if self.extras:
-            node_dict['extras'] = self.extras
+        if self._extras:
+            node_dict['extras'] = self._extras
 
         return node_dict
 
@@ -95,9 +167,10 @@ class AttackGraphNode:
             lg_attack_step=self.lg_attack_step
         )
 
-        copied_node.tags = copy.deepcopy(self.tags, memo)
-        copied_node.extras = copy.deepcopy(self.extras, memo)
-        copied_node.ttc = copy.deepcopy(self.ttc, memo)
+        copied_node._tags = copy.deepcopy(self._tags, memo)
+        copied_node._extras = copy.deepcopy(self._extras, memo)
+        # Frozen ttc distributions are shared, not copied
+        copied_node._ttc = self._ttc
 
         copied_node.existence_status = self.existence_status
 
@@ -124,6 +197,6 @@ class AttackGraphNode:
             full_name = str(self.id) + ':' + self.name
         return full_name
 
-    @cached_property
+    @property
     def info(self) -> dict[str, str]:
         return self.lg_attack_step.info
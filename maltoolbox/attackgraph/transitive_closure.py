@@ -0,0 +1,187 @@
+"""Reachability index for transitive expressions chains
+
+Following `transitive(x)` repeats `x` from the assets found so far until
+no new assets are reached. Steps of a language such as coreLang query the
+same network and zone hierarchies from thousands of assets, so the same
+closures are walked over and over.
+
+When `x` is distributive the closure of a set of assets is the union of
+the closures of each asset. `TransitiveClosureIndex` computes the closure
+of each asset once, visiting the strongly connected components of the
+graph spanned by `x` with Tarjan's algorithm. All assets of a component
+share one closure, which is the component itself and the closures of the
+components it reaches.
+
+The indices of a model are kept by the model and dropped on every change
+to the model, see `Model._notify`.
+"""
+
+from __future__ import annotations
+
+import logging
+from typing import TYPE_CHECKING, Callable, Iterable
+
+if TYPE_CHECKING:
+    from ..language import ExpressionsChain
+    from ..model import Model, ModelAsset
+
+logger = logging.getLogger(__name__)
+
+
+class TransitiveClosureIndex:
+    """Closures of single assets under a successor function.
+
+    The closure of an asset contains the asset itself and every asset
+    reached by repeatedly applying `successors`. Closures are computed the
+    first time they are requested.
+    """
+
+    def __init__(
+        self, successors: Callable[[ModelAsset], Iterable[ModelAsset]]
+    ):
+        self._successors = successors
+        self._closures: dict[ModelAsset, frozenset[ModelAsset]] = {}
+        self.components = 0
+
+    def __repr__(self) -> str:
+        return (
+            f'TransitiveClosureIndex(assets: {len(self._closures)}, '
+            f'components: {self.components})'
+        )
+
+    def __len__(self) -> int:
+        return len(self._closures)
+
+    def closure(self, asset: ModelAsset) -> frozenset[ModelAsset]:
+        """Return the closure of an asset"""
+        closure = self._closures.get(asset)
+        if closure is None:
+            self._index_from(asset)
+            closure = self._closures[asset]
+        return closure
+
+    def follow(self, target_assets: Iterable[ModelAsset]) -> set[ModelAsset]:
+        """Return the union of the closures of the target assets"""
+        result: set[ModelAsset] = set()
+        for asset in target_assets:
+            result |= self.closure(asset)
+        return result
+
+    def _index_from(self, root: ModelAsset) -> None:
+        """Compute the closures of all assets reachable from `root` that
+        are not indexed yet, with an iterative version of Tarjan's strongly
+        connected components algorithm"""
+        closures = self._closures
+        order: dict[ModelAsset, int] = {}
+        lowlink: dict[ModelAsset, int] = {}
+        successors: dict[ModelAsset, tuple[ModelAsset, ...]] = {}
+        stack: list[ModelAsset] = []
+        on_stack: set[ModelAsset] = set()
+
+        def visit(asset: ModelAsset) -> Iterable[ModelAsset]:
+            order[asset] = lowlink[asset] = len(order)
+            stack.append(asset)
+            on_stack.add(asset)
+            asset_successors = successors[asset] = tuple(
+                self._successors(asset)
+            )
+            return iter(asset_successors)
+
+        work = [(root, visit(root))]
+        while work:
+            asset, pending = work[-1]
+            for successor in pending:
+                if successor in closures:
+                    continue
+                if successor not in order:
+                    work.append((successor, visit(successor)))
+                    break
+                if successor in on_stack:
+                    lowlink[asset] = min(lowlink[asset], order[successor])
+            else:
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    lowlink[parent] = min(lowlink[parent], lowlink[asset])
+                if lowlink[asset] == order[asset]:
+                    self._close_component(asset, stack, on_stack, successors)
+
+    def _close_component(
+        self,
+        root: ModelAsset,
+        stack: list[ModelAsset],
+        on_stack: set[ModelAsset],
+        successors: dict[ModelAsset, tuple[ModelAsset, ...]]
+    ) -> None:
+        """Pop the component rooted at `root` off the stack and store its
+        closure. The components it reaches are closed already."""
+        component: set[ModelAsset] = set()
+        while True:
+            member = stack.pop()
+            on_stack.discard(member)
+            component.add(member)
+            if member is root:
+                break
+
+        closure = set(component)
+        for member in component:
+            for successor in successors[member]:
+                if successor not in component:
+                    closure |= self._closures[successor]
+
+        frozen_closure = frozenset(closure)
+        for member in component:
+            self._closures[member] = frozen_closure
+        self.components += 1
+
+
+def get_transitive_closure_index(
+    model: Model,
+    expr_chain: ExpressionsChain,
+    successors: Callable[[ModelAsset], Iterable[ModelAsset]]
+) -> TransitiveClosureIndex:
+    """Return the closure index of a transitive expressions chain in a
+    model, creating it with `successors` if the model has none.
+
+    `successors` has to return the assets the sub link of `expr_chain`
+    reaches from a single asset, and the sub link has to be distributive.
+    """
+    indices = model._transitive_closures
+    entry = indices.get(id(expr_chain))
+    if entry is not None and entry[0] is expr_chain:
+        return entry[1]
+
+    logger.debug(
+        'Creating transitive closure index for model "%s"', model.name
+    )
+    index = TransitiveClosureIndex(successors)
+    # Keep a reference to the chain so that its id can not be reused
+    indices[id(expr_chain)] = (expr_chain, index)
+    return index
+
+
+def follow_transitive_closure(
+    expr_chain: ExpressionsChain,
+    target_assets: Iterable[ModelAsset],
+    successors: Callable[[ModelAsset], Iterable[ModelAsset]]
+) -> set[ModelAsset]:
+    """Follow a transitive expressions chain with a distributive sub link
+    through the closure index of the model of the target assets.
+
+    Assets that are not part of a model get a closure index of their own
+    for this call.
+    """
+    result: set[ModelAsset] = set()
+    index = None
+    model = None
+    for asset in target_assets:
+        if asset.model is not model or index is None:
+            model = asset.model
+            if model is None:
+                index = TransitiveClosureIndex(successors)
+            else:
+                index = get_transitive_closure_index(
+                    model, expr_chain, successors
+                )
+        result |= index.closure(asset)
+    return result
@@ -0,0 +1,238 @@
+"""Compiled expression chain traversal plans
+
+An expressions chain is interpreted by `generate.follow_expr_chain`, which
+dispatches on the chain type for every step of every lookup. A traversal
+plan is the same chain lowered once into nested closures, so that attack
+graph generation only pays for following the associations.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+from typing import TYPE_CHECKING, Callable, Iterable, Optional
+
+from ..exceptions import (
+    AttackGraphStepExpressionError,
+    LanguageGraphException,
+)
+from ..language.expr_chain_optimizer import (
+    get_optimized_expr_chain,
+    is_distributive,
+)
+from .transitive_closure import follow_transitive_closure
+
+if TYPE_CHECKING:
+    from ..language import ExpressionsChain, LanguageGraph
+    from ..model import ModelAsset
+
+    TraversalPlan = Callable[[Iterable[ModelAsset]], set[ModelAsset]]
+
+logger = logging.getLogger(__name__)
+
+
+def get_traversal_plan(
+    lang_graph: LanguageGraph, expr_chain: Optional[ExpressionsChain]
+) -> TraversalPlan:
+    """Return the traversal plan of an expressions chain, optimizing and
+    compiling it the first time it is requested for the language graph.
+    """
+    plans = lang_graph._traversal_plans
+    entry = plans.get(id(expr_chain))
+    if entry is not None and entry[0] is expr_chain:
+        return entry[1]
+
+    plan = compile_expr_chain(
+        get_optimized_expr_chain(lang_graph, expr_chain)
+    )
+    # Keep a reference to the chain so that its id can not be reused
+    plans[id(expr_chain)] = (expr_chain, plan)
+    return plan
+
+
+def compile_expr_chain(
+    expr_chain: Optional[ExpressionsChain]
+) -> TraversalPlan:
+    """Lower an expressions chain into a traversal plan.
+
+    The plan takes the assets to start from and returns the set of assets
+    reached, exactly like `follow_expr_chain` does. The input is never
+    modified.
+    """
+    if expr_chain is None:
+        # There is no expressions chain link left to follow, the plan
+        # returns the current target assets
+        return set
+
+    if logger.isEnabledFor(logging.DEBUG):
+        # Avoid running json.dumps when not in debug
+        logger.debug(
+            'Compiling Expressions Chain:\n%s',
+            json.dumps(expr_chain.to_dict(), indent=2)
+        )
+
+    match (expr_chain.type):
+        case 'union' | 'intersection' | 'difference':
+            return _compile_set_operation(expr_chain)
+
+        case 'field':
+            return _compile_field(expr_chain)
+
+        case 'transitive':
+            return _compile_transitive(expr_chain)
+
+        case 'subType':
+            return _compile_subtype(expr_chain)
+
+        case 'collect':
+            return _compile_collect(expr_chain)
+
+        case _:
+            msg = 'Unknown attack expressions chain type: %s'
+            logger.error(msg, expr_chain.type)
+            raise AttackGraphStepExpressionError(msg % expr_chain.type)
+
+
+def _compile_field(expr_chain: ExpressionsChain) -> TraversalPlan:
+    fieldname = expr_chain.fieldname
+    if not fieldname:
+        raise LanguageGraphException(
+            '"field" step expression chain is missing fieldname.'
+        )
+
+    def follow_field(target_assets: Iterable[ModelAsset]) -> set[ModelAsset]:
+        new_target_assets: set[ModelAsset] = set()
+        for asset in target_assets:
+            associated_assets = asset.associated_assets.get(fieldname)
+            if associated_assets:
+                new_target_assets.update(associated_assets)
+        return new_target_assets
+
+    return follow_field
+
+
+def _compile_transitive(expr_chain: ExpressionsChain) -> TraversalPlan:
+    if not expr_chain.sub_link:
+        raise LanguageGraphException(
+            '"transitive" step expression chain is missing sub link.'
+        )
+    sub_plan = compile_expr_chain(expr_chain.sub_link)
+
+    if is_distributive(expr_chain.sub_link):
+        # Closures of single assets are looked up in the index of the model
+        def successors(asset: ModelAsset) -> set[ModelAsset]:
+            return sub_plan((asset,))
+
+        def follow_transitive_indexed(
+            target_assets: Iterable[ModelAsset]
+        ) -> set[ModelAsset]:
+            return follow_transitive_closure(
+                expr_chain, target_assets, successors
+            )
+        return follow_transitive_indexed
+
+    def follow_transitive(
+        target_assets: Iterable[ModelAsset]
+    ) -> set[ModelAsset]:
+        result = set(target_assets)
+        new_assets = result
+        while new_assets := sub_plan(new_assets):
+            new_assets -= result
+            if not new_assets:
+                break
+            result |= new_assets
+        return result
+
+    return follow_transitive
+
+
+def _compile_subtype(expr_chain: ExpressionsChain) -> TraversalPlan:
+    if not expr_chain.sub_link:
+        raise LanguageGraphException(
+            '"subType" step expression chain is missing sub link.'
+        )
+    if not expr_chain.subtype:
+        raise LookupError(
+            f'Failed to find asset "{expr_chain.subtype}" in '
+            'the language graph.'
+        )
+    sub_plan = compile_expr_chain(expr_chain.sub_link)
+    # Every asset type that extends the subtype, including itself
+    allowed_types = frozenset(expr_chain.subtype.sub_assets)
+
+    def follow_subtype(
+        target_assets: Iterable[ModelAsset]
+    ) -> set[ModelAsset]:
+        return {
+            asset for asset in sub_plan(target_assets)
+            if asset.lg_asset in allowed_types
+        }
+
+    return follow_subtype
+
+
+def _compile_set_operation(expr_chain: ExpressionsChain) -> TraversalPlan:
+    if not expr_chain.left_link:
+        raise LanguageGraphException(
+            f'"{expr_chain.type}" step expression chain is missing the '
+            'left link.'
+        )
+    if not expr_chain.right_link:
+        raise LanguageGraphException(
+            f'"{expr_chain.type}" step expression chain is missing the '
+            'right link.'
+        )
+    lh_plan = compile_expr_chain(expr_chain.left_link)
+    rh_plan = compile_expr_chain(expr_chain.right_link)
+
+    if expr_chain.type == 'union':
+        def follow_union(
+            target_assets: Iterable[ModelAsset]
+        ) -> set[ModelAsset]:
+            return lh_plan(target_assets) | rh_plan(target_assets)
+        return follow_union
+
+    if expr_chain.type == 'intersection':
+        def follow_intersection(
+            target_assets: Iterable[ModelAsset]
+        ) -> set[ModelAsset]:
+            return lh_plan(target_assets) & rh_plan(target_assets)
+        return follow_intersection
+
+    def follow_difference(
+        target_assets: Iterable[ModelAsset]
+    ) -> set[ModelAsset]:
+        return lh_plan(target_assets) - rh_plan(target_assets)
+    return follow_difference
+
+
+def _compile_collect(expr_chain: ExpressionsChain) -> TraversalPlan:
+    if not expr_chain.left_link:
+        raise LanguageGraphException(
+            '"collect" step expression chain missing the left link.'
+        )
+    if not expr_chain.right_link:
+        raise LanguageGraphException(
+            '"collect" step expression chain missing the right link.'
+        )
+    lh_plan = compile_expr_chain(expr_chain.left_link)
+    rh_plan = compile_expr_chain(expr_chain.right_link)
+
+    if is_distributive(expr_chain.right_link):
+        # The right hand plan reaches the same assets from all left hand
+        # targets at once as from each of them
+        def follow_collect_set(
+            target_assets: Iterable[ModelAsset]
+        ) -> set[ModelAsset]:
+            return rh_plan(lh_plan(target_assets))
+        return follow_collect_set
+
+    def follow_collect(
+        target_assets: Iterable[ModelAsset]
+    ) -> set[ModelAsset]:
+        rh_targets: set[ModelAsset] = set()
+        for lh_target in lh_plan(target_assets):
+            rh_targets |= rh_plan((lh_target,))
+        return rh_targets
+
+    return follow_collect
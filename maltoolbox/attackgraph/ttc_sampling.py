@@ -0,0 +1,429 @@
+"""Monte Carlo sampling of the ttc distributions of attack graph nodes
+
+A ttc distribution is a small expression tree, see
+`maltoolbox.language.compiler.distributions`:
+
+- `{'type': 'function', 'name': 'Exponential', 'arguments': [0.1]}`
+- `{'type': 'number', 'value': 2.0}`
+- `{'type': 'addition', 'lhs': ..., 'rhs': ...}`, and the same for
+  subtraction, multiplication, division and exponentiation
+
+`compile_ttc_dist` turns a distribution into a function that draws many
+samples in one call, evaluating the tree once per call rather than once
+per sample. Compiled distributions are cached per distinct frozen
+distribution, see `maltoolbox.language.ttc_dist`, so the thousands of nodes
+that use the default distribution of an attack step share one function.
+
+`TTCSampler` draws the samples of a whole list of nodes into a
+node-by-sample matrix. Nodes with the same distribution are sampled
+together, one batch per distinct distribution. Samples are numpy arrays
+if numpy is installed and `array('d')` rows otherwise. numpy is an
+optional dependency, installed with `pip install mal-toolbox[numpy]`.
+
+Bernoulli(p) samples 1 with probability p and infinity otherwise, so that
+a distribution multiplied by it is impossible with probability 1 - p. A
+Bernoulli on its own therefore samples a ttc of 1 where it succeeds. The
+named combinations are the ones of the MAL documentation, for example
+`HardAndUncertain` is `Bernoulli(0.5) * Exponential(0.1)`, except that
+`Enabled` samples 0 rather than the 1 of `Bernoulli(1.0)`. Nodes without a
+distribution always sample 0.
+"""
+
+from __future__ import annotations
+
+import logging
+import math
+import random
+from array import array
+from functools import lru_cache
+from statistics import NormalDist
+from typing import TYPE_CHECKING, Any, Callable, Iterable, Optional
+
+from ..exceptions import AttackGraphException
+from ..language.ttc_dist import freeze_ttc_dist
+
+try:
+    import numpy  # type: ignore[import-not-found]
+except ImportError:  # pragma: no cover - numpy is optional
+    numpy = None
+
+if TYPE_CHECKING:
+    from ..language.ttc_dist import FrozenTTCDist
+    from .node import AttackGraphNode
+
+    SampleFunction = Callable[['SamplingBackend', int], Any]
+
+logger = logging.getLogger(__name__)
+
+
+def _function(name: str, *arguments: float) -> dict:
+    return {'type': 'function', 'name': name, 'arguments': list(arguments)}
+
+
+def _uncertain(rate: float) -> dict:
+    return {
+        'type': 'multiplication',
+        'lhs': _function('Bernoulli', 0.5),
+        'rhs': _function('Exponential', rate),
+    }
+
+
+# The distributions the named combinations stand for
+COMBINATION_TTC_DISTS: dict[str, dict] = {
+    'Enabled': {'type': 'number', 'value': 0.0},
+    'Disabled': _function('Bernoulli', 0.0),
+    'Zero': {'type': 'number', 'value': 0.0},
+    'Infinity': {'type': 'number', 'value': math.inf},
+    'EasyAndCertain': _function('Exponential', 1.0),
+    'EasyAndUncertain': _uncertain(1.0),
+    'HardAndCertain': _function('Exponential', 0.1),
+    'HardAndUncertain': _uncertain(0.1),
+    'VeryHardAndCertain': _function('Exponential', 0.01),
+    'VeryHardAndUncertain': _uncertain(0.01),
+}
+
+BINARY_OPERATIONS = (
+    'addition', 'subtraction', 'multiplication', 'division', 'exponentiation'
+)
+
+
+class PythonBackend:
+    """Draws samples as lists of floats with the `random` module"""
+
+    def __init__(self, seed: Optional[int] = None):
+        self.rng = random.Random(seed)
+
+    def constant(self, value: float, size: int) -> list[float]:
+        return [value] * size
+
+    def bernoulli(self, p: float, size: int) -> list[float]:
+        rand = self.rng.random
+        return [1.0 if rand() < p else math.inf for _ in range(size)]
+
+    def binomial(self, n: float, p: float, size: int) -> list[float]:
+        rand = self.rng.random
+        trials = range(int(n))
+        return [
+            float(sum(rand() < p for _ in trials)) for _ in range(size)
+        ]
+
+    def exponential(self, rate: float, size: int) -> list[float]:
+        expovariate = self.rng.expovariate
+        return [expovariate(rate) for _ in range(size)]
+
+    def gamma(self, shape: float, scale: float, size: int) -> list[float]:
+        gammavariate = self.rng.gammavariate
+        return [gammavariate(shape, scale) for _ in range(size)]
+
+    def lognormal(self, mean: float, sd: float, size: int) -> list[float]:
+        lognormvariate = self.rng.lognormvariate
+        return [lognormvariate(mean, sd) for _ in range(size)]
+
+    def pareto(self, minimum: float, shape: float, size: int) -> list[float]:
+        paretovariate = self.rng.paretovariate
+        return [minimum * paretovariate(shape) for _ in range(size)]
+
+    def truncated_normal(
+        self, mean: float, sd: float, size: int
+    ) -> list[float]:
+        # Inverse transform of the part of the normal distribution above 0
+        normal = NormalDist(mean, sd)
+        low = normal.cdf(0.0)
+        inv_cdf = normal.inv_cdf
+        uniform = self.rng.uniform
+        samples = []
+        for _ in range(size):
+            u = uniform(low, 1.0)
+            samples.append(inv_cdf(u) if 0.0 < u < 1.0 else max(mean, 0.0))
+        return samples
+
+    def uniform(self, low: float, high: float, size: int) -> list[float]:
+        uniform = self.rng.uniform
+        return [uniform(low, high) for _ in range(size)]
+
+    def binary_operation(
+        self, operation: str, lhs: list[float], rhs: list[float]
+    ) -> list[float]:
+        match operation:
+            case 'addition':
+                return [x + y for x, y in zip(lhs, rhs)]
+            case 'subtraction':
+                return [x - y for x, y in zip(lhs, rhs)]
+            case 'multiplication':
+                return [x * y for x, y in zip(lhs, rhs)]
+            case 'division':
+                return [_divide(x, y) for x, y in zip(lhs, rhs)]
+            case _:
+                return [_power(x, y) for x, y in zip(lhs, rhs)]
+
+    def to_matrix(self, num_rows: int, num_samples: int) -> list[array]:
+        return [array('d') for _ in range(num_rows)]
+
+    def set_rows(
+        self,
+        matrix: list[array],
+        positions: list[int],
+        samples: list[float],
+        num_samples: int
+    ) -> None:
+        for row, position in enumerate(positions):
+            start = row * num_samples
+            matrix[position] = array(
+                'd', samples[start:start + num_samples]
+            )
+
+
+def _divide(x: float, y: float) -> float:
+    if y == 0.0:
+        return math.copysign(math.inf, x) if x else math.nan
+    return x / y
+
+
+def _power(x: float, y: float) -> float:
+    try:
+        return math.pow(x, y)
+    except OverflowError:
+        return math.inf
+    except ValueError:
+        return math.nan
+
+
+class NumpyBackend:
+    """Draws samples as numpy arrays with a numpy random generator"""
+
+    def __init__(self, seed: Optional[int] = None):
+        if numpy is None:
+            raise ImportError('numpy is needed to sample with numpy')
+        self.numpy = numpy
+        self.rng = numpy.random.default_rng(seed)
+
+    def constant(self, value: float, size: int):
+        return self.numpy.full(size, value)
+
+    def bernoulli(self, p: float, size: int):
+        return self.numpy.where(self.rng.random(size) < p, 1.0, math.inf)
+
+    def binomial(self, n: float, p: float, size: int):
+        return self.rng.binomial(int(n), p, size).astype(float)
+
+    def exponential(self, rate: float, size: int):
+        return self.rng.exponential(1.0 / rate, size)
+
+    def gamma(self, shape: float, scale: float, size: int):
+        return self.rng.gamma(shape, scale, size)
+
+    def lognormal(self, mean: float, sd: float, size: int):
+        return self.rng.lognormal(mean, sd, size)
+
+    def pareto(self, minimum: float, shape: float, size: int):
+        # numpy draws from the Lomax distribution, which is Pareto - 1
+        return minimum * (self.rng.pareto(shape, size) + 1.0)
+
+    def truncated_normal(self, mean: float, sd: float, size: int):
+        normal = NormalDist(mean, sd)
+        samples = self.rng.normal(mean, sd, size)
+        negative = samples < 0.0
+        # Redraw negative samples while few of them are expected, the
+        # rest are drawn by inverse transform like `PythonBackend` does
+        if normal.cdf(0.0) < 0.5:
+            for _ in range(8):
+                if not negative.any():
+                    break
+                samples[negative] = self.rng.normal(mean, sd, negative.sum())
+                negative = samples < 0.0
+        if negative.any():
+            u = self.rng.uniform(normal.cdf(0.0), 1.0, negative.sum())
+            samples[negative] = [
+                normal.inv_cdf(x) if 0.0 < x < 1.0 else max(mean, 0.0)
+                for x in u
+            ]
+        return samples
+
+    def uniform(self, low: float, high: float, size: int):
+        return self.rng.uniform(low, high, size)
+
+    def binary_operation(self, operation: str, lhs, rhs):
+        with self.numpy.errstate(all='ignore'):
+            match operation:
+                case 'addition':
+                    return lhs + rhs
+                case 'subtraction':
+                    return lhs - rhs
+                case 'multiplication':
+                    return lhs * rhs
+                case 'division':
+                    return lhs / rhs
+                case _:
+                    return self.numpy.power(lhs, rhs)
+
+    def to_matrix(self, num_rows: int, num_samples: int):
+        return self.numpy.empty((num_rows, num_samples))
+
+    def set_rows(self, matrix, positions: list[int], samples, num_samples):
+        matrix[positions] = samples.reshape(len(positions), num_samples)
+
+
+SamplingBackend = PythonBackend | NumpyBackend
+
+
+def get_backend(
+    seed: Optional[int] = None, use_numpy: Optional[bool] = None
+) -> SamplingBackend:
+    """Return a sampling backend seeded with `seed`, the numpy one if
+    `use_numpy` is True, or if it is None and numpy is installed"""
+    if use_numpy is None:
+        use_numpy = numpy is not None
+    if use_numpy:
+        return NumpyBackend(seed)
+    return PythonBackend(seed)
+
+
+def _sample_function(name: str, arguments: list[float]) -> SampleFunction:
+    """Return the sample function of a distribution function"""
+    match (name, arguments):
+        case ('Bernoulli', [p]):
+            return lambda backend, size: backend.bernoulli(p, size)
+        case ('Binomial', [n, p]):
+            return lambda backend, size: backend.binomial(n, p, size)
+        case ('Exponential', [rate]):
+            return lambda backend, size: backend.exponential(rate, size)
+        case ('Gamma', [shape, scale]):
+            return lambda backend, size: backend.gamma(shape, scale, size)
+        case ('LogNormal', [mean, sd]):
+            return lambda backend, size: backend.lognormal(mean, sd, size)
+        case ('Pareto', [minimum, shape]):
+            return lambda backend, size: backend.pareto(minimum, shape, size)
+        case ('TruncatedNormal', [mean, sd]):
+            return lambda backend, size: backend.truncated_normal(
+                mean, sd, size
+            )
+        case ('Uniform', [low, high]):
+            return lambda backend, size: backend.uniform(low, high, size)
+        case (_, []) if name in COMBINATION_TTC_DISTS:
+            return compile_ttc_dist(COMBINATION_TTC_DISTS[name])
+
+    msg = 'Unknown ttc distribution function %s with arguments %s'
+    logger.error(msg, name, arguments)
+    raise AttackGraphException(msg % (name, arguments))
+
+
+@lru_cache(maxsize=1024)
+def _compile_frozen_ttc_dist(ttc_dist: FrozenTTCDist) -> SampleFunction:
+    dist_type = ttc_dist.get('type')
+    match dist_type:
+        case 'function':
+            return _sample_function(
+                ttc_dist['name'],
+                [float(argument) for argument in ttc_dist['arguments']]
+            )
+
+        case 'number':
+            value = float(ttc_dist['value'])
+            return lambda backend, size: backend.constant(value, size)
+
+        case _ if dist_type in BINARY_OPERATIONS:
+            lhs = _compile_frozen_ttc_dist(ttc_dist['lhs'])
+            rhs = _compile_frozen_ttc_dist(ttc_dist['rhs'])
+            return lambda backend, size: backend.binary_operation(
+                dist_type, lhs(backend, size), rhs(backend, size)
+            )
+
+        case None if not ttc_dist:
+            return lambda backend, size: backend.constant(0.0, size)
+
+        case _:
+            msg = 'Unknown ttc distribution type: %s'
+            logger.error(msg, dist_type)
+            raise AttackGraphException(msg % dist_type)
+
+
+def compile_ttc_dist(ttc_dist: Optional[dict]) -> SampleFunction:
+    """Compile a ttc distribution into a sample function.
+
+    Arguments:
+    ---------
+    ttc_dist        - a ttc distribution, None or an empty dict for nodes
+                      without one
+
+    Return:
+    ------
+    A function that takes a sampling backend and a number of samples and
+    returns that many samples of the distribution. The function is shared
+    by all equal distributions.
+    """
+    return _compile_frozen_ttc_dist(freeze_ttc_dist(ttc_dist or {}))
+
+
+class TTCSampler:
+    """Draws samples of the ttc distributions of attack graph nodes.
+
+    Rows of the sample matrices are in the order of `self.nodes`, see
+    `self.positions` for the row of a node.
+    """
+
+    def __init__(
+        self,
+        nodes: Iterable[AttackGraphNode],
+        seed: Optional[int] = None,
+        use_numpy: Optional[bool] = None
+    ):
+        """Create a sampler of the ttc distributions of nodes.
+
+        Arguments:
+        ---------
+        nodes           - the nodes to sample, for example the
+                          `attack_steps` of an attack graph
+        seed            - seed of the random generator, samples are the
+                          same for the same seed and nodes
+        use_numpy       - sample with numpy, by default if it is installed,
+                          see the `numpy` extra of the package
+        """
+        self.nodes: list[AttackGraphNode] = list(nodes)
+        self.positions: dict[AttackGraphNode, int] = {
+            node: position for position, node in enumerate(self.nodes)
+        }
+        self.backend = get_backend(seed, use_numpy)
+
+        # Rows of the nodes of each distinct distribution, in order of the
+        # first node with the distribution so that seeded runs repeat
+        self._groups: dict[int, tuple[SampleFunction, list[int]]] = {}
+        for position, node in enumerate(self.nodes):
+            sample_function = compile_ttc_dist(node.ttc)
+            group = self._groups.get(id(sample_function))
+            if group is None:
+                group = self._groups[id(sample_function)] = (
+                    sample_function, []
+                )
+            group[1].append(position)
+
+    def __repr__(self) -> str:
+        return (
+            f'TTCSampler(nodes: {len(self.nodes)}, '
+            f'distributions: {len(self._groups)})'
+        )
+
+    def sample(self, num_samples: int):
+        """Draw samples of the ttc of every node.
+
+        Arguments:
+        ---------
+        num_samples     - the number of samples per node
+
+        Return:
+        ------
+        A node-by-sample matrix, a numpy array with one row per node or
+        a list of `array('d')` rows without numpy.
+        """
+        backend = self.backend
+        matrix = backend.to_matrix(len(self.nodes), num_samples)
+
+        for sample_function, positions in self._groups.values():
+            samples = sample_function(
+                backend, len(positions) * num_samples
+            )
+            backend.set_rows(matrix, positions, samples, num_samples)
+        return matrix
+
+    def sample_node(self, node: AttackGraphNode, num_samples: int):
+        """Draw samples of the ttc of a single node"""
+        return compile_ttc_dist(node.ttc)(self.backend, num_samples)
@@ -0,0 +1,393 @@
+"""Expected value, variance and quantiles of ttc distributions
+
+`get_ttc_statistics` summarizes a ttc distribution, see
+`maltoolbox.attackgraph.ttc_sampling` for the distributions and how they
+are sampled. Summaries are computed in closed form where possible:
+
+- the mean, variance and quantiles of each distribution function, except
+  the quantiles of Gamma
+- the mean and variance of sums, differences and products, the sides of
+  an operation being independent
+- the quantiles of a distribution shifted or scaled by a number, and of a
+  distribution multiplied by a Bernoulli, as in `HardAndUncertain`
+
+Anything else is approximated from `APPROXIMATION_SAMPLES` seeded samples
+of the distribution. Summaries are cached per distinct frozen
+distribution, so all nodes that use the same distribution share one
+summary and the samples of a distribution are drawn at most once.
+"""
+
+from __future__ import annotations
+
+import bisect
+import math
+import statistics
+from dataclasses import dataclass
+from functools import lru_cache
+from statistics import NormalDist
+from typing import TYPE_CHECKING, Callable, Iterable, Optional
+
+from ..language.ttc_dist import freeze_ttc_dist
+from .ttc_sampling import (
+    BINARY_OPERATIONS,
+    COMBINATION_TTC_DISTS,
+    PythonBackend,
+    compile_ttc_dist,
+)
+
+if TYPE_CHECKING:
+    from ..language.ttc_dist import FrozenTTCDist
+    from .node import AttackGraphNode
+
+    QuantileFunction = Callable[[float], float]
+
+DEFAULT_QUANTILES = (0.5, 0.9, 0.99)
+
+# Samples drawn of distributions without closed forms, and their seed
+APPROXIMATION_SAMPLES = 100_000
+APPROXIMATION_SEED = 0
+
+_STANDARD_NORMAL = NormalDist()
+
+
+@dataclass(frozen=True)
+class TTCStatistics:
+    """Summary of a ttc distribution. The mean and variance are infinite
+    if the ttc is infinite with some probability."""
+
+    mean: float
+    variance: float
+    quantiles: dict[float, float]
+
+
+@dataclass(frozen=True)
+class _Moments:
+    """Closed form summary of a distribution, quantile is None if it has
+    no closed form"""
+
+    mean: float
+    variance: float
+    quantile: Optional[QuantileFunction] = None
+    constant: bool = False
+
+
+def _constant(value: float) -> _Moments:
+    return _Moments(value, 0.0, lambda q: value, constant=True)
+
+
+def _binomial_quantile(n: int, p: float) -> QuantileFunction:
+    cdf = list(_accumulate_binomial(n, p))
+
+    def quantile(q: float) -> float:
+        return float(min(bisect.bisect_left(cdf, q), n))
+    return quantile
+
+
+def _accumulate_binomial(n: int, p: float) -> Iterable[float]:
+    """Yield the cdf of Binomial(n, p) at 0 to n"""
+    if p <= 0.0 or p >= 1.0:
+        mode = 0 if p <= 0.0 else n
+        for k in range(n + 1):
+            yield 1.0 if k >= mode else 0.0
+        return
+
+    # The pmf is computed in log space, the binomial coefficients and
+    # powers of large n do not fit in a float
+    log_p = math.log(p)
+    log_q = math.log1p(-p)
+    log_n = math.lgamma(n + 1)
+    total = 0.0
+    for k in range(n + 1):
+        total += math.exp(
+            log_n - math.lgamma(k + 1) - math.lgamma(n - k + 1)
+            + k * log_p + (n - k) * log_q
+        )
+        yield total
+
+
+def _truncated_normal(mean: float, sd: float) -> _Moments:
+    """The normal distribution truncated to values above 0"""
+    alpha = -mean / sd
+    low = _STANDARD_NORMAL.cdf(alpha)
+    mass = 1.0 - low
+    ratio = _STANDARD_NORMAL.pdf(alpha) / mass
+
+    def quantile(q: float) -> float:
+        return mean + sd * _STANDARD_NORMAL.inv_cdf(low + q * mass)
+
+    return _Moments(
+        mean + sd * ratio,
+        sd ** 2 * (1.0 + alpha * ratio - ratio ** 2),
+        quantile
+    )
+
+
+def _function_moments(name: str, arguments: list[float]) -> Optional[_Moments]:
+    match name:
+        case 'Bernoulli':
+            p, = arguments
+            if p == 1.0:
+                return _constant(1.0)
+            return _Moments(
+                math.inf, math.inf, lambda q: 1.0 if q <= p else math.inf
+            )
+
+        case 'Binomial':
+            n, p = arguments
+            return _Moments(
+                n * p, n * p * (1 - p), _binomial_quantile(int(n), p)
+            )
+
+        case 'Exponential':
+            rate, = arguments
+            return _Moments(
+                1 / rate, 1 / rate ** 2, lambda q: -math.log1p(-q) / rate
+            )
+
+        case 'Gamma':
+            shape, scale = arguments
+            return _Moments(shape * scale, shape * scale ** 2)
+
+        case 'LogNormal':
+            mean, sd = arguments
+            return _Moments(
+                math.exp(mean + sd ** 2 / 2),
+                math.expm1(sd ** 2) * math.exp(2 * mean + sd ** 2),
+                lambda q: math.exp(mean + sd * _STANDARD_NORMAL.inv_cdf(q))
+            )
+
+        case 'Pareto':
+            minimum, shape = arguments
+            return _Moments(
+                shape * minimum / (shape - 1) if shape > 1 else math.inf,
+                minimum ** 2 * shape / ((shape - 1) ** 2 * (shape - 2))
+                if shape > 2 else math.inf,
+                lambda q: minimum * (1 - q) ** (-1 / shape)
+            )
+
+        case 'TruncatedNormal':
+            return _truncated_normal(*arguments)
+
+        case 'Uniform':
+            low, high = arguments
+            return _Moments(
+                (low + high) / 2,
+                (high - low) ** 2 / 12,
+                lambda q: low + q * (high - low)
+            )
+
+    if name in COMBINATION_TTC_DISTS:
+        return _get_moments(freeze_ttc_dist(COMBINATION_TTC_DISTS[name]))
+    return None
+
+
+def _product_variance(lhs: _Moments, rhs: _Moments) -> float:
+    if not all(math.isfinite(value) for value in (
+        lhs.mean, lhs.variance, rhs.mean, rhs.variance
+    )):
+        return math.inf
+    return (
+        (lhs.variance + lhs.mean ** 2) * (rhs.variance + rhs.mean ** 2)
+        - lhs.mean ** 2 * rhs.mean ** 2
+    )
+
+
+def _scaled_quantile(
+    scale: float, quantile: QuantileFunction
+) -> QuantileFunction:
+    return lambda q: scale * quantile(q)
+
+
+def _bernoulli_product(p: float, moments: _Moments) -> _Moments:
+    """Moments of Bernoulli(p) times a distribution, which is the
+    distribution with probability p and infinite otherwise"""
+    if p == 1.0:
+        return moments
+    quantile: Optional[QuantileFunction] = None
+    if moments.quantile is not None:
+        moments_quantile = moments.quantile
+
+        def bernoulli_quantile(q: float) -> float:
+            return moments_quantile(q / p) if q < p else math.inf
+        quantile = bernoulli_quantile
+    return _Moments(math.inf, math.inf, quantile)
+
+
+def _binary_operation_moments(
+    operation: str, lhs: _Moments, rhs: _Moments
+) -> Optional[_Moments]:
+    lhs_quantile = lhs.quantile
+    rhs_quantile = rhs.quantile
+
+    match operation:
+        case 'addition' | 'subtraction':
+            if operation == 'addition':
+                mean = lhs.mean + rhs.mean
+            else:
+                mean = lhs.mean - rhs.mean
+            if lhs.constant and rhs.constant:
+                return _constant(mean)
+            quantile: Optional[QuantileFunction] = None
+            if rhs.constant and lhs_quantile is not None:
+                shift = rhs.mean if operation == 'addition' else -rhs.mean
+                quantile = lambda q: lhs_quantile(q) + shift
+            elif lhs.constant and rhs_quantile is not None \
+                    and operation == 'addition':
+                quantile = lambda q: rhs_quantile(q) + lhs.mean
+            return _Moments(mean, lhs.variance + rhs.variance, quantile)
+
+        case 'multiplication':
+            if lhs.constant and rhs.constant:
+                return _constant(lhs.mean * rhs.mean)
+            for factor, other in ((lhs, rhs), (rhs, lhs)):
+                if factor.constant and factor.mean > 0 \
+                        and other.quantile is not None:
+                    scale = factor.mean
+                    return _Moments(
+                        scale * other.mean,
+                        scale ** 2 * other.variance,
+                        _scaled_quantile(scale, other.quantile)
+                    )
+            return _Moments(
+                lhs.mean * rhs.mean, _product_variance(lhs, rhs)
+            )
+
+        case 'division':
+            if rhs.constant and rhs.mean > 0:
+                scale = rhs.mean
+                return _Moments(
+                    lhs.mean / scale,
+                    lhs.variance / scale ** 2,
+                    None if lhs_quantile is None
+                    else lambda q: lhs_quantile(q) / scale,
+                    constant=lhs.constant
+                )
+
+        case 'exponentiation':
+            if lhs.constant and rhs.constant:
+                return _constant(lhs.mean ** rhs.mean)
+    return None
+
+
+def _bernoulli_probability(ttc_dist: FrozenTTCDist) -> Optional[float]:
+    if ttc_dist.get('type') == 'function' and ttc_dist['name'] == 'Bernoulli':
+        return float(ttc_dist['arguments'][0])
+    return None
+
+
+@lru_cache(maxsize=1024)
+def _get_moments(ttc_dist: FrozenTTCDist) -> Optional[_Moments]:
+    """Return the closed form summary of a distribution, None if there is
+    none"""
+    match ttc_dist.get('type'):
+        case None if not ttc_dist:
+            return _constant(0.0)
+
+        case 'number':
+            return _constant(float(ttc_dist['value']))
+
+        case 'function':
+            return _function_moments(
+                ttc_dist['name'],
+                [float(argument) for argument in ttc_dist['arguments']]
+            )
+
+        case 'multiplication' if (
+            _bernoulli_probability(ttc_dist['lhs']) is not None
+            or _bernoulli_probability(ttc_dist['rhs']) is not None
+        ):
+            p = _bernoulli_probability(ttc_dist['lhs'])
+            other = ttc_dist['rhs']
+            if p is None:
+                p = _bernoulli_probability(ttc_dist['rhs'])
+                other = ttc_dist['lhs']
+            assert p is not None
+            moments = _get_moments(other)
+            if moments is None:
+                return None if p == 1.0 else _Moments(math.inf, math.inf)
+            return _bernoulli_product(p, moments)
+
+        case operation if operation in BINARY_OPERATIONS:
+            lhs = _get_moments(ttc_dist['lhs'])
+            rhs = _get_moments(ttc_dist['rhs'])
+            if lhs is None or rhs is None:
+                return None
+            return _binary_operation_moments(operation, lhs, rhs)
+    return None
+
+
+@lru_cache(maxsize=256)
+def _get_samples(ttc_dist: FrozenTTCDist) -> tuple[float, ...]:
+    """Return the sorted approximation samples of a distribution"""
+    samples = compile_ttc_dist(ttc_dist)(
+        PythonBackend(APPROXIMATION_SEED), APPROXIMATION_SAMPLES
+    )
+    # Samples such as inf - inf are left out, they have no order
+    return tuple(sorted(
+        sample for sample in samples if not math.isnan(sample)
+    ))
+
+
+def _sample_quantile(samples: tuple[float, ...], q: float) -> float:
+    return samples[max(math.ceil(q * len(samples)) - 1, 0)]
+
+
+def _sample_moments(samples: tuple[float, ...]) -> tuple[float, float]:
+    if math.isfinite(samples[0]) and math.isfinite(samples[-1]):
+        return statistics.fmean(samples), statistics.pvariance(samples)
+    mean = sum(samples) / len(samples)
+    return mean, math.nan if math.isnan(mean) else math.inf
+
+
+@lru_cache(maxsize=4096)
+def _get_ttc_statistics(
+    ttc_dist: FrozenTTCDist, quantiles: tuple[float, ...]
+) -> TTCStatistics:
+    moments = _get_moments(ttc_dist)
+    if moments is not None and moments.quantile is not None:
+        return TTCStatistics(
+            moments.mean,
+            moments.variance,
+            {q: moments.quantile(q) for q in quantiles}
+        )
+
+    samples = _get_samples(ttc_dist)
+    if moments is not None:
+        mean, variance = moments.mean, moments.variance
+    else:
+        mean, variance = _sample_moments(samples)
+    return TTCStatistics(
+        mean, variance, {q: _sample_quantile(samples, q) for q in quantiles}
+    )
+
+
+def get_ttc_statistics(
+    ttc_dist: Optional[dict], quantiles: Iterable[float] = DEFAULT_QUANTILES
+) -> TTCStatistics:
+    """Return the mean, variance and quantiles of a ttc distribution.
+
+    Arguments:
+    ---------
+    ttc_dist        - a ttc distribution, None or an empty dict for nodes
+                      without one
+    quantiles       - the probabilities of the quantiles, between 0 and 1
+
+    Return:
+    ------
+    The `TTCStatistics` of the distribution, shared by all equal
+    distributions.
+    """
+    quantiles = tuple(quantiles)
+    for q in quantiles:
+        if not 0.0 < q < 1.0:
+            raise ValueError(f'Quantile {q} is not between 0 and 1')
+    return _get_ttc_statistics(freeze_ttc_dist(ttc_dist or {}), quantiles)
+
+
+def get_nodes_ttc_statistics(
+    nodes: Iterable[AttackGraphNode],
+    quantiles: Iterable[float] = DEFAULT_QUANTILES
+) -> dict[AttackGraphNode, TTCStatistics]:
+    """Return the ttc statistics of each node, see `get_ttc_statistics`"""
+    quantiles = tuple(quantiles)
+    return {node: get_ttc_statistics(node.ttc, quantiles) for node in nodes}
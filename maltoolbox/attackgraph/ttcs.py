@@ -1,28 +1,50 @@
-import copy
 import logging
+from functools import lru_cache
+
 from maltoolbox.language.language_graph_attack_step import LanguageGraphAttackStep
+from maltoolbox.language.ttc_dist import FrozenTTCDist, freeze_ttc_dist
 from maltoolbox.model import ModelAsset
 
 logger = logging.getLogger(__name__)
 
-def get_ttc_dist(
+
+@lru_cache(maxsize=1024)
+def get_defense_ttc(defense_value: float) -> FrozenTTCDist:
+    """Get the shared ttc distribution of a defense with a given value"""
+    frozen_dist = freeze_ttc_dist({
+        'arguments': [defense_value],
+        'name': 'Bernoulli',
+        'type': 'function'
+    })
+    assert frozen_dist is not None
+    return frozen_dist
+
+
+def get_ttc_override(
     asset: ModelAsset, attack_step: LanguageGraphAttackStep
 ):
-    """Get step ttc distribution based on language
-    and possibly overriding defense status
+    """Get the step ttc distribution set by the model, None if the ttc
+    distribution of the language applies
     """
-    ttc_dist = copy.deepcopy(attack_step.ttc)
     if attack_step.type ==  'defense':
         if attack_step.name in asset.defenses:
             # If defense status was set in model, set ttc accordingly
             defense_value = float(asset.defenses[attack_step.name])
-            ttc_dist = {
-                'arguments': [defense_value],
-                'name': 'Bernoulli',
-                'type': 'function'
-            }
             logger.debug(
                 'Setting defense \"%s\" to "%s".',
                 asset.name + ":" + attack_step.name, defense_value
             )
+            return get_defense_ttc(defense_value)
+    return None
+
+def get_ttc_dist(
+    asset: ModelAsset, attack_step: LanguageGraphAttackStep
+):
+    """Get step ttc distribution based on language
+    and possibly overriding defense status. The distribution is shared
+    and read-only, see `maltoolbox.language.ttc_dist`.
+    """
+    ttc_dist = get_ttc_override(asset, attack_step)
+    if ttc_dist is None:
+        ttc_dist = attack_step.ttc
     return ttc_dist
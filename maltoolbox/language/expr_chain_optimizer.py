@@ -0,0 +1,293 @@
+"""Algebraic optimizer for expressions chains
+
+Expressions chains are written by language authors for readability. The
+optimizer rewrites a chain into an equivalent chain that is cheaper to
+follow, giving the same assets as the original for every set of starting
+assets when followed by `generate.follow_expr_chain`.
+
+A chain is distributive when following it from a set of assets gives the
+union of following it from each of the assets on its own. Fields are
+distributive, and so are unions, collects, subtype filters and transitive
+closures of distributive chains. Intersections and differences are not,
+so `collect` only follows its right link from all left hand assets at once
+when the right link is distributive.
+
+The rewrite rules are:
+
+- `collect(collect(a, b), c)` becomes `collect(a, collect(b, c))`, so that
+  common prefixes end up as the left link of the outermost collect
+- `union(collect(p, x), collect(p, y))` becomes `collect(p, union(x, y))`
+  and `union(collect(x, s), collect(y, s))` becomes `collect(union(x, y), s)`
+- `union(x, x)` and `intersection(x, x)` become `x`
+- `transitive(transitive(x))` becomes `transitive(x)` for distributive `x`
+- `subType(S, collect(a, b))` becomes `collect(a, subType(S, b))`, moving
+  subtype filters down to the step they filter
+- `subType(S, subType(T, x))` becomes a single filter on the more specific
+  of S and T when one of them extends the other
+"""
+
+from __future__ import annotations
+
+import logging
+from functools import partial
+from typing import TYPE_CHECKING, Any, Callable, Optional
+
+from maltoolbox.exceptions import LanguageGraphException
+from maltoolbox.language.expression_chain import ExpressionsChain, ExprType
+
+if TYPE_CHECKING:
+    from maltoolbox.language.languagegraph import LanguageGraph
+
+logger = logging.getLogger(__name__)
+
+
+def optimize_expr_chain(
+    expr_chain: Optional[ExpressionsChain],
+    lang_graph: LanguageGraph | None = None
+) -> Optional[ExpressionsChain]:
+    """Rewrite an expressions chain into a cheaper equivalent chain.
+
+    Arguments:
+    ---------
+    expr_chain      - the expressions chain to optimize, it is not modified
+    lang_graph      - if given, the new chains are interned in the language
+                      graph so they share structure with its chains
+
+    Return:
+    ------
+    The optimized chain, `expr_chain` itself if no rule applies.
+    """
+    make_chain: Callable[..., ExpressionsChain] = ExpressionsChain
+    if lang_graph is not None:
+        make_chain = partial(_make_interned_chain, lang_graph)
+    return _ExprChainOptimizer(make_chain).optimize(expr_chain)
+
+
+def get_optimized_expr_chain(
+    lang_graph: LanguageGraph, expr_chain: Optional[ExpressionsChain]
+) -> Optional[ExpressionsChain]:
+    """Return the optimized expressions chain of a chain of the language
+    graph, optimizing it the first time it is requested.
+    """
+    optimized_chains = lang_graph._optimized_expr_chains
+    entry = optimized_chains.get(id(expr_chain))
+    if entry is not None and entry[0] is expr_chain:
+        return entry[1]
+
+    optimized_chain = optimize_expr_chain(expr_chain, lang_graph)
+    # Keep a reference to the chain so that its id can not be reused
+    optimized_chains[id(expr_chain)] = (expr_chain, optimized_chain)
+    return optimized_chain
+
+
+def _make_interned_chain(
+    lang_graph: LanguageGraph, **kwargs: Any
+) -> ExpressionsChain:
+    """Create an expressions chain and intern it in the language graph"""
+    expr_chain = lang_graph.intern_expr_chain(ExpressionsChain(**kwargs))
+    if expr_chain is None:
+        raise LanguageGraphException(
+            'Interning an expressions chain gave no chain'
+        )
+    return expr_chain
+
+
+def is_distributive(expr_chain: Optional[ExpressionsChain]) -> bool:
+    """Return True if following the chain from a set of assets gives the
+    union of following it from each of the assets"""
+    if expr_chain is None:
+        return True
+    match (expr_chain.type):
+        case 'field':
+            return True
+        case 'union':
+            return (
+                is_distributive(expr_chain.left_link)
+                and is_distributive(expr_chain.right_link)
+            )
+        case 'collect':
+            # The right link is followed from each left hand asset on its
+            # own unless it is distributive itself
+            return is_distributive(expr_chain.left_link)
+        case 'subType' | 'transitive':
+            return is_distributive(expr_chain.sub_link)
+        case _:
+            return False
+
+
+def same_expr_chain(
+    expr_chain: Optional[ExpressionsChain],
+    other: Optional[ExpressionsChain]
+) -> bool:
+    """Return True if two chains have the same structure, comparing
+    associations and subtypes by identity"""
+    if expr_chain is other:
+        return True
+    if expr_chain is None or other is None:
+        return False
+    return (
+        expr_chain.type == other.type
+        and expr_chain.fieldname == other.fieldname
+        and expr_chain.association is other.association
+        and expr_chain.subtype is other.subtype
+        and same_expr_chain(expr_chain.left_link, other.left_link)
+        and same_expr_chain(expr_chain.right_link, other.right_link)
+        and same_expr_chain(expr_chain.sub_link, other.sub_link)
+    )
+
+
+class _ExprChainOptimizer:
+    def __init__(self, make_chain: Callable[..., ExpressionsChain]):
+        self.make_chain = make_chain
+        # Optimized chains by the id of the chain they were made from
+        self.optimized: dict[int, tuple[ExpressionsChain, ExpressionsChain]] = {}
+
+    def optimize(
+        self, expr_chain: Optional[ExpressionsChain]
+    ) -> Optional[ExpressionsChain]:
+        if expr_chain is None:
+            return None
+        entry = self.optimized.get(id(expr_chain))
+        if entry is not None and entry[0] is expr_chain:
+            return entry[1]
+
+        chain = self.optimize_links(expr_chain)
+        while (rewritten_chain := self.rewrite(chain)) is not None:
+            logger.debug(
+                'Rewrote expressions chain %s to %s', chain, rewritten_chain
+            )
+            chain = self.optimize_links(rewritten_chain)
+
+        self.optimized[id(expr_chain)] = (expr_chain, chain)
+        return chain
+
+    def optimize_links(self, expr_chain: ExpressionsChain) -> ExpressionsChain:
+        left_link = self.optimize(expr_chain.left_link)
+        right_link = self.optimize(expr_chain.right_link)
+        sub_link = self.optimize(expr_chain.sub_link)
+        if (
+            left_link is expr_chain.left_link
+            and right_link is expr_chain.right_link
+            and sub_link is expr_chain.sub_link
+        ):
+            return expr_chain
+        return self.make_chain(
+            type=expr_chain.type,
+            left_link=left_link,
+            right_link=right_link,
+            sub_link=sub_link,
+            fieldname=expr_chain.fieldname,
+            association=expr_chain.association,
+            subtype=expr_chain.subtype,
+        )
+
+    def rewrite(
+        self, expr_chain: ExpressionsChain
+    ) -> Optional[ExpressionsChain]:
+        """Apply the first rule that matches the top of the chain, None if
+        there is none"""
+        match (expr_chain.type):
+            case 'collect':
+                return self.rewrite_collect(expr_chain)
+            case 'union' | 'intersection':
+                return self.rewrite_set_operation(expr_chain)
+            case 'transitive':
+                return self.rewrite_transitive(expr_chain)
+            case 'subType':
+                return self.rewrite_subtype(expr_chain)
+        return None
+
+    def rewrite_collect(
+        self, expr_chain: ExpressionsChain
+    ) -> Optional[ExpressionsChain]:
+        left_link = expr_chain.left_link
+        if left_link is not None and left_link.type == 'collect':
+            return self.make_chain(
+                type=ExprType.COLLECT,
+                left_link=left_link.left_link,
+                right_link=self.make_chain(
+                    type=ExprType.COLLECT,
+                    left_link=left_link.right_link,
+                    right_link=expr_chain.right_link,
+                ),
+            )
+        return None
+
+    def rewrite_set_operation(
+        self, expr_chain: ExpressionsChain
+    ) -> Optional[ExpressionsChain]:
+        left_link = expr_chain.left_link
+        right_link = expr_chain.right_link
+        if same_expr_chain(left_link, right_link):
+            return left_link
+
+        if (
+            expr_chain.type != 'union'
+            or left_link is None or left_link.type != 'collect'
+            or right_link is None or right_link.type != 'collect'
+        ):
+            return None
+
+        if same_expr_chain(left_link.left_link, right_link.left_link):
+            return self.make_chain(
+                type=ExprType.COLLECT,
+                left_link=left_link.left_link,
+                right_link=self.make_chain(
+                    type=ExprType.UNION,
+                    left_link=left_link.right_link,
+                    right_link=right_link.right_link,
+                ),
+            )
+
+        if same_expr_chain(left_link.right_link, right_link.right_link):
+            return self.make_chain(
+                type=ExprType.COLLECT,
+                left_link=self.make_chain(
+                    type=ExprType.UNION,
+                    left_link=left_link.left_link,
+                    right_link=right_link.left_link,
+                ),
+                right_link=left_link.right_link,
+            )
+        return None
+
+    def rewrite_transitive(
+        self, expr_chain: ExpressionsChain
+    ) -> Optional[ExpressionsChain]:
+        sub_link = expr_chain.sub_link
+        if (
+            sub_link is not None and sub_link.type == 'transitive'
+            and is_distributive(sub_link.sub_link)
+        ):
+            return sub_link
+        return None
+
+    def rewrite_subtype(
+        self, expr_chain: ExpressionsChain
+    ) -> Optional[ExpressionsChain]:
+        sub_link = expr_chain.sub_link
+        subtype = expr_chain.subtype
+        if sub_link is None or subtype is None:
+            return None
+
+        if sub_link.type == 'collect':
+            return self.make_chain(
+                type=ExprType.COLLECT,
+                left_link=sub_link.left_link,
+                right_link=self.make_chain(
+                    type=ExprType.SUBTYPE,
+                    sub_link=sub_link.right_link,
+                    subtype=subtype,
+                ),
+            )
+
+        if sub_link.type == 'subType' and sub_link.subtype is not None:
+            if subtype in sub_link.subtype.sub_assets:
+                return self.make_chain(
+                    type=ExprType.SUBTYPE,
+                    sub_link=sub_link.sub_link,
+                    subtype=subtype,
+                )
+            if sub_link.subtype in subtype.sub_assets:
+                return sub_link
+        return None
@@ -10,8 +10,8 @@ associations in a language graph. Each node has a type that determines:
 """
 from __future__ import annotations
 
-from typing import TYPE_CHECKING, Any
-from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Optional
+from dataclasses import dataclass, replace
 from enum import Enum
 
 from maltoolbox.exceptions import (
@@ -298,3 +298,68 @@ class ExpressionsChain:
 
     def __repr__(self) -> str:
         return str(self.to_dict())
+
+
+class ExpressionsChainTable:
+    """Interning table of the expressions chains of a language graph
+
+    Chains are interned bottom-up by structure: two chains with the same
+    type, fieldname, association and subtype whose links are the same
+    interned chains are the same object. Equal subtrees of different
+    chains are shared, and the identity of an interned chain can be used
+    as a key for anything computed from its structure.
+
+    Chains must not be modified once they are interned.
+    """
+
+    def __init__(self) -> None:
+        self._chains: dict[tuple, ExpressionsChain] = {}
+
+    def __len__(self) -> int:
+        return len(self._chains)
+
+    def __repr__(self) -> str:
+        return f'ExpressionsChainTable(chains: {len(self._chains)})'
+
+    def __getstate__(self) -> dict[str, Any]:
+        # The keys hold object ids, which are not preserved when pickling
+        return {'_chains': {}}
+
+    def intern(
+        self, expr_chain: Optional[ExpressionsChain]
+    ) -> Optional[ExpressionsChain]:
+        """Return the interned chain structurally equal to `expr_chain`,
+        interning it and its links if there is none"""
+        if expr_chain is None:
+            return None
+
+        left_link = self.intern(expr_chain.left_link)
+        right_link = self.intern(expr_chain.right_link)
+        sub_link = self.intern(expr_chain.sub_link)
+
+        key = (
+            expr_chain.type,
+            id(left_link),
+            id(right_link),
+            id(sub_link),
+            expr_chain.fieldname,
+            id(expr_chain.association),
+            id(expr_chain.subtype),
+        )
+        interned_chain = self._chains.get(key)
+        if interned_chain is None:
+            if (
+                left_link is expr_chain.left_link
+                and right_link is expr_chain.right_link
+                and sub_link is expr_chain.sub_link
+            ):
+                interned_chain = expr_chain
+            else:
+                interned_chain = replace(
+                    expr_chain,
+                    left_link=left_link,
+                    right_link=right_link,
+                    sub_link=sub_link,
+                )
+            self._chains[key] = interned_chain
+        return interned_chain
@@ -135,7 +135,7 @@ class LanguageGraphAsset:
             associations |= self.own_super_asset.associations
         return associations
 
-    @property
+    @cached_property
     def variables(
             self
         ) -> dict[str, tuple[LanguageGraphAsset, Optional[ExpressionsChain]]]:
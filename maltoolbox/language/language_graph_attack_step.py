@@ -6,6 +6,8 @@ from typing import TYPE_CHECKING, Any, Literal, Optional
 from dataclasses import dataclass, field
 from functools import cached_property
 
+from maltoolbox.language.ttc_dist import freeze_ttc_dist, thaw_ttc_dist
+
 if TYPE_CHECKING:
     from maltoolbox.language.expression_chain import ExpressionsChain
     from maltoolbox.language.language_graph_asset import LanguageGraphAsset
@@ -34,6 +36,13 @@ class LanguageGraphAttackStep:
     own_requires: list[ExpressionsChain] = field(default_factory=list)
     tags: list = field(default_factory=list)
     detectors: dict[str, LanguageGraphDetector] = field(default_factory=dict)
+    _child_table: Optional[
+        tuple[tuple[LanguageGraphAttackStep, ExpressionsChain | None], ...]
+    ] = field(default=None, init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        # The distribution is shared by all nodes of the step
+        self.ttc = freeze_ttc_dist(self.ttc)
 
     def __hash__(self):
         return id(self)
@@ -41,17 +50,62 @@ class LanguageGraphAttackStep:
     @property
     def children(self) -> dict[LanguageGraphAttackStep, list[ExpressionsChain | None]]:
         """Return own and inherited children."""
-        all_children = dict(self.own_children)
-        if self.overrides or not self.inherits:
-            return all_children
-
-        for child, chains in self.inherits.children.items():
-            if child in all_children:
-                all_children[child] += [c for c in chains if c not in all_children[child]]
-            else:
-                all_children[child] = list(chains)
+        all_children: dict[
+            LanguageGraphAttackStep, list[ExpressionsChain | None]
+        ] = {}
+        for child, chain in self.child_table:
+            all_children.setdefault(child, []).append(chain)
         return all_children
 
+    @property
+    def child_table(
+        self
+    ) -> tuple[tuple[LanguageGraphAttackStep, ExpressionsChain | None], ...]:
+        """Return own and inherited children as a flat table of
+        (child attack step, expressions chain) pairs.
+
+        The table is built on first access, see `build_child_table`, so it
+        must not be read before the language graph is fully built.
+        """
+        if self._child_table is None:
+            return self.build_child_table()
+        return self._child_table
+
+    def build_child_table(
+        self
+    ) -> tuple[tuple[LanguageGraphAttackStep, ExpressionsChain | None], ...]:
+        """Compute and store the table of own and inherited children.
+
+        Steps that override the step they extend do not inherit its
+        children. A chain that is inherited along several steps is only
+        listed once per child. The table of the extended step is used as
+        it is, so it has to be up to date.
+        """
+        table: list[tuple[LanguageGraphAttackStep, ExpressionsChain | None]] = []
+        chains_per_child: dict[
+            LanguageGraphAttackStep, list[ExpressionsChain | None]
+        ] = {}
+        for child, chains in self.own_children.items():
+            for chain in chains:
+                child_chains = chains_per_child.setdefault(child, [])
+                if chain not in child_chains:
+                    child_chains.append(chain)
+                    table.append((child, chain))
+
+        if not self.overrides and self.inherits:
+            for child, chain in self.inherits.child_table:
+                child_chains = chains_per_child.setdefault(child, [])
+                if chain not in child_chains:
+                    child_chains.append(chain)
+                    table.append((child, chain))
+        self._child_table = tuple(table)
+        return self._child_table
+
+    def invalidate_child_table(self) -> None:
+        """Drop the stored child table, it is built again when it is next
+        read"""
+        self._child_table = None
+
     @property
     def parents(self) -> None:
         raise NotImplementedError("Fetching parents is not supported.")
@@ -67,7 +121,7 @@ class LanguageGraphAttackStep:
             "name": self.name,
             "type": self.type,
             "asset": self.asset.name,
-            "ttc": self.ttc,
+            "ttc": thaw_ttc_dist(self.ttc),
             "own_children": {},
             "own_parents": {},
             "info": self.info,
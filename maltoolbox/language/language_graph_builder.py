@@ -1,11 +1,13 @@
 
 import json
 import logging
-from typing import Any
+from dataclasses import replace
+from typing import Any, Optional
 
 from maltoolbox.exceptions import LanguageGraphAssociationError, LanguageGraphException, LanguageGraphStepExpressionError, LanguageGraphSuperAssetNotFoundError
+from maltoolbox.language.expression_chain import ExpressionsChain, ExpressionsChainTable
 from maltoolbox.language.language_graph_detector import LanguageGraphContextItem, LanguageGraphDetector
-from maltoolbox.language.language_graph_lookup import get_attacks_for_asset_type, get_variables_for_asset_type
+from maltoolbox.language.language_graph_lookup import LangSpecIndex, get_attacks_for_asset_type, get_variables_for_asset_type
 from maltoolbox.language.language_graph_asset import LanguageGraphAsset
 from maltoolbox.language.language_graph_assoc import LanguageGraphAssociation, LanguageGraphAssociationField, link_association_to_assets
 from maltoolbox.language.language_graph_attack_step import LanguageGraphAttackStep
@@ -27,15 +29,99 @@ def generate_graph(lang_spec) -> dict[str, LanguageGraphAsset]:
     # Add and link associations to assets
     create_associations_for_assets(lang_spec, assets)
 
+    # Index the language specification for the lookups of attack steps
+    # and variables
+    lang_spec_index = LangSpecIndex(lang_spec)
+
     # Set the variables for each asset
-    set_variables_for_assets(assets, lang_spec)
+    set_variables_for_assets(assets, lang_spec_index)
 
     # Add attack steps to the assets
-    generate_attack_steps(assets, lang_spec)
+    generate_attack_steps(assets, lang_spec_index)
+
+    # Share equal expressions chains, cache what assets inherit and
+    # flatten the inherited children of every attack step
+    intern_expr_chains(assets)
+    resolve_asset_inheritance(assets)
+    build_child_tables(assets)
 
     return assets
 
 
+def intern_expr_chains(
+    assets: dict[str, LanguageGraphAsset],
+    table: ExpressionsChainTable | None = None
+) -> ExpressionsChainTable:
+    """Replace the expressions chains of the variables, attack steps and
+    detectors of all assets with interned ones, so that structurally equal
+    chains are the same object.
+
+    Arguments:
+    ---------
+    assets      - a dictionary of LanguageGraphAsset objects
+                    indexed by their names
+    table       - the table to intern the chains in, a new one if None
+
+    Return:
+    ------
+    The table the chains were interned in.
+
+    """
+    if table is None:
+        table = ExpressionsChainTable()
+
+    for asset in assets.values():
+        for var_name, (target_asset, expr_chain) in asset.own_variables.items():
+            asset.own_variables[var_name] = (
+                target_asset, table.intern(expr_chain)
+            )
+
+        for attack_step in asset.attack_steps.values():
+            chain_lists: list[list[Optional[ExpressionsChain]]] = [
+                *attack_step.own_children.values(),
+                *attack_step.own_parents.values(),
+            ]
+            for expr_chains in chain_lists:
+                expr_chains[:] = [
+                    table.intern(expr_chain) for expr_chain in expr_chains
+                ]
+
+            requires: list[ExpressionsChain] = []
+            for expr_chain in attack_step.own_requires:
+                interned_chain = table.intern(expr_chain)
+                assert interned_chain is not None
+                requires.append(interned_chain)
+            attack_step.own_requires[:] = requires
+
+            for detector in attack_step.detectors.values():
+                for label, context_item in detector.context.items():
+                    expr_chain = table.intern(context_item.expr)
+                    if expr_chain is not context_item.expr:
+                        detector.context[label] = replace(
+                            context_item, expr=expr_chain
+                        )
+
+    logger.debug('Interned %d expressions chains.', len(table))
+    return table
+
+
+def build_child_tables(assets: dict[str, LanguageGraphAsset]) -> None:
+    """Compute the flattened child table of every attack step once the
+    attack steps of the language graph are connected."""
+    attack_steps = [
+        attack_step
+        for asset in assets.values()
+        for attack_step in asset.attack_steps.values()
+    ]
+    # Tables of extended steps are built on demand by the steps that
+    # inherit from them, so all tables are dropped before any is built
+    for attack_step in attack_steps:
+        attack_step.invalidate_child_table()
+    for attack_step in attack_steps:
+        if attack_step._child_table is None:
+            attack_step.build_child_table()
+
+
 def create_lg_assets(lang_spec: dict[str, Any]) -> dict[str, LanguageGraphAsset]:
     """Create the LanguageGraphAsset nodes for the language graph based on the language specification."""
     assets = {}
@@ -87,18 +173,31 @@ def set_variables_for_assets(assets: dict[str, LanguageGraphAsset], lang_spec) -
                     indexed by their names
 
     """
-    for asset in assets.values():
+    # Variables may refer to the variables set before them, so the cached
+    # variables of each asset are kept up to date while they are set.
+    # Super assets come first, their variables are complete when the
+    # variables of their sub assets are set.
+    for asset in get_topological_asset_order(assets):
         logger.debug(
             'Set variables for asset %s', asset.name
         )
+        super_asset = asset.own_super_asset
+        inherited = super_asset.variables if super_asset else {}
+        asset.variables = dict(inherited)
         variables = get_variables_for_asset_type(asset.name, lang_spec)
         for variable in variables:
-            asset.own_variables[variable['name']] = resolve_variable(
-                assets, asset, variable['name'], lang_spec
+            var_name = variable['name']
+            asset.own_variables[var_name] = resolve_variable(
+                assets, asset, var_name, lang_spec
             )
+            # Inherited variables take precedence, as in
+            # LanguageGraphAsset.variables
+            if var_name not in inherited:
+                asset.variables[var_name] = asset.own_variables[var_name]
+
 
 def _create_detector(
-    assets, target_asset, step_dict: dict, lang_spec: dict
+    assets, target_asset, step_dict: dict, lang_spec: dict | LangSpecIndex
 ) -> dict[str, LanguageGraphDetector]:
     detectors = {}
     for det in step_dict.get('detectors', {}).values():
@@ -127,7 +226,7 @@ def _create_detector(
     return detectors
 
 def _create_lg_attack_step_nodes(
-    assets: dict[str, LanguageGraphAsset], lang_spec: dict
+    assets: dict[str, LanguageGraphAsset], lang_spec: dict | LangSpecIndex
 ) -> dict[str, dict]:
 
     attack_step_dicts = {}
@@ -159,15 +258,75 @@ def _create_lg_attack_step_nodes(
     return attack_step_dicts
 
 
+def get_topological_asset_order(
+    assets: dict[str, LanguageGraphAsset]
+) -> list[LanguageGraphAsset]:
+    """Return the assets ordered so that every asset comes after the asset
+    it extends.
+
+    Arguments:
+    ---------
+    assets      - a dictionary of LanguageGraphAsset objects
+                    indexed by their names
+
+    Return:
+    ------
+    A list of the assets, super assets before their sub assets.
+
+    """
+    order: list[LanguageGraphAsset] = []
+    ordered: set[LanguageGraphAsset] = set()
+    for asset in assets.values():
+        # Walk up to the first ancestor that is already ordered
+        chain: list[LanguageGraphAsset] = []
+        in_chain: set[LanguageGraphAsset] = set()
+        current_asset: LanguageGraphAsset | None = asset
+        while current_asset is not None and current_asset not in ordered:
+            if current_asset in in_chain:
+                msg = 'Inheritance cycle through asset "%s"!'
+                logger.error(msg, current_asset.name)
+                raise LanguageGraphException(msg % current_asset.name)
+            chain.append(current_asset)
+            in_chain.add(current_asset)
+            current_asset = current_asset.own_super_asset
+        for chain_asset in reversed(chain):
+            order.append(chain_asset)
+            ordered.add(chain_asset)
+    return order
+
+
+def resolve_asset_inheritance(assets: dict[str, LanguageGraphAsset]) -> None:
+    """Compute the inherited super assets, sub assets, associations and
+    variables of all assets in one pass over the asset hierarchy, once the
+    assets, associations and variables of the language graph are set.
+
+    The results are stored as the cached values of the corresponding
+    LanguageGraphAsset properties.
+    """
+    order = get_topological_asset_order(assets)
+    for asset in order:
+        super_asset = asset.own_super_asset
+        if super_asset is None:
+            asset.super_assets = [asset]
+            asset.associations = dict(asset.own_associations)
+            asset.variables = dict(asset.own_variables)
+        else:
+            asset.super_assets = [asset, *super_asset.super_assets]
+            asset.associations = (
+                dict(asset.own_associations) | super_asset.associations
+            )
+            asset.variables = dict(asset.own_variables) | super_asset.variables
+
+    for asset in reversed(order):
+        sub_assets = {asset}
+        for sub_asset in asset.own_sub_assets:
+            sub_assets |= sub_asset.sub_assets
+        asset.sub_assets = sub_assets
+
+
 def _inherit_attack_steps(assets: dict[str, LanguageGraphAsset]) -> None:
-    pending = list(assets.values())
-    while pending:
-        asset = pending.pop(0)
+    for asset in get_topological_asset_order(assets):
         super_asset = asset.own_super_asset
-        if super_asset in pending:
-            # Super asset still needs processing, defer this asset
-            pending.append(asset)
-            continue
         if not super_asset:
             continue
         for super_step in super_asset.attack_steps.values():
@@ -197,7 +356,7 @@ def _inherit_attack_steps(assets: dict[str, LanguageGraphAsset]) -> None:
 
 def _connect_attack_steps(
     assets: dict[str, LanguageGraphAsset],
-    lang_spec: dict[str, Any],
+    lang_spec: dict[str, Any] | LangSpecIndex,
     attack_step_dicts: dict[str, dict]
 ) -> None:
     """Connect attack steps based on the 'reaches' and 'requires' expressions in the language specification."""
@@ -246,7 +405,9 @@ def _connect_attack_steps(
                     step.own_requires.append(chain)
 
 
-def generate_attack_steps(assets: dict[str, LanguageGraphAsset], lang_spec: dict) -> None:
+def generate_attack_steps(
+    assets: dict[str, LanguageGraphAsset], lang_spec: dict | LangSpecIndex
+) -> None:
     """
     Generate attack steps for all assets and link them according to the
     language specification.
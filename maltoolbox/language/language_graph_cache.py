@@ -0,0 +1,160 @@
+"""Persistent on-disk cache of language graphs
+
+Compiling a MAL specification and building its language graph is costly,
+so language graphs loaded from files can be cached in a directory. Cache
+entries are pickled `LanguageGraph`s named after a hash of the source
+files and the maltoolbox version, so an entry is never reused after any
+of its sources change. For .mal files the sources are the file and all
+files it transitively includes.
+
+The cache is enabled by setting `cache.langgraph_dir` in the maltoolbox
+configuration, by the `MALTOOLBOX_LANGGRAPH_CACHE` environment variable
+or by passing `cache_dir` when loading a language graph.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+import pickle
+import re
+import tempfile
+import zipfile
+from pathlib import Path
+from typing import TYPE_CHECKING, Callable
+
+from maltoolbox import __version__, config
+
+if TYPE_CHECKING:
+    from maltoolbox.language.languagegraph import LanguageGraph
+
+logger = logging.getLogger(__name__)
+
+# Bumped when the layout of cache entries changes
+CACHE_FORMAT_VERSION = 3
+
+INCLUDE_PATTERN = re.compile(rb'^\s*include\s+"([^"]+)"', re.MULTILINE)
+COMMENT_PATTERN = re.compile(rb'//[^\n]*|/\*.*?\*/', re.DOTALL)
+
+
+def get_language_graph_cache_dir() -> str | None:
+    """Return the configured language graph cache directory, None if the
+    cache is disabled"""
+    return config.get('cache', {}).get('langgraph_dir')
+
+
+def get_mal_source_files(mal_file: str | Path) -> list[Path]:
+    """Return a .mal file followed by all the files it transitively
+    includes, in the order they are first included.
+
+    Includes are resolved relative to the including file like the
+    compiler does. Files that do not exist are left out, the compiler
+    reports them when the language is compiled.
+    """
+    source_files: list[Path] = []
+    visited: set[Path] = set()
+    stack = [Path(mal_file).resolve()]
+    while stack:
+        current_file = stack.pop()
+        if current_file in visited or not current_file.is_file():
+            continue
+        visited.add(current_file)
+        source_files.append(current_file)
+
+        source = COMMENT_PATTERN.sub(b'', current_file.read_bytes())
+        included_files = [
+            current_file.parent / include.decode()
+            for include in INCLUDE_PATTERN.findall(source)
+        ]
+        stack.extend(
+            included_file.resolve() for included_file in reversed(included_files)
+        )
+    return source_files
+
+
+def get_language_graph_cache_key(filename: str) -> str:
+    """Return the cache key of the language graph loaded from a file
+
+    The key is a hash of the maltoolbox version and the contents of the
+    file, and of all the files it includes if it is a MAL specification.
+    """
+    path = Path(filename)
+    if (
+        path.suffix in ('.json', '.yml', '.yaml', '.mar')
+        or zipfile.is_zipfile(path)
+    ):
+        source_files = [path.resolve()]
+    else:
+        source_files = get_mal_source_files(path)
+
+    digest = hashlib.sha256()
+    digest.update(f'{__version__}:{CACHE_FORMAT_VERSION}\0'.encode())
+    root = source_files[0].parent
+    for source_file in source_files:
+        # Hash relative names so copies of the sources share entries
+        digest.update(os.path.relpath(source_file, root).encode() + b'\0')
+        digest.update(source_file.read_bytes() + b'\0')
+    return digest.hexdigest()
+
+
+def load_cached_language_graph(
+    filename: str,
+    load: Callable[[str], LanguageGraph],
+    cache_dir: str | os.PathLike
+) -> LanguageGraph:
+    """Load a language graph from the cache, or load it with `load` and
+    store it in the cache.
+
+    Arguments:
+    ---------
+    filename        - the language file to load
+    load            - function that loads the language graph from the file
+    cache_dir       - the cache directory, created if it does not exist
+
+    Return:
+    ------
+    The cached or newly loaded language graph.
+    """
+    cache_file = Path(cache_dir) / (
+        get_language_graph_cache_key(filename) + '.pickle'
+    )
+
+    if cache_file.is_file():
+        try:
+            with open(cache_file, 'rb') as f:
+                lang_graph = pickle.load(f)
+            logger.info(
+                'Loaded language graph of %s from cache %s',
+                filename, cache_file
+            )
+            return lang_graph
+        except (
+            OSError, pickle.UnpicklingError, EOFError, AttributeError,
+            ImportError
+        ) as e:
+            logger.warning(
+                'Ignoring unreadable language graph cache entry %s: %s',
+                cache_file, e
+            )
+
+    lang_graph = load(filename)
+    store_language_graph(lang_graph, cache_file)
+    return lang_graph
+
+
+def store_language_graph(lang_graph: LanguageGraph, cache_file: Path) -> None:
+    """Write a cache entry, atomically so concurrent readers never see a
+    partially written entry"""
+    cache_file.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(
+        dir=cache_file.parent, suffix='.tmp'
+    )
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            pickle.dump(lang_graph, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_name, cache_file)
+    except BaseException:
+        os.unlink(tmp_name)
+        raise
+    logger.info('Stored language graph in cache %s', cache_file)
@@ -1,12 +1,61 @@
 
+from __future__ import annotations
+
 import logging
+from typing import Any
 
 from maltoolbox.exceptions import LanguageGraphException
 
 
 logger = logging.getLogger(__name__)
 
-def get_attacks_for_asset_type(asset_type: str, lang_spec) -> dict[str, dict]:
+
+class LangSpecIndex:
+    """Index of the assets, associations and variables of a MAL language
+    specification by name.
+
+    The lookup functions of this module scan the language specification
+    unless they are given an index instead, so an index should be built
+    once and passed around when many lookups are made.
+    """
+
+    def __init__(self, lang_spec: dict[str, Any]):
+        self.lang_spec = lang_spec
+
+        # The first asset with a name wins, like in a scan
+        self.assets: dict[str, dict] = {}
+        for asset_dict in lang_spec['assets']:
+            self.assets.setdefault(asset_dict['name'], asset_dict)
+
+        self.associations: dict[str, list[dict]] = {}
+        for assoc_dict in lang_spec['associations']:
+            for asset_type in {assoc_dict['leftAsset'], assoc_dict['rightAsset']}:
+                self.associations.setdefault(asset_type, []).append(assoc_dict)
+
+        self.variables: dict[str, dict[str, dict]] = {}
+        for asset_type, asset_dict in self.assets.items():
+            variables = self.variables[asset_type] = {}
+            for var_entry in asset_dict['variables']:
+                variables.setdefault(var_entry['name'], var_entry)
+
+    def __repr__(self) -> str:
+        return (
+            f'LangSpecIndex(assets: {len(self.assets)}, '
+            f'associations: {len(self.lang_spec["associations"])})'
+        )
+
+
+def get_lang_spec_index(lang_spec: dict | LangSpecIndex) -> LangSpecIndex:
+    """Return the index of a language specification, `lang_spec` itself
+    if it already is one"""
+    if isinstance(lang_spec, LangSpecIndex):
+        return lang_spec
+    return LangSpecIndex(lang_spec)
+
+
+def get_attacks_for_asset_type(
+    asset_type: str, lang_spec: dict | LangSpecIndex | None
+) -> dict[str, dict]:
     """Get all Attack Steps for a specific asset type.
 
     Arguments:
@@ -24,12 +73,8 @@ def get_attacks_for_asset_type(asset_type: str, lang_spec) -> dict[str, dict]:
 
     """
     attack_steps: dict = {}
-    try:
-        asset = next(
-            asset for asset in lang_spec['assets']
-                if asset['name'] == asset_type
-        )
-    except StopIteration:
+    asset = _get_asset_dict(asset_type, lang_spec)
+    if asset is None:
         logger.error(
             'Failed to find asset type %s when looking'
             'for attack steps.', asset_type
@@ -46,7 +91,9 @@ def get_attacks_for_asset_type(asset_type: str, lang_spec) -> dict[str, dict]:
     return attack_steps
 
 
-def get_associations_for_asset_type(asset_type: str, lang_spec) -> list[dict]:
+def get_associations_for_asset_type(
+    asset_type: str, lang_spec: dict | LangSpecIndex | None
+) -> list[dict]:
     """Get all associations for a specific asset type.
 
     Arguments:
@@ -67,8 +114,8 @@ def get_associations_for_asset_type(asset_type: str, lang_spec) -> list[dict]:
     )
     associations: list = []
 
-    asset = next((asset for asset in lang_spec['assets']
-        if asset['name'] == asset_type), None)
+    lang_spec = _require_lang_spec(lang_spec)
+    asset = _get_asset_dict(asset_type, lang_spec)
     if not asset:
         logger.error(
             'Failed to find asset type %s when '
@@ -76,6 +123,9 @@ def get_associations_for_asset_type(asset_type: str, lang_spec) -> list[dict]:
         )
         return associations
 
+    if isinstance(lang_spec, LangSpecIndex):
+        return list(lang_spec.associations.get(asset_type, ()))
+
     assoc_iter = (assoc for assoc in lang_spec['associations']
         if assoc['leftAsset'] == asset_type or
             assoc['rightAsset'] == asset_type)
@@ -87,7 +137,9 @@ def get_associations_for_asset_type(asset_type: str, lang_spec) -> list[dict]:
     return associations
 
 
-def get_variables_for_asset_type(asset_type: str, lang_spec) -> list[dict]:
+def get_variables_for_asset_type(
+    asset_type: str, lang_spec: dict | LangSpecIndex | None
+) -> list[dict]:
     """Get variables for a specific asset type.
     Note: Variables are the ones specified in MAL through `let` statements
 
@@ -102,8 +154,7 @@ def get_variables_for_asset_type(asset_type: str, lang_spec) -> list[dict]:
     belonging to the asset.
 
     """
-    asset_dict = next((asset for asset in lang_spec['assets']
-        if asset['name'] == asset_type), None)
+    asset_dict = _get_asset_dict(asset_type, lang_spec)
     if not asset_dict:
         msg = 'Failed to find asset type %s in language specification '\
             'when looking for variables.'
@@ -113,7 +164,9 @@ def get_variables_for_asset_type(asset_type: str, lang_spec) -> list[dict]:
     return asset_dict['variables']
 
 
-def get_var_expr_for_asset(asset_type: str, var_name: str, lang_spec) -> dict:
+def get_var_expr_for_asset(
+    asset_type: str, var_name: str, lang_spec: dict | LangSpecIndex | None
+) -> dict:
     """Get a variable for a specific asset type by variable name.
 
     Arguments:
@@ -129,8 +182,12 @@ def get_var_expr_for_asset(asset_type: str, var_name: str, lang_spec) -> dict:
     """
     vars_dict = get_variables_for_asset_type(asset_type, lang_spec)
 
-    var_expr = next((var_entry['stepExpression'] for var_entry
-        in vars_dict if var_entry['name'] == var_name), None)
+    if isinstance(lang_spec, LangSpecIndex):
+        var_entry = lang_spec.variables[asset_type].get(var_name)
+        var_expr = var_entry['stepExpression'] if var_entry else None
+    else:
+        var_expr = next((var_entry['stepExpression'] for var_entry
+            in vars_dict if var_entry['name'] == var_name), None)
 
     if not var_expr:
         msg = 'Failed to find variable name "%s" in language '\
@@ -138,3 +195,23 @@ def get_var_expr_for_asset(asset_type: str, var_name: str, lang_spec) -> dict:
         logger.error(msg, var_name, asset_type)
         raise LanguageGraphException(msg % (var_name, asset_type))
     return var_expr
+
+
+def _require_lang_spec(
+    lang_spec: dict | LangSpecIndex | None
+) -> dict | LangSpecIndex:
+    if lang_spec is None:
+        msg = 'No language specification to look up assets in.'
+        logger.error(msg)
+        raise LanguageGraphException(msg)
+    return lang_spec
+
+
+def _get_asset_dict(
+    asset_type: str, lang_spec: dict | LangSpecIndex | None
+) -> dict | None:
+    lang_spec = _require_lang_spec(lang_spec)
+    if isinstance(lang_spec, LangSpecIndex):
+        return lang_spec.assets.get(asset_type)
+    return next((asset for asset in lang_spec['assets']
+        if asset['name'] == asset_type), None)
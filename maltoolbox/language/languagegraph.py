@@ -13,8 +13,9 @@ import zipfile
 from maltoolbox.exceptions import LanguageGraphAssociationError, LanguageGraphException, LanguageGraphSuperAssetNotFoundError
 from maltoolbox.file_utils import download_git_repo, load_dict_from_json_file, load_dict_from_yaml_file, save_dict_to_file
 from maltoolbox.language.compiler.mal_compiler import MalCompiler
-from maltoolbox.language.expression_chain import ExpressionsChain
-from maltoolbox.language.language_graph_builder import generate_graph
+from maltoolbox.language.expression_chain import ExpressionsChain, ExpressionsChainTable
+from maltoolbox.language.language_graph_cache import get_language_graph_cache_dir, load_cached_language_graph
+from maltoolbox.language.language_graph_builder import build_child_tables, generate_graph, intern_expr_chains, resolve_asset_inheritance
 from maltoolbox.language.language_graph_asset import LanguageGraphAsset
 from maltoolbox.language.language_graph_assoc import LanguageGraphAssociation, LanguageGraphAssociationField
 from maltoolbox.language.language_graph_attack_step import LanguageGraphAttackStep
@@ -30,6 +31,14 @@ class LanguageGraph:
 
         self.assets: dict[str, LanguageGraphAsset] = {}
         self.lang_spec = lang_spec
+        # Compiled expression chain traversal plans, see
+        # maltoolbox.attackgraph.traversal_plan
+        self._traversal_plans: dict[int, tuple] = {}
+        # Optimized expressions chains, see
+        # maltoolbox.language.expr_chain_optimizer
+        self._optimized_expr_chains: dict[int, tuple] = {}
+        # Interned expressions chains, built when first needed
+        self._expr_chains: ExpressionsChainTable | None = None
 
         if self.lang_spec is not None:
             self.metadata = {
@@ -38,6 +47,21 @@ class LanguageGraph:
             }
             self.assets = generate_graph(self.lang_spec)
 
+    def __getstate__(self) -> dict[str, Any]:
+        # Traversal plans are closures and can not be pickled, and the
+        # caches keyed by chain ids do not survive pickling
+        state = self.__dict__.copy()
+        state['_traversal_plans'] = {}
+        state['_optimized_expr_chains'] = {}
+        state['_expr_chains'] = None
+        return state
+
+    def __setstate__(self, state: dict[str, Any]) -> None:
+        state.setdefault('_traversal_plans', {})
+        state.setdefault('_optimized_expr_chains', {})
+        state.setdefault('_expr_chains', None)
+        self.__dict__.update(state)
+
     def __repr__(self) -> str:
         """String representation of a LanguageGraph"""
         return (
@@ -108,9 +132,19 @@ class LanguageGraph:
                 )
 
     @classmethod
-    def load_from_file(cls, filename: str) -> LanguageGraph:
-        """Create LanguageGraph from mal, mar, yaml or json"""
-        return load_language_graph_from_file(filename)
+    def load_from_file(
+        cls, filename: str, cache_dir: str | None = None
+    ) -> LanguageGraph:
+        """Create LanguageGraph from mal, mar, yaml or json
+
+        Arguments:
+        ---------
+        filename        - the language file to load
+        cache_dir       - language graph cache directory to use instead of
+                          the configured one, see
+                          maltoolbox.language.language_graph_cache
+        """
+        return load_language_graph_from_file(filename, cache_dir)
 
     def save_language_specification_to_json(self, filename: str) -> None:
         """Save a MAL language specification dictionary to a JSON file
@@ -283,6 +317,23 @@ class LanguageGraph:
         given in the constructor.
         """
         self.assets = generate_graph(self.lang_spec)
+        self._traversal_plans.clear()
+        self._optimized_expr_chains.clear()
+        self._expr_chains = None
+
+    def intern_expr_chain(
+        self, expr_chain: ExpressionsChain | None
+    ) -> ExpressionsChain | None:
+        """Return the expressions chain of the language graph that is
+        structurally equal to `expr_chain`, adding it if there is none.
+
+        The chains of the language graph are interned when it is built,
+        chains created afterwards should go through this method so they
+        share structure with them.
+        """
+        if self._expr_chains is None:
+            self._expr_chains = intern_expr_chains(self.assets)
+        return self._expr_chains.intern(expr_chain)
 
     def _to_dict(self) -> dict[str, Any]:
         return language_graph_to_dict(self)
@@ -427,11 +478,29 @@ def language_graph_from_dict(serialized_graph: dict) -> LanguageGraph:
                     if (chain := ExpressionsChain._from_dict(expr, lang_graph))
                 ]
 
+    lang_graph._expr_chains = intern_expr_chains(lang_graph.assets)
+    resolve_asset_inheritance(lang_graph.assets)
+    build_child_tables(lang_graph.assets)
     return lang_graph
 
 
-def load_language_graph_from_file(filename: str) -> LanguageGraph:
-    """Create LanguageGraph from mal, mar, yaml, json or git url"""
+def load_language_graph_from_file(
+    filename: str, cache_dir: str | None = None
+) -> LanguageGraph:
+    """Create LanguageGraph from mal, mar, yaml, json or git url
+
+    Language graphs loaded from local files are read from and stored in
+    the language graph cache if one is given or configured.
+    """
+    cache_dir = cache_dir or get_language_graph_cache_dir()
+    if cache_dir and not filename.endswith('.git'):
+        return load_cached_language_graph(
+            filename, _load_language_graph_from_file, cache_dir
+        )
+    return _load_language_graph_from_file(filename)
+
+
+def _load_language_graph_from_file(filename: str) -> LanguageGraph:
     lang_graph = None
     if filename.endswith('.mal'):
         lang_graph = language_graph_from_mal_spec(filename)
@@ -443,6 +512,9 @@ def load_language_graph_from_file(filename: str) -> LanguageGraph:
         lang_graph = language_graph_from_dict(load_dict_from_json_file(filename))
     elif filename.endswith('.git'):
         lang_graph = language_graph_from_git_url(filename)
+    elif zipfile.is_zipfile(filename):
+        # MAL archives with another extension
+        lang_graph = language_graph_from_mar_archive(filename)
     else:
         raise TypeError(
             "Unknown file extension, expected json/mal/mar/yml/yaml"
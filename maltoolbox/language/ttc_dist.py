@@ -0,0 +1,156 @@
+"""Immutable shared ttc distributions
+
+The ttc distribution of an attack step is a small nested dict, for example
+`{'type': 'function', 'name': 'Bernoulli', 'arguments': [0.5]}`. Every
+attack graph node of the step uses the distribution of the language unless
+the model overrides it, so the same distributions occur many times.
+
+`freeze_ttc_dist` turns a distribution into a read-only `FrozenTTCDist`
+and interns it, equal distributions give the same object. Frozen
+distributions are still dicts and lists and compare equal to the plain
+distribution they were made from, but copying them returns them as they
+are. Equal numbers of different types, such as 1 and 1.0, are interned
+apart so that thawed distributions keep their types, but their frozen
+distributions are equal and hash the same. `thaw_ttc_dist` returns a
+plain, writable copy for serialization.
+"""
+
+from __future__ import annotations
+
+import weakref
+from typing import Any, NoReturn, Optional
+
+
+def _read_only(self, *args, **kwargs) -> NoReturn:
+    raise TypeError(
+        'ttc distributions are shared and can not be changed, '
+        'assign a new distribution instead'
+    )
+
+
+class FrozenTTCList(list):
+    """Read-only list in a frozen ttc distribution"""
+
+    __slots__ = ()
+
+    __setitem__ = __delitem__ = __iadd__ = __imul__ = _read_only
+    append = extend = insert = remove = pop = clear = _read_only
+    sort = reverse = _read_only
+
+    def __hash__(self) -> int:  # type: ignore[override]
+        return hash(_get_hash_key(self))
+
+    def __copy__(self) -> FrozenTTCList:
+        return self
+
+    def __deepcopy__(self, memo) -> FrozenTTCList:
+        return self
+
+    def __reduce__(self):
+        return (_freeze, (list(self),))
+
+
+class FrozenTTCDist(dict):
+    """Read-only ttc distribution, see `freeze_ttc_dist`"""
+
+    __slots__ = ('_hash', '_key', '__weakref__')
+
+    _hash: int
+    _key: tuple
+
+    __setitem__ = __delitem__ = __ior__ = _read_only
+    clear = pop = popitem = setdefault = update = _read_only
+
+    def __hash__(self) -> int:  # type: ignore[override]
+        return self._hash
+
+    def __copy__(self) -> FrozenTTCDist:
+        return self
+
+    def __deepcopy__(self, memo) -> FrozenTTCDist:
+        return self
+
+    def __reduce__(self):
+        return (freeze_ttc_dist, (thaw_ttc_dist(self),))
+
+
+# Frozen distributions by structure, kept while they are in use
+_frozen_ttc_dists: weakref.WeakValueDictionary[Any, FrozenTTCDist] = (
+    weakref.WeakValueDictionary()
+)
+
+
+def _get_key(value: Any) -> Any:
+    """Return a hashable key of a distribution or a part of it. Scalars
+    are keyed by type too, so that 1 and 1.0 are not merged."""
+    if isinstance(value, dict):
+        return (dict, tuple(
+            (name, _get_key(item)) for name, item in value.items()
+        ))
+    if isinstance(value, list):
+        return (list, tuple(_get_key(item) for item in value))
+    return (type(value), value)
+
+
+def _get_hash_key(value: Any) -> Any:
+    """Return a key of a distribution or a part of it that is equal for
+    equal distributions. Unlike the key of `_get_key`, it does not depend
+    on the order of dict items or on the types of numbers, whose hashes
+    agree when they are equal."""
+    if isinstance(value, dict):
+        return (dict, frozenset(
+            (name, _get_hash_key(item)) for name, item in value.items()
+        ))
+    if isinstance(value, list):
+        return (list, tuple(_get_hash_key(item) for item in value))
+    return value
+
+
+def _freeze(value: Any) -> Any:
+    if isinstance(value, dict):
+        return freeze_ttc_dist(value)
+    if isinstance(value, list):
+        return FrozenTTCList(_freeze(item) for item in value)
+    return value
+
+
+def freeze_ttc_dist(ttc_dist: Optional[dict]) -> Optional[FrozenTTCDist]:
+    """Return the shared read-only version of a ttc distribution.
+
+    Arguments:
+    ---------
+    ttc_dist        - a ttc distribution dict, it is not modified
+
+    Return:
+    ------
+    A `FrozenTTCDist` equal to `ttc_dist`, the same one for all equal
+    distributions, or None if `ttc_dist` is None.
+    """
+    if ttc_dist is None or isinstance(ttc_dist, FrozenTTCDist):
+        return ttc_dist
+
+    key = _get_key(ttc_dist)
+    frozen_dist = _frozen_ttc_dists.get(key)
+    if frozen_dist is None:
+        frozen_dist = FrozenTTCDist(
+            (name, _freeze(value)) for name, value in ttc_dist.items()
+        )
+        frozen_dist._key = key
+        frozen_dist._hash = hash(_get_hash_key(frozen_dist))
+        _frozen_ttc_dists[key] = frozen_dist
+    return frozen_dist
+
+
+def thaw_ttc_dist(ttc_dist: Optional[dict]) -> Optional[dict]:
+    """Return a plain, writable copy of a ttc distribution"""
+    if ttc_dist is None:
+        return None
+    return _thaw(ttc_dist)
+
+
+def _thaw(value: Any) -> Any:
+    if isinstance(value, dict):
+        return {name: _thaw(item) for name, item in value.items()}
+    if isinstance(value, list):
+        return [_thaw(item) for item in value]
+    return value
@@ -17,7 +17,9 @@ from .file_utils import (
 )
 from .language import LanguageGraph
 if TYPE_CHECKING:
-    from typing import Any
+    from typing import Any, Callable
+
+    ModelListener = Callable[..., None]
 
     from .language import LanguageGraphAsset, LanguageGraphAssociation
 
@@ -44,6 +46,59 @@ class Model:
         self._name_to_asset: dict[str, ModelAsset] = {}  # optimization
         self.lang_graph = lang_graph
         self.maltoolbox_version: str = mt_version
+        self._listeners: list[ModelListener] = []
+        # Closures of transitive expressions chains, see
+        # maltoolbox.attackgraph.transitive_closure
+        self._transitive_closures: dict[int, tuple] = {}
+
+    def __getstate__(self) -> dict[str, Any]:
+        # Listeners belong to the objects observing this instance
+        state = self.__dict__.copy()
+        state['_listeners'] = []
+        # Closure indices are keyed by chain ids, which are not preserved
+        state['_transitive_closures'] = {}
+        return state
+
+    def __setstate__(self, state: dict[str, Any]) -> None:
+        state.setdefault('_listeners', [])
+        state.setdefault('_transitive_closures', {})
+        self.__dict__.update(state)
+
+    def subscribe(self, listener: ModelListener) -> None:
+        """Call `listener` whenever the model changes.
+
+        The listener is called as `listener(event, asset, fieldname, assets)`
+        where `event` is one of:
+
+        asset_added                 - `asset` was added to the model
+        asset_removed               - `asset` was removed from the model,
+                                      after all of its associations
+        associated_assets_added     - `assets` were associated to `asset`
+                                      through `fieldname`
+        associated_assets_removing  - `assets` are about to be removed from
+                                      the `fieldname` of `asset`
+        associated_assets_removed   - `assets` were removed from the
+                                      `fieldname` of `asset`
+
+        `fieldname` and `assets` are None for the asset events.
+        """
+        self._listeners.append(listener)
+
+    def unsubscribe(self, listener: ModelListener) -> None:
+        """Stop calling a listener added with `subscribe`"""
+        self._listeners.remove(listener)
+
+    def _notify(
+            self,
+            event: str,
+            asset: ModelAsset,
+            fieldname: str | None = None,
+            assets: set[ModelAsset] | None = None
+        ) -> None:
+        # Any change can make the cached closures stale
+        self._transitive_closures.clear()
+        for listener in list(self._listeners):
+            listener(event, asset, fieldname, assets)
 
     def add_asset(
             self,
@@ -114,8 +169,10 @@ class Model:
         logger.debug(
             'Add "%s"(%d) to model "%s".', name, asset_id, self.name
         )
+        asset._model = self
         self.assets[asset_id] = asset
         self._name_to_asset[name] = asset
+        self._notify('asset_added', asset)
 
         return asset
 
@@ -146,6 +203,8 @@ class Model:
 
         del self.assets[asset.id]
         del self._name_to_asset[asset.name]
+        self._notify('asset_removed', asset)
+        asset._model = None
 
     def get_asset_by_id(
             self, asset_id: int
@@ -312,6 +371,31 @@ class Model:
 
 
 class ModelAsset:
+    """Asset part of a Model
+
+    The type of an asset is read from its language graph asset. The extras
+    dict and the attack step nodes list are only allocated when they are
+    first accessed.
+
+    Changes to the associations of an asset are reported to the listeners
+    of its model, see `Model.subscribe`. An asset that is not part of a
+    model reports nothing, so associating it with assets of a model is not
+    seen by that model or the attack graphs that follow it. Add the asset
+    to the model first.
+    """
+
+    __slots__ = (
+        '_associated_assets',
+        '_attack_step_nodes',
+        '_extras',
+        '_id',
+        '_model',
+        'defenses',
+        'lg_asset',
+        'name',
+        'type',
+    )
+
     def __init__(
         self,
         name: str,
@@ -324,11 +408,33 @@ class ModelAsset:
         self.name: str = name
         self._id: int = asset_id
         self.lg_asset: LanguageGraphAsset = lg_asset
-        self.type = self.lg_asset.name
+        self.type: str = lg_asset.name
         self.defenses: dict[str, float] = defenses or {}
-        self.extras: dict = extras or {}
+        self._extras: dict | None = extras or None
         self._associated_assets: dict[str, set[ModelAsset]] = {}
-        self.attack_step_nodes: list = []
+        self._attack_step_nodes: list | None = None
+        # The model this asset was added to, if any
+        self._model: Model | None = None
+
+    @property
+    def extras(self) -> dict:
+        if self._extras is None:
+            self._extras = {}
+        return self._extras
+
+    @extras.setter
+    def extras(self, extras: dict) -> None:
+        self._extras = extras
+
+    @property
+    def attack_step_nodes(self) -> list:
+        if self._attack_step_nodes is None:
+            self._attack_step_nodes = []
+        return self._attack_step_nodes
+
+    @attack_step_nodes.setter
+    def attack_step_nodes(self, attack_step_nodes: list) -> None:
+        self._attack_step_nodes = attack_step_nodes
 
     def _to_dict(self) -> dict[int, dict[str, Any]]:
         """Get dictionary representation of the asset."""
@@ -353,9 +459,9 @@ class ModelAsset:
             # Do not include an empty defenses dictionary
             del asset_dict['defenses']
 
-        if self.extras != {}:
+        if self._extras:
             # Add optional metadata to dict
-            asset_dict['extras'] = self.extras
+            asset_dict['extras'] = self._extras
 
         return {self.id: asset_dict}
 
@@ -477,15 +583,27 @@ class ModelAsset:
                 other_fieldname, set()
             ).add(self)
 
+        if self._model is not None:
+            self._model._notify(
+                'associated_assets_added', self, fieldname, set(assets)
+            )
+
     def remove_associated_assets(
             self, fieldname: str, assets: set[ModelAsset]):
         """Remove the assets provided as a parameter from the set of
         associated assets dictionary entry corresponding to the fieldname
         parameter.
         """
-        # Remove this asset from its associated assets' dictionaries
         lg_assoc = self.lg_asset.associations[fieldname]
         other_fieldname = lg_assoc.get_opposite_fieldname(fieldname)
+        # `assets` may be the associated assets set that is emptied below
+        removed_assets = set(assets)
+        if self._model is not None:
+            self._model._notify(
+                'associated_assets_removing', self, fieldname, removed_assets
+            )
+
+        # Remove this asset from its associated assets' dictionaries
         for asset in assets:
             asset._associated_assets[other_fieldname].remove(self)
             if len(asset._associated_assets[other_fieldname]) == 0:
@@ -496,10 +614,20 @@ class ModelAsset:
         if len(self._associated_assets[fieldname]) == 0:
             del self._associated_assets[fieldname]
 
+        if self._model is not None:
+            self._model._notify(
+                'associated_assets_removed', self, fieldname, removed_assets
+            )
+
     @property
     def associated_assets(self):
         return self._associated_assets
 
+    @property
+    def model(self) -> Model | None:
+        """The model the asset belongs to, None if it is not in one"""
+        return self._model
+
     @property
     def id(self):
         return self._id
@@ -8,6 +8,11 @@ import pytest
 from conftest import path_testdata
 
 from maltoolbox.attackgraph import AttackGraph, AttackGraphNode, create_attack_graph
+from maltoolbox.attackgraph.generate import (
+    NodeIndex,
+    create_nodes_from_model,
+    link_nodes_by_language,
+)
 from maltoolbox.language import LanguageGraph
 from maltoolbox.language.compiler import MalCompiler
 from maltoolbox.language.language_graph_lookup import get_attacks_for_asset_type
@@ -789,4 +794,412 @@ def test_model_pickle(example_model: Model):
     with open(pickle_path, "rb") as f:
         unpickled_model: Model = pickle.load(f)
 
-    assert example_model.to_dict() == unpickled_model.to_dict()
\ No newline at end of file
+    assert example_model.to_dict() == unpickled_model.to_dict()
+
+def test_attackgraph_node_read_through(example_attackgraph: AttackGraph):
+    """Nodes read their fields from the language and allocate lazily"""
+    node = example_attackgraph.nodes[0]
+    assert not hasattr(node, '__dict__')
+    assert not hasattr(node.model_asset, '__dict__')
+
+    lg_attack_step = node.lg_attack_step
+    assert node.name == lg_attack_step.name
+    assert node.type == lg_attack_step.type
+    assert node.causal_mode == lg_attack_step.causal_mode
+    assert node.tags is lg_attack_step.tags
+    assert node.model_asset
+    assert node.model_asset.type == node.model_asset.lg_asset.name
+
+    assert node._extras is None and node._detectors is None
+    assert 'extras' not in node.to_dict()
+    assert node._extras is None
+    node.extras['reward'] = 1
+    assert node.to_dict()['extras'] == {'reward': 1}
+
+    # Overridden ttcs shadow the language ttc
+    node.ttc = {'type': 'function', 'name': 'Enabled', 'arguments': []}
+    assert node.ttc != lg_attack_step.ttc
+    node.ttc = None
+    assert node.ttc == lg_attack_step.ttc
+
+
+def test_attackgraph_expr_chain_cache(corelang_lang_graph):
+    """Make sure the expression chain cache is used during generation
+    and that it does not change the resulting graph"""
+    model = Model.load_from_file(
+        path_testdata('simple_example_model.yml'), corelang_lang_graph
+    )
+    attack_graph = AttackGraph(corelang_lang_graph, model)
+    cache = attack_graph.expr_chain_cache
+    assert cache.hits > 0
+    assert cache.misses > 0
+    # Results are dropped once generation is done
+    assert len(cache) == 0
+
+    # Link the graph again without a cache
+    _, _, _, full_name_to_node = create_nodes_from_model(model)
+    link_nodes_by_language(model, full_name_to_node)
+
+    for full_name, node in attack_graph.full_name_to_node.items():
+        uncached_node = full_name_to_node[full_name]
+        assert node.existence_status == uncached_node.existence_status
+        assert {c.full_name for c in node.children} == \
+            {c.full_name for c in uncached_node.children}
+        assert {p.full_name for p in node.parents} == \
+            {p.full_name for p in uncached_node.parents}
+
+
+def test_attackgraph_parallel_generation(corelang_lang_graph):
+    """Generating with worker processes gives the same graph as serial"""
+    model = Model.load_from_file(
+        path_testdata('simple_example_model.yml'), corelang_lang_graph
+    )
+    serial_ag = AttackGraph(corelang_lang_graph, model)
+    parallel_ag = AttackGraph(corelang_lang_graph, model, workers=2)
+
+    assert serial_ag._to_dict() == parallel_ag._to_dict()
+
+
+def test_attackgraph_matrix_generation(corelang_lang_graph):
+    """Linking with boolean matrices gives the same graph as per node"""
+    model = Model.load_from_file(
+        path_testdata('simple_example_model.yml'), corelang_lang_graph
+    )
+    ag = AttackGraph(corelang_lang_graph, model)
+    matrix_ag = AttackGraph(corelang_lang_graph, model, matrix=True)
+    assert ag._to_dict() == matrix_ag._to_dict()
+
+    # Intersections and differences are followed per asset
+    set_ops_lang_graph = LanguageGraph(MalCompiler().compile(
+        'tests/testdata/set_ops.mal'))
+    set_ops_model = Model('Test Model', set_ops_lang_graph)
+    set_ops_a1 = set_ops_model.add_asset('SO_A', 'SO_A 1')
+    set_ops_a2 = set_ops_model.add_asset('SO_A', 'SO_A 2')
+    set_ops_b1 = set_ops_model.add_asset('SO_B', 'SO_B 1')
+    set_ops_b2 = set_ops_model.add_asset('SO_B', 'SO_B 2')
+    set_ops_b3 = set_ops_model.add_asset('SO_B', 'SO_B 3')
+    set_ops_a1.add_associated_assets('fieldB1', {set_ops_b1, set_ops_b2})
+    set_ops_a1.add_associated_assets('fieldB2', {set_ops_b2, set_ops_b3})
+    set_ops_a2.add_associated_assets('fieldB1', {set_ops_b3})
+    set_ops_a2.add_associated_assets('fieldB2', {set_ops_b1})
+    ag = AttackGraph(set_ops_lang_graph, set_ops_model)
+    matrix_ag = AttackGraph(set_ops_lang_graph, set_ops_model, matrix=True)
+    assert ag._to_dict() == matrix_ag._to_dict()
+
+    with pytest.raises(ValueError):
+        AttackGraph(corelang_lang_graph, model, workers=2, matrix=True)
+
+
+def _attack_graph_structure(attack_graph: AttackGraph) -> dict:
+    """Describe an attack graph by full names, independently of node ids"""
+    return {
+        node.full_name: (
+            sorted(child.full_name for child in node.children),
+            sorted(parent.full_name for parent in node.parents),
+            node.existence_status,
+            node.ttc,
+            sorted(
+                (label, sorted(
+                    (context_label, sorted(n.full_name for n in context_nodes))
+                    for context_label, context_nodes
+                    in detector.potential_context.items()
+                ))
+                for label, detector in node.detectors.items()
+            )
+        )
+        for node in attack_graph.nodes.values()
+    }
+
+
+def test_attackgraph_incremental(corelang_lang_graph):
+    """An incrementally maintained attack graph matches a graph generated
+    from scratch after each change to the model"""
+    model = Model.load_from_file(
+        path_testdata('simple_example_model.yml'), corelang_lang_graph
+    )
+    attack_graph = AttackGraph(corelang_lang_graph, model, incremental=True)
+
+    def assert_matches_regenerated():
+        fresh_attack_graph = AttackGraph(corelang_lang_graph, model)
+        assert _attack_graph_structure(attack_graph) == \
+            _attack_graph_structure(fresh_attack_graph)
+        assert len(attack_graph.detectors) == \
+            len(fresh_attack_graph.detectors)
+        assert len(attack_graph.attack_steps) == \
+            len(fresh_attack_graph.attack_steps)
+        assert len(attack_graph.defense_steps) == \
+            len(fresh_attack_graph.defense_steps)
+
+    os_app = model.get_asset_by_name('OS App')
+    program_2 = model.get_asset_by_name('Program 2')
+    data = model.get_asset_by_name('Data:5')
+    assert os_app and program_2 and data
+
+    new_app = model.add_asset('Application', 'New App')
+    assert_matches_regenerated()
+
+    new_app.add_associated_assets('hostApp', {os_app})
+    assert_matches_regenerated()
+
+    new_vuln = model.add_asset('SoftwareVulnerability', 'New Vuln')
+    new_vuln.add_associated_assets('application', {new_app})
+    assert_matches_regenerated()
+
+    program_2.remove_associated_assets('containedData', {data})
+    new_app.add_associated_assets('containedData', {data})
+    assert_matches_regenerated()
+
+    model.remove_asset(program_2)
+    assert_matches_regenerated()
+
+    model.remove_asset(new_app)
+    assert_matches_regenerated()
+
+    # Unsubscribed graphs are left untouched
+    model.unsubscribe(attack_graph._on_model_change)
+    model.add_asset('Application', 'Ignored App')
+    assert 'Ignored App:attemptRead' not in attack_graph.full_name_to_node
+
+
+def test_attackgraph_compact(corelang_lang_graph):
+    """Compacting keeps the edges of the graph and allows editing it"""
+    model = Model.load_from_file(
+        path_testdata('simple_example_model.yml'), corelang_lang_graph
+    )
+    attack_graph = AttackGraph(corelang_lang_graph, model)
+    expected = attack_graph._to_dict()
+
+    csr = attack_graph.compact()
+    assert attack_graph.csr is csr
+    assert len(csr) == len(attack_graph.nodes)
+    assert len(csr.child_indices) == len(csr.parent_indices) == sum(
+        len(node.children) for node in attack_graph.nodes.values()
+    )
+    assert attack_graph._to_dict() == expected
+
+    node = attack_graph.get_node_by_full_name('OS App:fullAccess')
+    child = next(iter(node.children))
+    assert child in node.children
+    assert node in child.parents
+    assert node not in node.children
+    assert set(node.children) == node.children
+
+    # Views turn into sets when modified
+    node.children.remove(child)
+    child.parents.remove(node)
+    assert child not in node.children
+    assert node not in child.parents
+
+    # Reachability on the arrays agrees with following the nodes
+    index = csr.index_of(node)
+    assert index is not None
+    reached = csr.reachable((index,))
+    expected_reached = {node}
+    stack = [node]
+    while stack:
+        for reached_child in stack.pop().children:
+            if reached_child not in expected_reached:
+                expected_reached.add(reached_child)
+                stack.append(reached_child)
+    # The removed edge is still part of the arrays
+    assert {csr.nodes[i] for i, r in enumerate(reached) if r} >= \
+        expected_reached
+
+    copied_graph = copy.deepcopy(attack_graph)
+    assert copied_graph._to_dict() == attack_graph._to_dict()
+    pickled_graph = pickle.loads(pickle.dumps(attack_graph))
+    assert pickled_graph._to_dict() == attack_graph._to_dict()
+
+    attack_graph.remove_node(child)
+    assert attack_graph.csr is None
+
+
+def test_attackgraph_compact_lazy(corelang_lang_graph):
+    """Compacting a lazy graph covers all of its nodes"""
+    model = Model.load_from_file(
+        path_testdata('simple_example_model.yml'), corelang_lang_graph
+    )
+    eager_graph = AttackGraph(corelang_lang_graph, model)
+    lazy_graph = AttackGraph(corelang_lang_graph, model, lazy=True)
+    lazy_graph.get_node_by_full_name('OS App:fullAccess')
+
+    csr = lazy_graph.compact()
+    assert len(csr) == len(eager_graph.nodes)
+    assert lazy_graph._to_dict() == eager_graph._to_dict()
+
+
+def test_attackgraph_lazy(corelang_lang_graph):
+    """A lazy attack graph only creates the nodes that are visited and
+    they match the nodes of an eagerly generated graph"""
+    model = Model.load_from_file(
+        path_testdata('simple_example_model.yml'), corelang_lang_graph
+    )
+    eager_graph = AttackGraph(corelang_lang_graph, model)
+    lazy_graph = AttackGraph(corelang_lang_graph, model, lazy=True)
+    assert lazy_graph.lazy
+    assert len(lazy_graph.nodes) == 0
+    assert lazy_graph.next_node_id == eager_graph.next_node_id
+
+    entry_point = lazy_graph.get_node_by_full_name('OS App:fullAccess')
+    assert len(lazy_graph.nodes) == 1
+    eager_entry_point = eager_graph.get_node_by_full_name('OS App:fullAccess')
+    assert entry_point.id == eager_entry_point.id
+
+    # Visiting the children creates them, but not their own children
+    assert {c.full_name for c in entry_point.children} == \
+        {c.full_name for c in eager_entry_point.children}
+    assert len(lazy_graph.nodes) == 1 + len(entry_point.children)
+    assert len(lazy_graph.nodes) < len(eager_graph.nodes)
+
+    # Membership tests do not create nodes
+    num_nodes = len(lazy_graph.nodes)
+    assert all(node_id in lazy_graph.nodes for node_id in eager_graph.nodes)
+    assert all(
+        full_name in lazy_graph.full_name_to_node
+        for full_name in eager_graph.full_name_to_node
+    )
+    assert len(lazy_graph.nodes) == num_nodes
+
+    # Every node can be looked up by id and has the same edges
+    for node_id, eager_node in eager_graph.nodes.items():
+        assert node_id in lazy_graph.nodes
+        lazy_node = lazy_graph.nodes[node_id]
+        assert lazy_node.full_name == eager_node.full_name
+        assert lazy_node.existence_status == eager_node.existence_status
+        assert lazy_node.ttc == eager_node.ttc
+        assert {c.full_name for c in lazy_node.children} == \
+            {c.full_name for c in eager_node.children}
+        assert {p.full_name for p in lazy_node.parents} == \
+            {p.full_name for p in eager_node.parents}
+    assert len(lazy_graph.nodes) == len(eager_graph.nodes)
+    assert len(lazy_graph.detectors) == len(eager_graph.detectors)
+
+    assert lazy_graph.nodes.get(len(eager_graph.nodes)) is None
+    assert 'OS App:noSuchStep' not in lazy_graph.full_name_to_node
+
+    # Removed nodes are not created again
+    lazy_graph.remove_node(entry_point)
+    assert entry_point.id not in lazy_graph.nodes
+    for eager_child in eager_entry_point.children:
+        assert entry_point not in lazy_graph.nodes[eager_child.id].parents
+
+
+def test_attackgraph_lazy_save_and_deepcopy(corelang_lang_graph, tmp_path):
+    """Saving or copying a lazy attack graph creates all of its nodes
+    first, the result is the same as for the eager graph"""
+    model = Model.load_from_file(
+        path_testdata('simple_example_model.yml'), corelang_lang_graph
+    )
+    eager_graph = AttackGraph(corelang_lang_graph, model)
+
+    lazy_graph = AttackGraph(corelang_lang_graph, model, lazy=True)
+    lazy_graph.get_node_by_full_name('OS App:fullAccess')
+    filename = str(tmp_path / 'lazy_attackgraph.json')
+    lazy_graph.save_to_file(filename)
+    loaded_graph = AttackGraph.load_from_file(
+        filename, corelang_lang_graph, model
+    )
+    assert loaded_graph._to_dict() == eager_graph._to_dict()
+
+    lazy_graph = AttackGraph(corelang_lang_graph, model, lazy=True)
+    lazy_graph.get_node_by_full_name('OS App:fullAccess')
+    copied_graph = copy.deepcopy(lazy_graph)
+    assert copied_graph._to_dict() == eager_graph._to_dict()
+
+
+def test_attackgraph_forward_slice(corelang_lang_graph):
+    """Only the nodes reachable from the entry points are generated"""
+    model = Model.load_from_file(
+        path_testdata('simple_example_model.yml'), corelang_lang_graph
+    )
+    full_graph = AttackGraph(corelang_lang_graph, model)
+    entry_points = [
+        'OS App:networkConnectUninspected', 'User:12:socialEngineering'
+    ]
+    sliced_graph = AttackGraph(
+        corelang_lang_graph, model, entry_points=entry_points
+    )
+
+    reachable = set()
+    stack = [full_graph.get_node_by_full_name(name) for name in entry_points]
+    while stack:
+        node = stack.pop()
+        if node.id not in reachable:
+            reachable.add(node.id)
+            stack.extend(node.children)
+
+    assert set(sliced_graph.nodes) == reachable
+    assert len(sliced_graph.nodes) < len(full_graph.nodes)
+    for node_id, node in sliced_graph.nodes.items():
+        full_node = full_graph.nodes[node_id]
+        assert node.full_name == full_node.full_name
+        assert node.existence_status == full_node.existence_status
+        assert {c.id for c in node.children} == \
+            {c.id for c in full_node.children}
+        assert {p.id for p in node.parents} == \
+            {p.id for p in full_node.parents} & reachable
+    assert [n.id for n in sliced_graph.attack_steps] == [
+        n.id for n in full_graph.attack_steps if n.id in reachable
+    ]
+
+    # Regenerating keeps the slice
+    sliced_graph.regenerate_graph()
+    assert set(sliced_graph.nodes) == reachable
+
+    with pytest.raises(LookupError):
+        AttackGraph(
+            corelang_lang_graph, model, entry_points=['OS App:noSuchStep']
+        )
+
+
+def test_attackgraph_backward_slice(corelang_lang_graph):
+    """Only the targets and their ancestors are generated"""
+    model = Model.load_from_file(
+        path_testdata('simple_example_model.yml'), corelang_lang_graph
+    )
+    full_graph = AttackGraph(corelang_lang_graph, model)
+    targets = ['Data:5:read', 'Program 2:fullAccess']
+    sliced_graph = AttackGraph(corelang_lang_graph, model, targets=targets)
+
+    ancestors = set()
+    stack = [full_graph.get_node_by_full_name(name) for name in targets]
+    while stack:
+        node = stack.pop()
+        if node.id not in ancestors:
+            ancestors.add(node.id)
+            stack.extend(node.parents)
+
+    assert set(sliced_graph.nodes) == ancestors
+    assert len(sliced_graph.nodes) < len(full_graph.nodes)
+    for node_id, node in sliced_graph.nodes.items():
+        full_node = full_graph.nodes[node_id]
+        assert node.full_name == full_node.full_name
+        assert {p.id for p in node.parents} == \
+            {p.id for p in full_node.parents}
+        assert {c.id for c in node.children} == \
+            {c.id for c in full_node.children} & ancestors
+
+    with pytest.raises(ValueError):
+        AttackGraph(
+            corelang_lang_graph, model,
+            entry_points=['OS App:fullAccess'], targets=targets
+        )
+
+
+def test_attackgraph_node_index(example_attackgraph: AttackGraph):
+    """Nodes can be looked up by asset id and attack step name"""
+    node_index = NodeIndex(example_attackgraph.nodes.values())
+    assert len(node_index) == len(example_attackgraph.nodes)
+    for node in example_attackgraph.nodes.values():
+        assert node.model_asset
+        assert node_index.get(node.model_asset.id, node.name) is node
+
+    node = example_attackgraph.get_node_by_full_name(
+        'Application 1:fullAccess'
+    )
+    assert node.model_asset
+    assert node_index.get(node.model_asset.id, 'noSuchStep') is None
+    assert node_index.get(-1, 'fullAccess') is None
+    node_index.remove(node)
+    assert node_index.get(node.model_asset.id, node.name) is None
+    assert len(node_index) == len(example_attackgraph.nodes) - 1
@@ -0,0 +1,201 @@
+"""Unit tests for the reachability analyzer"""
+
+import pytest
+from conftest import path_testdata
+
+from maltoolbox.attackgraph import AttackGraph, AttackGraphNode
+from maltoolbox.attackgraph.analyzers import (
+    ReachabilityAnalyzer,
+    get_compromisable_nodes,
+)
+from maltoolbox.attackgraph.analyzers.reachability import is_enabled_defense
+from maltoolbox.language import LanguageGraph
+from maltoolbox.model import Model
+
+
+def _link(parent, child):
+    parent.children.add(child)
+    child.parents.add(parent)
+
+
+def _naive_compromisable(attack_graph, entry_points):
+    """Compromisable nodes by iterating the rules to a fixpoint"""
+    def allows(node):
+        if node.type == 'defense':
+            return not is_enabled_defense(node)
+        if node.type == 'exist':
+            return bool(node.existence_status)
+        return node.existence_status is False
+
+    compromised = set(entry_points)
+    changed = True
+    while changed:
+        changed = False
+        for node in attack_graph.nodes.values():
+            if node in compromised or node.type not in ('or', 'and'):
+                continue
+            steps = [p for p in node.parents if p.type in ('or', 'and')]
+            if node.type == 'or':
+                reached = any(p in compromised for p in steps)
+            else:
+                reached = bool(steps) and all(
+                    p in compromised for p in steps
+                ) and all(
+                    allows(p) for p in node.parents
+                    if p.type not in ('or', 'and')
+                )
+            if reached:
+                compromised.add(node)
+                changed = True
+    return compromised
+
+
+def _dummy_graph(lang_graph: LanguageGraph):
+    """Entry -> or1 -> and1 <- or2 <- entry, and1 is also protected by a
+    defense and requires an existing asset"""
+    attack_steps = lang_graph.assets['DummyAsset'].attack_steps
+    attack_graph = AttackGraph(lang_graph)
+
+    def add(step_name, full_name, **kwargs):
+        return attack_graph.add_node(
+            attack_steps[step_name], full_name=full_name, **kwargs
+        )
+
+    nodes = {
+        'entry': add('DummyOrAttackStep', 'entry'),
+        'or1': add('DummyOrAttackStep', 'or1'),
+        'or2': add('DummyOrAttackStep', 'or2'),
+        'and1': add('DummyAndAttackStep', 'and1'),
+        'and2': add('DummyAndAttackStep', 'and2'),
+        'after': add('DummyOrAttackStep', 'after'),
+        'defense': add('DummyDefenseAttackStep', 'defense'),
+        'exist': add('DummyExistAttackStep', 'exist', existence_status=True),
+        'unreached': add('DummyOrAttackStep', 'unreached'),
+    }
+    _link(nodes['entry'], nodes['or1'])
+    _link(nodes['entry'], nodes['or2'])
+    _link(nodes['or1'], nodes['and1'])
+    _link(nodes['or2'], nodes['and1'])
+    _link(nodes['defense'], nodes['and1'])
+    _link(nodes['exist'], nodes['and1'])
+    _link(nodes['and1'], nodes['after'])
+    # and2 waits for a step that is never reached
+    _link(nodes['or1'], nodes['and2'])
+    _link(nodes['unreached'], nodes['and2'])
+    return attack_graph, nodes
+
+
+def test_reachability_and_or(dummy_lang_graph: LanguageGraph):
+    attack_graph, nodes = _dummy_graph(dummy_lang_graph)
+    analyzer = ReachabilityAnalyzer(attack_graph)
+
+    names = {
+        node.full_name
+        for node in analyzer.compromisable_nodes([nodes['entry']])
+    }
+    assert names == {'entry', 'or1', 'or2', 'and1', 'after'}
+
+    names = {
+        node.full_name for node in analyzer.compromisable_nodes(
+            [nodes['entry']], enabled_defenses=[nodes['defense']]
+        )
+    }
+    assert names == {'entry', 'or1', 'or2'}
+
+    names = {
+        node.full_name for node in analyzer.compromisable_nodes(
+            [nodes['entry']], existence_status={nodes['exist']: False}
+        )
+    }
+    assert names == {'entry', 'or1', 'or2'}
+
+    # Defenses enabled by their ttc stop the attacker by default
+    nodes['defense'].ttc = {
+        'type': 'function', 'name': 'Bernoulli', 'arguments': [1.0]
+    }
+    assert nodes['and1'] not in analyzer.compromisable_nodes(
+        [nodes['entry']]
+    )
+
+    # Entry points must be attack steps of the graph
+    outside_node = AttackGraphNode(
+        1000, nodes['entry'].lg_attack_step, full_name='outside'
+    )
+    with pytest.raises(ValueError):
+        analyzer.compromisable([outside_node])
+    with pytest.raises(ValueError):
+        analyzer.compromisable([nodes['defense']])
+
+
+def test_reachability_compact_graph(corelang_lang_graph: LanguageGraph):
+    """The analyzer uses the CSR adjacency of compact graphs, results do
+    not depend on it"""
+    model = Model.load_from_file(
+        path_testdata('simple_example_model.yml'), corelang_lang_graph
+    )
+    attack_graph = AttackGraph(corelang_lang_graph, model)
+    entry_points = [
+        node for node in attack_graph.nodes.values()
+        if node.name == 'networkAccess'
+    ]
+    compromised = get_compromisable_nodes(attack_graph, entry_points)
+    assert set(entry_points) < compromised
+    assert all(node.type in ('or', 'and') for node in compromised)
+
+    csr = attack_graph.compact()
+    analyzer = ReachabilityAnalyzer(attack_graph)
+    assert analyzer.csr is csr
+    assert analyzer.compromisable_nodes(entry_points) == compromised
+
+
+def test_reachability_lazy_graph(corelang_lang_graph: LanguageGraph):
+    """Lazy graphs are materialized before their adjacency is built"""
+    model = Model.load_from_file(
+        path_testdata('simple_example_model.yml'), corelang_lang_graph
+    )
+    eager_graph = AttackGraph(corelang_lang_graph, model)
+    lazy_graph = AttackGraph(corelang_lang_graph, model, lazy=True)
+    entry_point = 'OS App:fullAccess'
+
+    compromised = get_compromisable_nodes(
+        lazy_graph, [lazy_graph.get_node_by_full_name(entry_point)]
+    )
+    expected = get_compromisable_nodes(
+        eager_graph, [eager_graph.get_node_by_full_name(entry_point)]
+    )
+    assert {node.full_name for node in compromised} == \
+        {node.full_name for node in expected}
+
+
+def test_reachability_after_changes(corelang_lang_graph: LanguageGraph):
+    """Changes to the edges of a compacted graph are not missed"""
+    model = Model.load_from_file(
+        path_testdata('simple_example_model.yml'), corelang_lang_graph
+    )
+    attack_graph = AttackGraph(corelang_lang_graph, model, incremental=True)
+    attack_graph.compact()
+
+    def assert_matches_fixpoint(entry_point):
+        entry_points = [attack_graph.get_node_by_full_name(entry_point)]
+        assert get_compromisable_nodes(attack_graph, entry_points) == \
+            _naive_compromisable(attack_graph, entry_points)
+
+    assert_matches_fixpoint('OS App:fullAccess')
+
+    # The model changes after compacting the graph
+    new_app = model.add_asset('Application', 'New App')
+    attack_graph.compact()
+    new_app.add_associated_assets(
+        'hostApp', {model.get_asset_by_name('OS App')}
+    )
+    assert attack_graph.csr is None
+    assert_matches_fixpoint('OS App:fullAccess')
+
+    # Edges are edited directly after compacting the graph
+    csr = attack_graph.compact()
+    node = attack_graph.get_node_by_full_name('OS App:fullAccess')
+    for child in list(node.children):
+        node.children.remove(child)
+        child.parents.remove(node)
+    assert csr.modified
+    assert_matches_fixpoint('OS App:fullAccess')
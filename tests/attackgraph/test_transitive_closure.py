@@ -0,0 +1,87 @@
+"""Unit tests for the transitive closure index"""
+
+from maltoolbox.attackgraph.transitive_closure import (
+    TransitiveClosureIndex,
+    follow_transitive_closure,
+)
+from maltoolbox.attackgraph.traversal_plan import compile_expr_chain
+from maltoolbox.language import ExpressionsChain, LanguageGraph
+from maltoolbox.language.expression_chain import ExprType
+from maltoolbox.model import Model
+
+
+def _executed_apps(lang_graph: LanguageGraph) -> ExpressionsChain:
+    return ExpressionsChain(
+        type=ExprType.TRANSITIVE,
+        sub_link=ExpressionsChain(
+            type=ExprType.FIELD,
+            fieldname='appExecutedApps',
+            association=lang_graph.assets['Application']
+                .associations['appExecutedApps']
+        )
+    )
+
+
+def _naive_closure(asset, successors):
+    closure = {asset}
+    new_assets = {asset}
+    while new_assets:
+        new_assets = {
+            successor for a in new_assets for successor in successors(a)
+        } - closure
+        closure |= new_assets
+    return closure
+
+
+def test_closure_index_components(corelang_lang_graph: LanguageGraph):
+    """Assets of a cycle share one closure"""
+    model = Model('Closure model', corelang_lang_graph)
+    apps = [model.add_asset('Application', f'App {i}') for i in range(6)]
+    # 0 -> 1 -> 2 -> 3 -> 1, 3 -> 4, 5 is on its own
+    edges = {0: {1}, 1: {2}, 2: {3}, 3: {1, 4}, 4: set(), 5: set()}
+
+    def successors(asset):
+        return {apps[i] for i in edges[apps.index(asset)]}
+
+    index = TransitiveClosureIndex(successors)
+    for app in apps:
+        assert index.closure(app) == _naive_closure(app, successors)
+    assert index.closure(apps[1]) is index.closure(apps[3])
+    # {0}, {1, 2, 3}, {4} and {5}
+    assert index.components == 4
+    assert index.follow({apps[4], apps[5]}) == {apps[4], apps[5]}
+
+
+def test_closure_index_invalidated(corelang_lang_graph: LanguageGraph):
+    """Closures are recomputed after the model changes"""
+    model = Model('Closure model', corelang_lang_graph)
+    app1 = model.add_asset('Application', 'App 1')
+    app2 = model.add_asset('Application', 'App 2')
+    app3 = model.add_asset('Application', 'App 3')
+    app1.add_associated_assets('appExecutedApps', {app2})
+
+    expr_chain = _executed_apps(corelang_lang_graph)
+    plan = compile_expr_chain(expr_chain)
+    assert plan((app1,)) == {app1, app2}
+    assert len(model._transitive_closures) == 1
+
+    app2.add_associated_assets('appExecutedApps', {app3})
+    assert not model._transitive_closures
+    assert plan((app1,)) == {app1, app2, app3}
+
+    app1.remove_associated_assets('appExecutedApps', {app2})
+    assert plan((app1,)) == {app1}
+
+
+def test_closure_without_model(corelang_lang_graph: LanguageGraph):
+    """Assets outside of a model are followed without a stored index"""
+    model = Model('Closure model', corelang_lang_graph)
+    app1 = model.add_asset('Application', 'App 1')
+    app2 = model.add_asset('Application', 'App 2')
+    app1.add_associated_assets('appExecutedApps', {app2})
+    model.remove_asset(app2)
+
+    expr_chain = _executed_apps(corelang_lang_graph)
+    assert follow_transitive_closure(
+        expr_chain, {app1, app2}, lambda asset: set()
+    ) == {app1, app2}
@@ -0,0 +1,217 @@
+"""Unit tests for compiled expression chain traversal plans"""
+
+from conftest import path_testdata
+
+from maltoolbox.attackgraph.generate import (
+    ExprChainCache,
+    exists_expr_chain,
+    follow_expr_chain,
+    generate_graph,
+    iter_expr_chain,
+)
+from maltoolbox.attackgraph.matrix import AssetIndex
+from maltoolbox.attackgraph.traversal_plan import (
+    compile_expr_chain,
+    get_traversal_plan,
+)
+from maltoolbox.language import ExpressionsChain, LanguageGraph
+from maltoolbox.language.expression_chain import ExprType
+from maltoolbox.model import Model
+
+
+def _all_expr_chains(lang_graph: LanguageGraph):
+    """Yield (lg_asset, expr_chain) for every chain in the language"""
+    for lg_asset in lang_graph.assets.values():
+        for lg_attack_step in lg_asset.attack_steps.values():
+            for expr_chains in lg_attack_step.children.values():
+                for expr_chain in expr_chains:
+                    yield lg_asset, expr_chain
+            for expr_chain in lg_attack_step.requires:
+                yield lg_asset, expr_chain
+
+
+def test_traversal_plan_matches_follow_expr_chain(
+        corelang_lang_graph: LanguageGraph
+    ):
+    """Plans must reach exactly the assets the interpreter reaches"""
+    model = Model.load_from_file(
+        path_testdata('simple_example_model.yml'), corelang_lang_graph
+    )
+    checked = 0
+    for lg_asset, expr_chain in _all_expr_chains(corelang_lang_graph):
+        plan = compile_expr_chain(expr_chain)
+        for asset in model.assets.values():
+            if not asset.lg_asset.is_subasset_of(lg_asset):
+                continue
+            assert plan((asset,)) == \
+                follow_expr_chain(model, {asset}, expr_chain)
+            checked += 1
+    assert checked > 0
+
+
+def test_follow_expr_chain_bitsets(corelang_lang_graph: LanguageGraph):
+    """Following chains with bitsets reaches the same assets, from single
+    assets and from all assets at once"""
+    model = Model.load_from_file(
+        path_testdata('simple_example_model.yml'), corelang_lang_graph
+    )
+    asset_index = AssetIndex(model.assets.values())
+    all_assets = set(model.assets.values())
+    for lg_asset, expr_chain in _all_expr_chains(corelang_lang_graph):
+        for asset in model.assets.values():
+            if not asset.lg_asset.is_subasset_of(lg_asset):
+                continue
+            assert follow_expr_chain(
+                model, {asset}, expr_chain, asset_index
+            ) == follow_expr_chain(model, {asset}, expr_chain)
+        assert follow_expr_chain(
+            model, all_assets, expr_chain, asset_index
+        ) == follow_expr_chain(model, all_assets, expr_chain)
+
+    cache = ExprChainCache(bitsets=True)
+    nodes, *_ = generate_graph(model, cache)
+    assert cache.misses > 0
+    expected_nodes, *_ = generate_graph(model)
+    assert {
+        (node.full_name, child.full_name)
+        for node in nodes.values() for child in node.children
+    } == {
+        (node.full_name, child.full_name)
+        for node in expected_nodes.values() for child in node.children
+    }
+
+
+def test_exists_expr_chain(corelang_lang_graph: LanguageGraph):
+    """The lazy evaluation reaches the same assets as the interpreter"""
+    model = Model.load_from_file(
+        path_testdata('simple_example_model.yml'), corelang_lang_graph
+    )
+    for lg_asset, expr_chain in _all_expr_chains(corelang_lang_graph):
+        for asset in model.assets.values():
+            if not asset.lg_asset.is_subasset_of(lg_asset):
+                continue
+            target_assets = follow_expr_chain(model, {asset}, expr_chain)
+            assert set(iter_expr_chain(model, {asset}, expr_chain)) == \
+                target_assets
+            assert exists_expr_chain(model, {asset}, expr_chain) == \
+                bool(target_assets)
+
+
+def test_exists_expr_chain_stops_early(corelang_lang_graph: LanguageGraph):
+    """Existence checks do not follow the chain past the first asset"""
+    lg = corelang_lang_graph
+    model = Model('Exists model', lg)
+    app = model.add_asset('Application', 'App')
+    apps = {model.add_asset('Application', f'App {i}') for i in range(10)}
+    app.add_associated_assets('appExecutedApps', apps)
+    for executed_app in apps:
+        executed_app.add_associated_assets(
+            'containedData', {model.add_asset('Data')}
+        )
+
+    visited = []
+
+    class CountingDict(dict):
+        def get(self, *args):
+            visited.append(args[0])
+            return super().get(*args)
+
+    for executed_app in apps:
+        executed_app._associated_assets = CountingDict(
+            executed_app.associated_assets
+        )
+
+    expr_chain = ExpressionsChain(
+        type=ExprType.COLLECT,
+        left_link=_field(lg, 'Application', 'appExecutedApps'),
+        right_link=_field(lg, 'Application', 'containedData')
+    )
+    assert exists_expr_chain(model, {app}, expr_chain)
+    assert visited == ['containedData']
+
+
+def test_traversal_plan_cached_per_language(
+        corelang_lang_graph: LanguageGraph
+    ):
+    """Plans are compiled once per chain and language graph"""
+    _, expr_chain = next(_all_expr_chains(corelang_lang_graph))
+    plan = get_traversal_plan(corelang_lang_graph, expr_chain)
+    assert get_traversal_plan(corelang_lang_graph, expr_chain) is plan
+
+    model = Model('Traversal plan model', corelang_lang_graph)
+    asset = model.add_asset('Application', 'Application 1')
+    assert get_traversal_plan(corelang_lang_graph, None)({asset}) == {asset}
+
+
+def _field(lang_graph: LanguageGraph, asset_type: str, fieldname: str):
+    return ExpressionsChain(
+        type=ExprType.FIELD,
+        fieldname=fieldname,
+        association=lang_graph.assets[asset_type].associations[fieldname]
+    )
+
+
+def test_collect_set_at_a_time(corelang_lang_graph: LanguageGraph):
+    """Collect follows distributive right links from all left hand targets
+    at once, and other right links from each of them"""
+    lg = corelang_lang_graph
+    model = Model('Collect model', lg)
+    app1 = model.add_asset('Application', 'App 1')
+    app2 = model.add_asset('Application', 'App 2')
+    app3 = model.add_asset('Application', 'App 3')
+    data1 = model.add_asset('Data', 'Data 1')
+    data2 = model.add_asset('Data', 'Data 2')
+    app1.add_associated_assets('appExecutedApps', {app2})
+    app2.add_associated_assets('appExecutedApps', {app3})
+    app1.add_associated_assets('containedData', {data1})
+    app2.add_associated_assets('containedData', {data2})
+    app3.add_associated_assets('containedData', {data1})
+
+    apps = _field(lg, 'Application', 'appExecutedApps')
+    data = _field(lg, 'Application', 'containedData')
+    all_apps = ExpressionsChain(type=ExprType.TRANSITIVE, sub_link=apps)
+    collect_data = ExpressionsChain(
+        type=ExprType.COLLECT, left_link=all_apps, right_link=data
+    )
+    assert follow_expr_chain(model, {app1}, collect_data) == {data1, data2}
+    assert compile_expr_chain(collect_data)((app1,)) == {data1, data2}
+
+    # No app shares data with the app it executes, intersecting over all
+    # apps at once would give both data assets
+    shared_data = ExpressionsChain(
+        type=ExprType.INTERSECTION,
+        left_link=data,
+        right_link=ExpressionsChain(
+            type=ExprType.COLLECT, left_link=apps, right_link=data
+        )
+    )
+    collect_shared_data = ExpressionsChain(
+        type=ExprType.COLLECT, left_link=all_apps, right_link=shared_data
+    )
+    assert follow_expr_chain(model, {app1}, collect_shared_data) == set()
+    assert compile_expr_chain(collect_shared_data)((app1,)) == set()
+
+
+def test_transitive_keeps_input(corelang_lang_graph: LanguageGraph):
+    """Following a transitive chain does not change the targets the other
+    side of a set operation is followed from"""
+    lg = corelang_lang_graph
+    model = Model('Transitive model', lg)
+    app1 = model.add_asset('Application', 'App 1')
+    app2 = model.add_asset('Application', 'App 2')
+    data = model.add_asset('Data', 'Data')
+    app1.add_associated_assets('appExecutedApps', {app2})
+    app2.add_associated_assets('containedData', {data})
+
+    expr_chain = ExpressionsChain(
+        type=ExprType.UNION,
+        left_link=ExpressionsChain(
+            type=ExprType.TRANSITIVE,
+            sub_link=_field(lg, 'Application', 'appExecutedApps')
+        ),
+        right_link=_field(lg, 'Application', 'containedData')
+    )
+    target_assets = {app1}
+    assert follow_expr_chain(model, target_assets, expr_chain) == {app1, app2}
+    assert target_assets == {app1}
+    assert compile_expr_chain(expr_chain)((app1,)) == {app1, app2}
@@ -0,0 +1,109 @@
+"""Unit tests for the ttc sampler"""
+
+import math
+import statistics
+
+import pytest
+
+from maltoolbox.attackgraph import AttackGraph
+from maltoolbox.attackgraph.ttc_sampling import (
+    PythonBackend,
+    TTCSampler,
+    compile_ttc_dist,
+)
+from maltoolbox.exceptions import AttackGraphException
+from maltoolbox.language import LanguageGraph
+from maltoolbox.language.compiler import MalCompiler
+from maltoolbox.model import Model
+
+
+def _prob_dists_graph(num_assets: int) -> AttackGraph:
+    lang_graph = LanguageGraph(
+        MalCompiler().compile('tests/testdata/prob_dists.mal')
+    )
+    model = Model('Sampling model', lang_graph)
+    for i in range(num_assets):
+        model.add_asset('Dummy', f'Dummy {i}')
+    return AttackGraph(lang_graph, model)
+
+
+def test_compile_ttc_dist():
+    exponential = {
+        'type': 'function', 'name': 'Exponential', 'arguments': [0.1]
+    }
+    assert compile_ttc_dist(exponential) is compile_ttc_dist(
+        dict(exponential)
+    )
+    assert compile_ttc_dist(None) is compile_ttc_dist({})
+
+    backend = PythonBackend(seed=1)
+    assert compile_ttc_dist(None)(backend, 3) == [0.0, 0.0, 0.0]
+    assert compile_ttc_dist(
+        {'type': 'function', 'name': 'Infinity', 'arguments': []}
+    )(backend, 2) == [math.inf, math.inf]
+    assert compile_ttc_dist({
+        'type': 'division',
+        'lhs': {'type': 'number', 'value': 1.0},
+        'rhs': {'type': 'number', 'value': 4.0},
+    })(backend, 1) == [0.25]
+
+    samples = compile_ttc_dist(exponential)(backend, 20000)
+    assert statistics.fmean(samples) == pytest.approx(10, rel=0.05)
+
+    # Enabled steps take no time, unlike a successful Bernoulli
+    assert compile_ttc_dist(
+        {'type': 'function', 'name': 'Enabled', 'arguments': []}
+    )(backend, 2) == [0.0, 0.0]
+
+    with pytest.raises(AttackGraphException):
+        compile_ttc_dist(
+            {'type': 'function', 'name': 'Poisson', 'arguments': [1]}
+        )
+    with pytest.raises(AttackGraphException):
+        compile_ttc_dist(
+            {'type': 'function', 'name': 'Exponential', 'arguments': [1, 2]}
+        )
+
+
+def test_ttc_sampler():
+    """Samples of all nodes are drawn at once and repeat with the seed"""
+    attack_graph = _prob_dists_graph(3)
+    sampler = TTCSampler(attack_graph.attack_steps, seed=5, use_numpy=False)
+    samples = sampler.sample(2000)
+    assert len(samples) == len(attack_graph.attack_steps)
+    assert all(len(row) == 2000 for row in samples)
+    assert samples == TTCSampler(
+        attack_graph.attack_steps, seed=5, use_numpy=False
+    ).sample(2000)
+
+    for node, row in zip(sampler.nodes, samples):
+        possible = [sample for sample in row if sample != math.inf]
+        match node.name:
+            case 'expo':
+                assert statistics.fmean(row) == pytest.approx(10, rel=0.1)
+            case 'berni':
+                assert set(row) == {1.0, math.inf}
+                assert len(possible) / len(row) == pytest.approx(0.5, abs=0.05)
+            case 'hardAndUncertain':
+                assert len(possible) / len(row) == pytest.approx(0.5, abs=0.05)
+                assert statistics.fmean(possible) == \
+                    pytest.approx(10, rel=0.1)
+
+    # The nodes of each attack step share their distribution
+    assert len(sampler._groups) == 6
+
+
+def test_ttc_sampler_numpy():
+    numpy = pytest.importorskip('numpy')
+    attack_graph = _prob_dists_graph(2)
+    sampler = TTCSampler(attack_graph.attack_steps, seed=5, use_numpy=True)
+    samples = sampler.sample(1000)
+    assert samples.shape == (len(attack_graph.attack_steps), 1000)
+    assert numpy.array_equal(samples, TTCSampler(
+        attack_graph.attack_steps, seed=5, use_numpy=True
+    ).sample(1000), equal_nan=True)
+
+    row = samples[sampler.positions[
+        attack_graph.get_node_by_full_name('Dummy 0:expo')
+    ]]
+    assert row.mean() == pytest.approx(10, rel=0.15)
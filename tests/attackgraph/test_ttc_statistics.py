@@ -0,0 +1,101 @@
+"""Unit tests for the ttc statistics"""
+
+import math
+
+import pytest
+
+from maltoolbox.attackgraph import AttackGraph
+from maltoolbox.attackgraph.ttc_statistics import (
+    _get_samples,
+    get_nodes_ttc_statistics,
+    get_ttc_statistics,
+)
+from maltoolbox.language import LanguageGraph
+from maltoolbox.language.compiler import MalCompiler
+from maltoolbox.language.ttc_dist import freeze_ttc_dist
+from maltoolbox.model import Model
+
+
+def _function(name, *arguments):
+    return {'type': 'function', 'name': name, 'arguments': list(arguments)}
+
+
+def test_closed_form_statistics():
+    exponential = get_ttc_statistics(_function('Exponential', 0.1))
+    assert exponential.mean == pytest.approx(10)
+    assert exponential.variance == pytest.approx(100)
+    assert exponential.quantiles[0.5] == pytest.approx(10 * math.log(2))
+
+    uniform = get_ttc_statistics({
+        'type': 'subtraction',
+        'lhs': _function('Uniform', 1, 3),
+        'rhs': {'type': 'number', 'value': 1},
+    }, (0.25, 0.5))
+    assert (uniform.mean, uniform.variance) == pytest.approx((1, 1 / 3))
+    assert uniform.quantiles == pytest.approx({0.25: 0.5, 0.5: 1})
+
+    # Possible in half of the cases, as fast as HardAndCertain then
+    uncertain = get_ttc_statistics(
+        _function('HardAndUncertain'), (0.4, 0.5)
+    )
+    certain = get_ttc_statistics(_function('HardAndCertain'), (0.8,))
+    assert uncertain.mean == math.inf
+    assert uncertain.quantiles[0.4] == certain.quantiles[0.8]
+    assert uncertain.quantiles[0.5] == math.inf
+
+    # The binomial coefficients of large n do not fit in a float
+    binomial = get_ttc_statistics(_function('Binomial', 2000, 0.3), (0.5,))
+    assert binomial.mean == pytest.approx(600)
+    assert binomial.quantiles[0.5] == 600
+    certain = get_ttc_statistics(_function('Binomial', 2000, 1.0), (0.5,))
+    assert certain.quantiles[0.5] == 2000
+
+    assert get_ttc_statistics(None).quantiles == {
+        0.5: 0.0, 0.9: 0.0, 0.99: 0.0
+    }
+    with pytest.raises(ValueError):
+        get_ttc_statistics(None, (1.0,))
+
+
+def test_approximated_statistics():
+    """Quantiles without closed form come from cached samples"""
+    gamma_dist = _function('Gamma', 2, 3)
+    gamma = get_ttc_statistics(gamma_dist, (0.5,))
+    assert (gamma.mean, gamma.variance) == (6, 18)
+    # The median of Gamma(2, 3)
+    assert gamma.quantiles[0.5] == pytest.approx(5.035, rel=0.02)
+
+    sum_dist = {
+        'type': 'addition',
+        'lhs': _function('Exponential', 0.5),
+        'rhs': _function('Uniform', 0, 1),
+    }
+    total = get_ttc_statistics(sum_dist, (0.1, 0.9))
+    assert total.mean == pytest.approx(2.5)
+    assert total.variance == pytest.approx(4 + 1 / 12)
+    frozen_dist = freeze_ttc_dist(sum_dist)
+    assert _get_samples(frozen_dist) is _get_samples(frozen_dist)
+    assert total.quantiles[0.1] < total.quantiles[0.9]
+
+
+def test_nodes_ttc_statistics():
+    """Nodes with the same distribution share their statistics"""
+    lang_graph = LanguageGraph(
+        MalCompiler().compile('tests/testdata/prob_dists.mal')
+    )
+    model = Model('Statistics model', lang_graph)
+    for i in range(3):
+        model.add_asset('Dummy', f'Dummy {i}')
+    attack_graph = AttackGraph(lang_graph, model)
+
+    node_statistics = get_nodes_ttc_statistics(attack_graph.attack_steps)
+    assert len(node_statistics) == len(attack_graph.attack_steps)
+    expo_statistics = {
+        id(node_statistics[node]) for node in attack_graph.attack_steps
+        if node.name == 'expo'
+    }
+    assert len(expo_statistics) == 1
+
+    berni = attack_graph.get_node_by_full_name('Dummy 0:berni')
+    assert node_statistics[berni].quantiles[0.5] == 1.0
+    assert node_statistics[berni].quantiles[0.9] == math.inf
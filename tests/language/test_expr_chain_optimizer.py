@@ -0,0 +1,202 @@
+"""Tests for the expressions chain optimizer"""
+
+import pytest
+from conftest import path_testdata
+
+from maltoolbox.attackgraph.generate import follow_expr_chain
+from maltoolbox.language import ExpressionsChain, LanguageGraph
+from maltoolbox.language.expr_chain_optimizer import (
+    get_optimized_expr_chain,
+    is_distributive,
+    optimize_expr_chain,
+    same_expr_chain,
+)
+from maltoolbox.language.expression_chain import ExprType
+from maltoolbox.model import Model
+
+
+@pytest.fixture
+def simple_model(corelang_lang_graph: LanguageGraph) -> Model:
+    return Model.load_from_file(
+        path_testdata('simple_example_model.yml'), corelang_lang_graph
+    )
+
+
+def _field(lang_graph: LanguageGraph, asset_type: str, fieldname: str):
+    return ExpressionsChain(
+        type=ExprType.FIELD,
+        fieldname=fieldname,
+        association=lang_graph.assets[asset_type].associations[fieldname]
+    )
+
+
+def _collect(left_link, right_link):
+    return ExpressionsChain(
+        type=ExprType.COLLECT, left_link=left_link, right_link=right_link
+    )
+
+
+def _union(left_link, right_link):
+    return ExpressionsChain(
+        type=ExprType.UNION, left_link=left_link, right_link=right_link
+    )
+
+
+def _transitive(sub_link):
+    return ExpressionsChain(type=ExprType.TRANSITIVE, sub_link=sub_link)
+
+
+def _subtype(lang_graph: LanguageGraph, subtype: str, sub_link):
+    return ExpressionsChain(
+        type=ExprType.SUBTYPE,
+        sub_link=sub_link,
+        subtype=lang_graph.assets[subtype]
+    )
+
+
+def _assert_equivalent(model: Model, expr_chain, optimized_chain):
+    """The optimized chain reaches the same assets from every asset and
+    from all assets at once"""
+    for asset in model.assets.values():
+        assert follow_expr_chain(model, {asset}, optimized_chain) == \
+            follow_expr_chain(model, {asset}, expr_chain)
+    all_assets = set(model.assets.values())
+    assert follow_expr_chain(model, set(all_assets), optimized_chain) == \
+        follow_expr_chain(model, set(all_assets), expr_chain)
+
+
+def test_optimize_language_chains(
+    corelang_lang_graph: LanguageGraph, simple_model: Model
+):
+    """Optimized chains of the language reach the same assets"""
+    rewritten = 0
+    for lg_asset in corelang_lang_graph.assets.values():
+        for lg_attack_step in lg_asset.attack_steps.values():
+            expr_chains = [chain for _, chain in lg_attack_step.child_table]
+            for parent_chains in lg_attack_step.own_parents.values():
+                expr_chains.extend(parent_chains)
+            for expr_chain in expr_chains:
+                optimized_chain = optimize_expr_chain(
+                    expr_chain, corelang_lang_graph
+                )
+                if optimized_chain is not expr_chain:
+                    rewritten += 1
+                _assert_equivalent(simple_model, expr_chain, optimized_chain)
+    assert rewritten > 0
+
+
+def test_optimize_collect_reassociation(corelang_lang_graph: LanguageGraph):
+    lg = corelang_lang_graph
+    apps = _field(lg, 'Application', 'appExecutedApps')
+    hosts = _field(lg, 'Application', 'hostApp')
+    data = _field(lg, 'Application', 'containedData')
+    expr_chain = _collect(_collect(apps, hosts), data)
+
+    optimized_chain = optimize_expr_chain(expr_chain)
+    assert same_expr_chain(
+        optimized_chain, _collect(apps, _collect(hosts, data))
+    )
+
+
+def test_optimize_union_common_prefix_and_suffix(
+    corelang_lang_graph: LanguageGraph, simple_model: Model
+):
+    lg = corelang_lang_graph
+    apps = _field(lg, 'Application', 'appExecutedApps')
+    hosts = _field(lg, 'Application', 'hostApp')
+    data = _field(lg, 'Application', 'containedData')
+    vulns = _field(lg, 'Application', 'vulnerabilities')
+
+    prefix_chain = _union(_collect(apps, data), _collect(apps, vulns))
+    optimized_chain = optimize_expr_chain(prefix_chain)
+    assert same_expr_chain(optimized_chain, _collect(apps, _union(data, vulns)))
+    _assert_equivalent(simple_model, prefix_chain, optimized_chain)
+
+    suffix_chain = _union(_collect(apps, data), _collect(hosts, data))
+    optimized_chain = optimize_expr_chain(suffix_chain)
+    assert same_expr_chain(optimized_chain, _collect(_union(apps, hosts), data))
+    _assert_equivalent(simple_model, suffix_chain, optimized_chain)
+
+    assert optimize_expr_chain(_union(data, data)) is data
+
+
+def test_optimize_nested_transitive(
+    corelang_lang_graph: LanguageGraph, simple_model: Model
+):
+    apps = _field(corelang_lang_graph, 'Application', 'appExecutedApps')
+    expr_chain = _transitive(_transitive(apps))
+
+    optimized_chain = optimize_expr_chain(expr_chain)
+    assert same_expr_chain(optimized_chain, _transitive(apps))
+    _assert_equivalent(simple_model, expr_chain, optimized_chain)
+
+    # Closures of intersections are left alone
+    intersection = ExpressionsChain(
+        type=ExprType.INTERSECTION, left_link=apps,
+        right_link=_field(corelang_lang_graph, 'Application', 'hostApp')
+    )
+    assert not is_distributive(intersection)
+    expr_chain = _transitive(_transitive(intersection))
+    assert optimize_expr_chain(expr_chain) is expr_chain
+
+
+def test_optimize_subtype_push_down(
+    corelang_lang_graph: LanguageGraph, simple_model: Model
+):
+    lg = corelang_lang_graph
+    apps = _field(lg, 'Application', 'appExecutedApps')
+    data = _field(lg, 'Application', 'containedData')
+    expr_chain = _subtype(lg, 'Information', _collect(apps, data))
+
+    optimized_chain = optimize_expr_chain(expr_chain)
+    assert same_expr_chain(
+        optimized_chain, _collect(apps, _subtype(lg, 'Information', data))
+    )
+    _assert_equivalent(simple_model, expr_chain, optimized_chain)
+
+
+def test_optimize_nested_subtypes(corelang_lang_graph: LanguageGraph):
+    lg = corelang_lang_graph
+    data = _field(lg, 'Application', 'containedData')
+    # Identity extends IAMObject
+    for expr_chain in (
+        _subtype(lg, 'Identity', _subtype(lg, 'IAMObject', data)),
+        _subtype(lg, 'IAMObject', _subtype(lg, 'Identity', data)),
+    ):
+        assert same_expr_chain(
+            optimize_expr_chain(expr_chain),
+            _subtype(lg, 'Identity', data)
+        )
+
+    # Unrelated subtypes are both kept
+    expr_chain = _subtype(lg, 'Identity', _subtype(lg, 'Group', data))
+    assert optimize_expr_chain(expr_chain) is expr_chain
+
+
+def test_optimize_interns_in_language_graph(
+    corelang_lang_graph: LanguageGraph
+):
+    lg = corelang_lang_graph
+    apps = _field(lg, 'Application', 'appExecutedApps')
+    data = _field(lg, 'Application', 'containedData')
+    expr_chain = _collect(_collect(apps, data), data)
+
+    optimized_chain = optimize_expr_chain(expr_chain, lg)
+    assert lg.intern_expr_chain(optimized_chain) is optimized_chain
+    assert optimize_expr_chain(expr_chain, lg) is optimized_chain
+
+
+def test_optimized_expr_chain_cached_per_language(
+    corelang_lang_graph: LanguageGraph
+):
+    """Chains are optimized once per language graph"""
+    lg = corelang_lang_graph
+    apps = _field(lg, 'Application', 'appExecutedApps')
+    data = _field(lg, 'Application', 'containedData')
+    expr_chain = _collect(_collect(apps, data), data)
+
+    optimized_chain = get_optimized_expr_chain(lg, expr_chain)
+    assert same_expr_chain(optimized_chain, optimize_expr_chain(expr_chain))
+    assert lg._optimized_expr_chains[id(expr_chain)] == \
+        (expr_chain, optimized_chain)
+    assert get_optimized_expr_chain(lg, expr_chain) is optimized_chain
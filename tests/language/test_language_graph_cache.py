@@ -0,0 +1,127 @@
+"""Tests for the persistent language graph cache"""
+
+from pathlib import Path
+from unittest.mock import patch
+
+from conftest import path_testdata
+
+from maltoolbox.language import LanguageGraph, languagegraph
+from maltoolbox.language.language_graph_cache import (
+    get_language_graph_cache_key,
+    get_mal_source_files,
+)
+
+MAIN_MAL = '''#id: "cache.test"
+#version: "0.0.1"
+
+include "base.mal"
+// include "missing.mal"
+
+category Test {
+    asset Main {
+        | access
+            -> base.compromise
+    }
+}
+
+associations {
+    Main [main] * <-- Uses --> * [base] Base
+}
+'''
+
+BASE_MAL = '''include "sub/extra.mal"
+
+category Test {
+    asset Base {
+        | compromise
+    }
+}
+'''
+
+EXTRA_MAL = '''category Test {
+    asset Extra {
+        | %s
+    }
+}
+'''
+
+
+def _write_sources(directory: Path, extra_step: str = 'read') -> Path:
+    (directory / 'sub').mkdir(exist_ok=True)
+    (directory / 'main.mal').write_text(MAIN_MAL)
+    (directory / 'base.mal').write_text(BASE_MAL)
+    (directory / 'sub' / 'extra.mal').write_text(EXTRA_MAL % extra_step)
+    return directory / 'main.mal'
+
+
+def test_mal_source_files(tmp_path: Path):
+    """Transitive includes are found, commented out ones are not"""
+    main_file = _write_sources(tmp_path)
+    assert get_mal_source_files(main_file) == [
+        main_file.resolve(),
+        (tmp_path / 'base.mal').resolve(),
+        (tmp_path / 'sub' / 'extra.mal').resolve(),
+    ]
+
+
+def test_cache_key_follows_includes(tmp_path: Path):
+    main_file = str(_write_sources(tmp_path))
+    key = get_language_graph_cache_key(main_file)
+    assert get_language_graph_cache_key(main_file) == key
+
+    # Changing a transitively included file changes the key
+    _write_sources(tmp_path, extra_step='write')
+    assert get_language_graph_cache_key(main_file) != key
+
+    # So does a new maltoolbox version
+    _write_sources(tmp_path)
+    with patch(
+        'maltoolbox.language.language_graph_cache.__version__', '0.0.0'
+    ):
+        assert get_language_graph_cache_key(main_file) != key
+
+
+def test_load_from_file_cache(tmp_path: Path):
+    cache_dir = tmp_path / 'cache'
+    source_dir = tmp_path / 'lang'
+    source_dir.mkdir()
+    main_file = str(_write_sources(source_dir))
+
+    lang_graph = LanguageGraph.load_from_file(main_file, cache_dir=str(cache_dir))
+    assert len(list(cache_dir.glob('*.pickle'))) == 1
+    assert {'Main', 'Base', 'Extra'} <= lang_graph.assets.keys()
+
+    # The second load is served from the cache without compiling
+    with patch.object(
+        languagegraph, 'language_graph_from_mal_spec'
+    ) as from_mal_spec:
+        cached_lang_graph = LanguageGraph.load_from_file(
+            main_file, cache_dir=str(cache_dir)
+        )
+    from_mal_spec.assert_not_called()
+    assert cached_lang_graph._to_dict() == lang_graph._to_dict()
+
+    # Changed sources get a new entry
+    _write_sources(source_dir, extra_step='write')
+    changed_lang_graph = LanguageGraph.load_from_file(
+        main_file, cache_dir=str(cache_dir)
+    )
+    assert len(list(cache_dir.glob('*.pickle'))) == 2
+    assert 'write' in changed_lang_graph.assets['Extra'].attack_steps
+
+
+def test_load_from_file_corrupt_cache_entry(tmp_path: Path):
+    cache_dir = tmp_path / 'cache'
+    mar_file = path_testdata('org.mal-lang.coreLang-1.0.0.mar')
+    lang_graph = LanguageGraph.load_from_file(mar_file, cache_dir=str(cache_dir))
+
+    cache_file, = cache_dir.glob('*.pickle')
+    cache_file.write_bytes(b'not a pickle')
+
+    # Unreadable entries are rebuilt
+    reloaded_lang_graph = LanguageGraph.load_from_file(
+        mar_file, cache_dir=str(cache_dir)
+    )
+    assert reloaded_lang_graph._to_dict() == lang_graph._to_dict()
+    cache_file, = cache_dir.glob('*.pickle')
+    assert cache_file.read_bytes() != b'not a pickle'
@@ -0,0 +1,64 @@
+"""Tests for the language specification lookups"""
+
+import pytest
+
+from maltoolbox.exceptions import LanguageGraphException
+from maltoolbox.language import LanguageGraph
+from maltoolbox.language.language_graph_lookup import (
+    LangSpecIndex,
+    get_associations_for_asset_type,
+    get_attacks_for_asset_type,
+    get_var_expr_for_asset,
+    get_variables_for_asset_type,
+)
+
+
+def test_lang_spec_index_lookups(corelang_lang_graph: LanguageGraph):
+    """Indexed lookups give the same results as scanning the spec"""
+    lang_spec = corelang_lang_graph.lang_spec
+    assert lang_spec is not None
+    lang_spec_index = LangSpecIndex(lang_spec)
+
+    for asset_dict in lang_spec['assets']:
+        asset_type = asset_dict['name']
+        assert get_attacks_for_asset_type(asset_type, lang_spec_index) == \
+            get_attacks_for_asset_type(asset_type, lang_spec)
+        assert get_associations_for_asset_type(asset_type, lang_spec_index) \
+            == get_associations_for_asset_type(asset_type, lang_spec)
+        assert get_variables_for_asset_type(asset_type, lang_spec_index) == \
+            get_variables_for_asset_type(asset_type, lang_spec)
+        for var_entry in asset_dict['variables']:
+            assert get_var_expr_for_asset(
+                asset_type, var_entry['name'], lang_spec_index
+            ) == get_var_expr_for_asset(
+                asset_type, var_entry['name'], lang_spec
+            )
+
+
+def test_lang_spec_index_missing(corelang_lang_graph: LanguageGraph):
+    lang_spec = corelang_lang_graph.lang_spec
+    assert lang_spec is not None
+    lang_spec_index = LangSpecIndex(lang_spec)
+
+    assert get_attacks_for_asset_type('NoSuchAsset', lang_spec_index) == {}
+    assert get_associations_for_asset_type(
+        'NoSuchAsset', lang_spec_index
+    ) == []
+    with pytest.raises(LanguageGraphException):
+        get_variables_for_asset_type('NoSuchAsset', lang_spec_index)
+    with pytest.raises(LanguageGraphException):
+        get_var_expr_for_asset('Application', 'noSuchVar', lang_spec_index)
+
+
+def test_lookups_without_lang_spec():
+    """A language graph without a specification has nothing to look up"""
+    lang_spec = LanguageGraph().lang_spec
+
+    with pytest.raises(LanguageGraphException):
+        get_attacks_for_asset_type('Application', lang_spec)
+    with pytest.raises(LanguageGraphException):
+        get_associations_for_asset_type('Application', lang_spec)
+    with pytest.raises(LanguageGraphException):
+        get_variables_for_asset_type('Application', lang_spec)
+    with pytest.raises(LanguageGraphException):
+        get_var_expr_for_asset('Application', 'someVar', lang_spec)
@@ -2,11 +2,14 @@
 
 import pytest
 from conftest import path_testdata
+import dataclasses
 import pickle
 
-from maltoolbox.language import LanguageGraph, LanguageGraphAssociation
+from maltoolbox.exceptions import LanguageGraphException
+from maltoolbox.language import ExpressionsChain, LanguageGraph, LanguageGraphAsset, LanguageGraphAssociation
 from maltoolbox.language.compiler import MalCompiler
-from maltoolbox.language.languagegraph import load_language_graph_from_file
+from maltoolbox.language.language_graph_builder import get_topological_asset_order
+from maltoolbox.language.languagegraph import language_graph_from_dict, load_language_graph_from_file
 
 
 def test_languagegraph_save_load(corelang_lang_graph: LanguageGraph):
@@ -118,6 +121,156 @@ def test_attackstep_inherit():
     assert chains_to_cc_s2[1].fieldname == "c_of_A"
 
 
+def test_attackstep_child_table():
+    lang_spec = MalCompiler().compile("tests/testdata/attackstep_inherit.mal")
+    lang_graph = LanguageGraph(lang_spec)
+
+    BB_s1 = lang_graph.assets["BB"].attack_steps["s1"]
+    CC_s2 = lang_graph.assets["CC"].attack_steps["s2"]
+
+    # The table is built along with the language graph
+    assert BB_s1._child_table is not None
+    assert [
+        (child, chain.fieldname) for child, chain in BB_s1.child_table
+    ] == [(CC_s2, "c_of_B"), (CC_s2, "c_of_A")]
+
+    table = BB_s1.child_table
+    BB_s1.invalidate_child_table()
+    assert BB_s1._child_table is None
+    assert BB_s1.child_table == table
+
+
+def test_attackstep_child_table_override():
+    test_lang_graph = LanguageGraph(
+        MalCompiler().compile("tests/testdata/attackstep_override.mal")
+    )
+    for asset in test_lang_graph.assets.values():
+        for attack_step in asset.attack_steps.values():
+            if attack_step.overrides:
+                assert attack_step.child_table == tuple(
+                    (child, chain)
+                    for child, chains in attack_step.own_children.items()
+                    for chain in chains
+                )
+
+
+def test_attackstep_child_table_from_dict(corelang_lang_graph: LanguageGraph):
+    """Child tables of a loaded language graph match the original ones"""
+    loaded_lang_graph = language_graph_from_dict(corelang_lang_graph._to_dict())
+    for asset in corelang_lang_graph.assets.values():
+        for attack_step in asset.attack_steps.values():
+            loaded_step = (
+                loaded_lang_graph.assets[asset.name]
+                .attack_steps[attack_step.name]
+            )
+            assert [
+                (child.full_name, chain.to_dict() if chain else None)
+                for child, chain in attack_step.child_table
+            ] == [
+                (child.full_name, chain.to_dict() if chain else None)
+                for child, chain in loaded_step.child_table
+            ]
+
+
+def test_topological_asset_order():
+    lang_graph = LanguageGraph(
+        MalCompiler().compile("tests/testdata/inherited_vars.mal")
+    )
+    order = get_topological_asset_order(lang_graph.assets)
+    assert set(order) == set(lang_graph.assets.values())
+    for asset in order:
+        if asset.own_super_asset:
+            assert order.index(asset.own_super_asset) < order.index(asset)
+
+
+def test_topological_asset_order_cycle():
+    asset_a = LanguageGraphAsset(name='A')
+    asset_b = LanguageGraphAsset(name='B', own_super_asset=asset_a)
+    asset_a.own_super_asset = asset_b
+    with pytest.raises(LanguageGraphException):
+        get_topological_asset_order({'A': asset_a, 'B': asset_b})
+
+
+def test_resolve_asset_inheritance(corelang_lang_graph: LanguageGraph):
+    """Inherited properties are cached for generated and loaded graphs"""
+    loaded_lang_graph = language_graph_from_dict(corelang_lang_graph._to_dict())
+    for lang_graph in (corelang_lang_graph, loaded_lang_graph):
+        for asset in lang_graph.assets.values():
+            for name in ('super_assets', 'sub_assets', 'associations', 'variables'):
+                assert name in asset.__dict__
+
+    for asset in corelang_lang_graph.assets.values():
+        loaded_asset = loaded_lang_graph.assets[asset.name]
+        assert [a.name for a in loaded_asset.super_assets] == \
+            [a.name for a in asset.super_assets]
+        assert {a.name for a in loaded_asset.sub_assets} == \
+            {a.name for a in asset.sub_assets}
+        assert loaded_asset.associations.keys() == asset.associations.keys()
+        assert loaded_asset.variables.keys() == asset.variables.keys()
+
+
+def _copy_expr_chain(expr_chain):
+    if expr_chain is None:
+        return None
+    return dataclasses.replace(
+        expr_chain,
+        left_link=_copy_expr_chain(expr_chain.left_link),
+        right_link=_copy_expr_chain(expr_chain.right_link),
+        sub_link=_copy_expr_chain(expr_chain.sub_link),
+    )
+
+
+def test_interned_expr_chains(corelang_lang_graph: LanguageGraph):
+    """Structurally equal expressions chains are the same object"""
+    chains_by_structure: dict[tuple, ExpressionsChain] = {}
+
+    def structure(expr_chain):
+        if expr_chain is None:
+            return None
+        return (
+            expr_chain.type,
+            structure(expr_chain.left_link),
+            structure(expr_chain.right_link),
+            structure(expr_chain.sub_link),
+            expr_chain.fieldname,
+            id(expr_chain.association),
+            id(expr_chain.subtype),
+        )
+
+    def check(expr_chain):
+        if expr_chain is None:
+            return
+        key = structure(expr_chain)
+        assert chains_by_structure.setdefault(key, expr_chain) is expr_chain
+        for link in (
+            expr_chain.left_link, expr_chain.right_link, expr_chain.sub_link
+        ):
+            check(link)
+
+    for asset in corelang_lang_graph.assets.values():
+        for attack_step in asset.attack_steps.values():
+            for expr_chains in (
+                *attack_step.own_children.values(),
+                *attack_step.own_parents.values()
+            ):
+                for expr_chain in expr_chains:
+                    check(expr_chain)
+
+    # Chains created afterwards are mapped to the interned ones
+    for expr_chain in chains_by_structure.values():
+        copied_chain = _copy_expr_chain(expr_chain)
+        assert copied_chain is not expr_chain
+        assert corelang_lang_graph.intern_expr_chain(copied_chain) is expr_chain
+
+    # Also after pickling
+    unpickled_lg: LanguageGraph = pickle.loads(pickle.dumps(corelang_lang_graph))
+    unpickled_step = unpickled_lg.assets['Application'].attack_steps['fullAccess']
+    for _, expr_chain in unpickled_step.child_table:
+        assert unpickled_lg.intern_expr_chain(
+            _copy_expr_chain(expr_chain)
+        ) is expr_chain
+
+
 def test_attackstep_override():
     test_lang_graph = LanguageGraph(MalCompiler().compile("tests/testdata/attackstep_override.mal"))
 
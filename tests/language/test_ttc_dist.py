@@ -0,0 +1,77 @@
+"""Tests for the shared ttc distributions"""
+
+import copy
+import pickle
+
+import pytest
+from conftest import path_testdata
+
+from maltoolbox.attackgraph import AttackGraph
+from maltoolbox.language import LanguageGraph
+from maltoolbox.language.ttc_dist import freeze_ttc_dist, thaw_ttc_dist
+from maltoolbox.model import Model
+
+TTC_DIST = {
+    'type': 'addition',
+    'lhs': {'type': 'function', 'name': 'Bernoulli', 'arguments': [0.5]},
+    'rhs': {'type': 'function', 'name': 'Exponential', 'arguments': [1]},
+}
+
+
+def test_freeze_ttc_dist():
+    frozen_dist = freeze_ttc_dist(TTC_DIST)
+    assert frozen_dist == TTC_DIST
+    assert freeze_ttc_dist(copy.deepcopy(TTC_DIST)) is frozen_dist
+    assert freeze_ttc_dist(frozen_dist) is frozen_dist
+    assert freeze_ttc_dist(None) is None
+    # Equal numbers of different types are kept apart, but the frozen
+    # distributions are still equal and hash the same
+    int_dist = freeze_ttc_dist({'arguments': [1]})
+    float_dist = freeze_ttc_dist({'arguments': [1.0]})
+    assert int_dist is not float_dist
+    assert int_dist == float_dist
+    assert hash(int_dist) == hash(float_dist)
+    assert hash(int_dist['arguments']) == hash(float_dist['arguments'])
+    assert type(thaw_ttc_dist(float_dist)['arguments'][0]) is float
+    # and so are distributions with their items in another order
+    assert hash(freeze_ttc_dist(dict(reversed(TTC_DIST.items())))) == \
+        hash(frozen_dist)
+
+    assert copy.deepcopy(frozen_dist) is frozen_dist
+    assert pickle.loads(pickle.dumps(frozen_dist)) is frozen_dist
+
+    with pytest.raises(TypeError):
+        frozen_dist['type'] = 'subtraction'
+    with pytest.raises(TypeError):
+        frozen_dist['lhs']['arguments'].append(0.1)
+
+    thawed_dist = thaw_ttc_dist(frozen_dist)
+    assert thawed_dist == TTC_DIST
+    assert type(thawed_dist) is dict
+    assert type(thawed_dist['lhs']['arguments']) is list
+
+
+def test_nodes_share_ttc_dists(corelang_lang_graph: LanguageGraph):
+    """Nodes use the distribution of the language, defenses set by the
+    model get one distribution per value"""
+    model = Model.load_from_file(
+        path_testdata('simple_example_model.yml'), corelang_lang_graph
+    )
+    for asset in model.assets.values():
+        for lg_attack_step in asset.lg_asset.attack_steps.values():
+            if lg_attack_step.type == 'defense':
+                asset.defenses[lg_attack_step.name] = 1.0
+    attack_graph = AttackGraph(corelang_lang_graph, model)
+
+    defense_dists = set()
+    for node in attack_graph.nodes.values():
+        if node.type == 'defense':
+            defense_dists.add(id(node.ttc))
+        else:
+            assert node.ttc is node.lg_attack_step.ttc
+    assert len(defense_dists) == 1
+
+    node = next(iter(attack_graph.nodes.values()))
+    node_dict = node.to_dict()
+    assert node_dict['ttc'] == node.ttc
+    assert type(node_dict['ttc']) is dict
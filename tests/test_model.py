@@ -287,6 +287,31 @@ def test_model_remove_asset_from_association_nonexisting_asset(
             assets={asset4})
 
 
+def test_model_subscribe(model: Model):
+    """Make sure listeners are notified about changes to the model"""
+    events = []
+    def listener(event, asset, fieldname, assets):
+        events.append((event, asset.name, fieldname, assets))
+    model.subscribe(listener)
+
+    asset1 = model.add_asset(asset_type='Application', name='App1')
+    asset2 = model.add_asset(asset_type='Application', name='App2')
+    asset1.add_associated_assets(
+        fieldname='appExecutedApps', assets={asset2})
+    model.remove_asset(asset1)
+    model.unsubscribe(listener)
+    model.remove_asset(asset2)
+
+    assert events == [
+        ('asset_added', 'App1', None, None),
+        ('asset_added', 'App2', None, None),
+        ('associated_assets_added', 'App1', 'appExecutedApps', {asset2}),
+        ('associated_assets_removing', 'App1', 'appExecutedApps', {asset2}),
+        ('associated_assets_removed', 'App1', 'appExecutedApps', {asset2}),
+        ('asset_removed', 'App1', None, None),
+    ]
+
+
 def test_model_get_asset_by_id(model: Model):
     """Make sure correct asset is returned or None
     if no asset with that ID exists
@@ -315,6 +340,16 @@ def test_model_get_asset_by_name(model: Model):
     assert model.get_asset_by_name("Program 3") is None
 
 
+def test_model_asset_type_assignable(model: Model):
+    """Asset type is a plain attribute that can still be assigned"""
+    asset = model.add_asset(asset_type='Application')
+    assert asset.type == 'Application'
+
+    asset.type = 'Renamed'
+    assert asset.type == 'Renamed'
+    assert asset.lg_asset.name == 'Application'
+
+
 def test_model_asset_to_dict(model: Model):
     """Make sure assets are converted to dictionaries correctly"""
     # Create and add asset